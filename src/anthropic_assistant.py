@@ -6,8 +6,8 @@ import requests
 import getpass
 import readline
 import atexit
-from typing import Dict, List, Any, Optional
-from router_manager import OpenWrtManager, RouterConfig
+from typing import Dict, List, Any, Optional, Tuple
+from router_manager import OpenWrtManager, RouterConfig, is_read_only_command
 
 class AnthropicRouterAssistant:
     def __init__(self, api_key: str, router_config: RouterConfig):
@@ -31,15 +31,21 @@ To execute commands, use this JSON format:
 For OpenWrt routers, use these commands instead of standard Linux ones:
 - Instead of "lsblk" → use "ls /dev/sd* /dev/mmc*" or "cat /proc/partitions"
 - Instead of "systemctl" → use "/etc/init.d/service_name"
-- Use "logread" instead of "journalctl"
+- Use "logread" instead of "journalctl"; "logread | grep <word>" searches the full log history kept on this computer
 - Use "uci show" for configuration
 - Use "opkg" for package management
 
 ALWAYS execute commands first, see the results, then respond intelligently based on what you actually found."""
 
     def connect_to_router(self) -> bool:
-        """Connect to the router"""
-        return self.router_manager.connect()
+        """Connect to the router and start collecting its log"""
+        if not self.router_manager.connect():
+            return False
+        try:
+            self.router_manager.open_log_index()
+        except Exception as e:
+            print(f"Log history unavailable: {e}")
+        return True
     
     def disconnect_from_router(self):
         """Disconnect from router"""
@@ -56,6 +62,50 @@ ALWAYS execute commands first, see the results, then respond intelligently based
         except Exception as e:
             return f"Error executing {function_name}: {e}"
     
+    def stream_router_command(self, cmd: str, max_bytes: int = 256 * 1024) -> Tuple[str, str, int, bool]:
+        """Run a command, printing its output live, and return stdout, stderr, exit_code, truncated"""
+        cached = (self.router_manager.answer_package_query(cmd) or self.router_manager.answer_log_query(cmd)
+                  or self.router_manager.cache.get(cmd))
+        if cached is not None:
+            print(f"\033[90m{cached[0]}\033[0m", end="", flush=True)
+            return cached + (False,)
+        
+        if is_read_only_command(cmd):
+            return self._stream_command(cmd, max_bytes)
+        
+        # Anything that may write gets its /etc/config changes reported (one md5sum each side if none)
+        try:
+            before = self.router_manager.snapshot_config()
+        except Exception:
+            before = None
+        result = self._stream_command(cmd, max_bytes)
+        if before is not None:
+            try:
+                diff = self.router_manager.diff_config(before)
+                if not diff.empty:
+                    print(f"\n\033[36mConfig changes:\n{diff.report()}\033[0m")
+            except Exception as e:
+                print(f"\nCould not diff config: {e}")
+        return result
+    
+    def _stream_command(self, cmd: str, max_bytes: int) -> Tuple[str, str, int, bool]:
+        lines = []
+        try:
+            with self.router_manager.stream_command(cmd, max_bytes=max_bytes) as stream:
+                for line in stream:
+                    print(f"\033[90m{line}\033[0m", end="", flush=True)
+                    lines.append(line)
+            
+            stdout = "".join(lines)
+            if stream.truncated:
+                stdout += f"\n... (output truncated at {max_bytes} bytes)"
+            else:
+                self.router_manager.cache.store(cmd, (stdout, stream.stderr, stream.exit_code))
+            return stdout, stream.stderr, stream.exit_code, stream.truncated
+            
+        except Exception as e:
+            return "".join(lines), f"Command execution failed: {e}", 1, False
+    
     def send_message_to_anthropic(self, user_message: str) -> str:
         """Send message to Anthropic API and get response"""
         
@@ -117,13 +167,13 @@ ALWAYS execute commands first, see the results, then respond intelligently based
                     
                     print(f"\n\033[94m🤖 Executing:\033[0m \033[96m{cmd}\033[0m")
                     
-                    # Execute the command via SSH
-                    stdout, stderr, exit_code = self.router_manager.execute_command(cmd)
+                    # Execute the command via SSH, echoing output as it arrives
+                    stdout, stderr, exit_code, truncated = self.stream_router_command(cmd)
                     
                     # Store structured results
                     result = {
                         'command': cmd,
-                        'success': exit_code == 0,
+                        'success': exit_code == 0 or truncated,
                         'stdout': stdout.strip(),
                         'stderr': stderr.strip(),
                         'exit_code': exit_code
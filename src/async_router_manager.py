@@ -0,0 +1,571 @@
+#!/usr/bin/env python3
+
+import asyncio
+import codecs
+import json
+import os
+import random
+import time
+from collections import Counter, deque
+from typing import Dict, List, Optional, Tuple
+import asyncssh
+from router_manager import (
+    RouterConfig, ConnectionMetrics, ResultCache, is_read_only_command, build_batch_script,
+    parse_batch_output, info_from_results, info_from_ubus, SYSTEM_INFO_COMMANDS, UBUS_SYSTEM_INFO_COMMANDS,
+    STORAGE_INFO_COMMANDS, WIRELESS_STATUS_COMMANDS
+)
+from router_parsers import (
+    SystemStats, SYSTEM_STATS_COMMANDS, LogRecord, WirelessNetwork, parse_system_stats, parse_opkg_status,
+    parse_opkg_list_installed, parse_logread_line, parse_wifi_devices
+)
+from wireless_scan import WirelessScanner, DEFAULT_RADIOS, scan_command
+from package_index import (
+    InstalledPackages, DEFAULT_CACHE_DIR, OPKG_STATUS_PATH, OPKG_STATUS_FINGERPRINT_COMMAND, OPKG_LIST_INSTALLED_COMMAND
+)
+from log_index import (
+    LogIndex, DEFAULT_LOG_INDEX_NAME, log_search_terms, format_log_records, log_grep_note, skip_indexed,
+    replay_start
+)
+from log_tailer import LOGREAD_FOLLOW_COMMAND, RESUME_LINES
+from ssh_connect import (
+    DEFAULT_KNOWN_HOSTS, known_hosts_name, is_known_host, host_key_from_openssh, verify_host_key
+)
+
+class AsyncCommandStream:
+    """asyncio counterpart of router_manager.CommandStream.
+    
+    `async for` yields decoded stdout lines as they arrive, stderr is drained by a
+    side task, and max_bytes hangs up on the command once reached. Cancelling the
+    consuming task closes the channel.
+    """
+    
+    def __init__(self, process: asyncssh.SSHClientProcess, semaphore: asyncio.Semaphore,
+                 command: str, timeout: Optional[float] = 30, max_bytes: Optional[int] = None):
+        self.command = command
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.truncated = False
+        self.exit_code = None
+        self.stderr = ""
+        self._process = process
+        self._semaphore = semaphore
+        self._stderr_task = asyncio.ensure_future(process.stderr.read())
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._pending = ""
+        self._lines = deque()
+        self._done = False
+    
+    async def _read_chunk(self) -> Optional[str]:
+        if self._done:
+            return None
+        
+        try:
+            data = await asyncio.wait_for(self._process.stdout.read(32768), self.timeout)
+        except asyncio.TimeoutError:
+            self.close()
+            raise TimeoutError(f"No output from '{self.command}' for {self.timeout}s")
+        
+        if not data:
+            await self._finish()
+            return self._decoder.decode(b"", final=True)
+        
+        if self.max_bytes is not None and self.bytes_read + len(data) > self.max_bytes:
+            data = data[:self.max_bytes - self.bytes_read]
+            self.truncated = True
+        self.bytes_read += len(data)
+        text = self._decoder.decode(data)
+        if self.truncated:
+            text += self._decoder.decode(b"", final=True)
+            await self._finish()
+        return text
+    
+    async def _finish(self):
+        if self.truncated:
+            # We hung up on the command ourselves; report it like a SIGPIPE'd pipeline
+            self.close()
+            self.exit_code = 141
+            return
+        
+        completed = await self._process.wait()
+        stderr_data = await self._stderr_task
+        self.stderr = stderr_data.decode('utf-8', errors='replace')
+        self.exit_code = completed.exit_status if completed.exit_status is not None else -1
+        self.close()
+    
+    def close(self):
+        """Hang up the channel and free its slot (safe to call twice)"""
+        if self._done:
+            return
+        self._done = True
+        self._process.close()
+        self._stderr_task.cancel()
+        self._semaphore.release()
+    
+    async def read(self) -> str:
+        """Drain the rest of the stream into one string"""
+        return "".join([line async for line in self])
+    
+    def __aiter__(self):
+        return self
+    
+    async def __anext__(self) -> str:
+        try:
+            while not self._lines:
+                chunk = await self._read_chunk()
+                if chunk is None:
+                    if self._pending:
+                        line, self._pending = self._pending, ""
+                        return line
+                    raise StopAsyncIteration
+                
+                parts = (self._pending + chunk).split('\n')
+                self._pending = parts.pop()
+                self._lines.extend(part + '\n' for part in parts)
+        except asyncio.CancelledError:
+            self.close()
+            raise
+        return self._lines.popleft()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+class AsyncOpenWrtManager:
+    """OpenWrtManager on a native asyncio SSH transport (asyncssh).
+    
+    Same configuration, return values and reconnect behaviour as OpenWrtManager,
+    but every call is a coroutine, so the TUI can run many commands concurrently
+    without a thread per call. Channels are bounded by RouterConfig.max_channels.
+    The multi-step setup_* flows remain on OpenWrtManager.
+    """
+    
+    def __init__(self, config: RouterConfig):
+        self.config = config
+        self.conn = None
+        self.connected = False
+        self.metrics = ConnectionMetrics()
+        self.cache = ResultCache(config.cache_size)
+        self.installed_packages = InstalledPackages(
+            config.installed_packages_path
+            or os.path.join(DEFAULT_CACHE_DIR, f"opkg-installed-{config.host}.json")
+        )
+        self.log_index = None
+        self.wireless_scanner = WirelessScanner(config.wireless_scan_ttl)
+        self._log_task = None
+        self._channels = None
+        self._reconnect_lock = None
+        self._scan_lock = None
+    
+    async def connect(self) -> bool:
+        """Establish SSH connection to router"""
+        self._channels = asyncio.Semaphore(max(1, self.config.max_channels))
+        self._reconnect_lock = asyncio.Lock()
+        self._scan_lock = asyncio.Lock()
+        try:
+            await self._open_connection()
+            self.connected = True
+            return True
+        
+        except Exception as e:
+            print(f"Failed to connect to router: {e}")
+            return False
+    
+    async def _open_connection(self):
+        config = self.config
+        known_hosts_path = os.path.expanduser(config.known_hosts_path) or DEFAULT_KNOWN_HOSTS
+        known = is_known_host(config.host, config.port, known_hosts_path)
+        if config.host_key_policy == "strict" and not known:
+            raise ConnectionError(f"Unknown host key for {known_hosts_name(config.host, config.port)}; "
+                                  f"not in {known_hosts_path}")
+        # A known host is checked by asyncssh before authenticating; a new one (tofu) is recorded afterwards
+        verify_first = config.host_key_policy != "ignore" and known
+        
+        # Only the configured keys are offered, as with paramiko: None stops asyncssh loading ~/.ssh/id_*
+        agent = None
+        client_keys = [os.path.expanduser(config.key_filename)] if config.key_filename else []
+        if config.allow_agent:
+            try:
+                agent = await asyncssh.connect_agent()
+                if agent is not None:
+                    client_keys += await agent.get_keys()
+            except (OSError, asyncssh.Error):
+                pass
+        try:
+            conn = await asyncssh.connect(
+                config.host,
+                port=config.port,
+                username=config.username,
+                password=config.password,
+                client_keys=client_keys or None,
+                passphrase=config.key_passphrase or None,
+                agent_path=None,
+                known_hosts=known_hosts_path if verify_first else None,
+                connect_timeout=config.timeout,
+                keepalive_interval=config.keepalive_interval
+            )
+        finally:
+            if agent is not None:
+                agent.close()
+        
+        if config.host_key_policy == "tofu" and not verify_first:
+            try:
+                key = host_key_from_openssh(conn.get_server_host_key().export_public_key('openssh').decode())
+                # The known_hosts write takes a file lock; keep it off the event loop
+                await asyncio.to_thread(verify_host_key, key, config.host, config.port,
+                                        config.host_key_policy, known_hosts_path)
+            except Exception:
+                conn.close()
+                raise
+        self.conn = conn
+        self.metrics.connects += 1
+    
+    async def _close_connection(self):
+        if self.conn:
+            self.conn.close()
+            await self.conn.wait_closed()
+            self.conn = None
+    
+    async def disconnect(self):
+        """Close SSH connection"""
+        if self._log_task:
+            self._log_task.cancel()
+            self._log_task = None
+        if self.log_index:
+            self.log_index.close()
+            self.log_index = None
+        if self.conn:
+            await self._close_connection()
+            self.connected = False
+    
+    def is_alive(self) -> bool:
+        """Check whether the SSH connection is still up"""
+        return self.conn is not None and not self.conn.is_closed()
+    
+    async def ensure_connected(self) -> bool:
+        """Return True if usable, reconnecting first when the connection has died"""
+        if not self.connected:
+            return False
+        if self.is_alive():
+            return True
+        return await self.reconnect()
+    
+    async def reconnect(self) -> bool:
+        """Re-establish the SSH connection with exponential backoff and jitter"""
+        async with self._reconnect_lock:
+            if self.is_alive():
+                return True
+            
+            start = time.monotonic()
+            last_error = None
+            for attempt in range(self.config.reconnect_attempts):
+                if attempt:
+                    delay = min(self.config.reconnect_max_delay,
+                                self.config.reconnect_backoff * 2 ** (attempt - 1))
+                    await asyncio.sleep(random.uniform(delay / 2, delay))
+                
+                self.metrics.reconnect_attempts += 1
+                try:
+                    await self._close_connection()
+                    await self._open_connection()
+                except Exception as e:
+                    last_error = e
+                    continue
+                
+                # The router may have rebooted, so nothing cached is trustworthy any more
+                self.cache.invalidate()
+                elapsed = time.monotonic() - start
+                self.metrics.reconnects += 1
+                self.metrics.last_reconnect_seconds = elapsed
+                self.metrics.total_reconnect_seconds += elapsed
+                return True
+            
+            self.metrics.failed_reconnects += 1
+            print(f"Failed to reconnect to router: {last_error}")
+            return False
+    
+    async def execute_command(self, command: str, timeout: int = 30, read_only: Optional[bool] = None,
+                              use_cache: bool = True) -> Tuple[str, str, int]:
+        """Execute command on router and return stdout, stderr, exit_code"""
+        if not self.connected:
+            return "", "Not connected to router", 1
+        
+        if use_cache:
+            cached = self.cache.get(command)
+            if cached is not None:
+                return cached
+        
+        if read_only is None:
+            read_only = is_read_only_command(command)
+        result = await self._execute_with_retry(command, timeout, read_only)
+        self.cache.store(command, result, read_only)
+        return result
+    
+    async def _execute_with_retry(self, command: str, timeout: int, read_only: bool) -> Tuple[str, str, int]:
+        if not await self.ensure_connected():
+            return "", "Not connected to router", 1
+        
+        try:
+            return await self._execute_once(command, timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if self.is_alive() or not read_only:
+                return "", f"Command execution failed: {e}", 1
+        
+        self.metrics.retried_commands += 1
+        if not await self.ensure_connected():
+            return "", "Not connected to router", 1
+        
+        try:
+            return await self._execute_once(command, timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return "", f"Command execution failed: {e}", 1
+    
+    async def _execute_once(self, command: str, timeout: int) -> Tuple[str, str, int]:
+        async with self._channels:
+            process = await self.conn.create_process(command, encoding='utf-8')
+            try:
+                stdout_data, stderr_data = await asyncio.wait_for(process.communicate(), timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"timed out after {timeout}s")
+            finally:
+                # Also runs on cancellation, so an abandoned command never holds its channel
+                process.close()
+        
+        exit_code = process.exit_status
+        if exit_code is None:
+            if not self.is_alive():
+                raise ConnectionError("connection to router lost")
+            exit_code = -1
+        return stdout_data, stderr_data, exit_code
+    
+    async def stream_command(self, command: str, timeout: Optional[float] = 30,
+                             max_bytes: Optional[int] = None) -> AsyncCommandStream:
+        """Start a command and return an AsyncCommandStream yielding its stdout line by line"""
+        if not await self.ensure_connected():
+            raise ConnectionError("Not connected to router")
+        if not is_read_only_command(command):
+            self.cache.invalidate(keep_static=True)
+        
+        await self._channels.acquire()
+        try:
+            process = await self.conn.create_process(command, encoding=None)
+        except BaseException:
+            self._channels.release()
+            raise
+        return AsyncCommandStream(process, self._channels, command, timeout, max_bytes)
+    
+    async def execute_commands(self, commands: List[str], timeout: int = 30,
+                               use_cache: bool = True) -> List[Tuple[str, str, int]]:
+        """Run independent (read-only) commands concurrently, results in input order"""
+        return list(await asyncio.gather(*(self.execute_command(cmd, timeout, use_cache=use_cache)
+                                           for cmd in commands)))
+    
+    async def execute_batch(self, commands: Dict[str, str], timeout: int = 30,
+                            use_cache: bool = True) -> Dict[str, Tuple[str, str, int]]:
+        """Run several commands in one remote shell invocation and split the results back out by key"""
+        results = {}
+        pending = {}
+        for key, cmd in commands.items():
+            cached = self.cache.get(cmd) if use_cache else None
+            if cached is not None:
+                results[key] = cached
+            else:
+                pending[key] = cmd
+        
+        if pending:
+            script, marker = build_batch_script(pending)
+            read_only = all(is_read_only_command(cmd) for cmd in pending.values())
+            stdout, stderr, exit_code = await self.execute_command(script, timeout=timeout,
+                                                                   read_only=read_only, use_cache=False)
+            for key, result in parse_batch_output(list(pending), marker, stdout, stderr, exit_code).items():
+                self.cache.store(pending[key], result, is_read_only_command(pending[key]))
+                results[key] = result
+        
+        return {key: results[key] for key in commands}
+    
+    async def get_system_info(self) -> Dict[str, str]:
+        """Get basic system information (`ubus call system info` and `system board`, or shell commands)"""
+        results = await self.execute_batch(UBUS_SYSTEM_INFO_COMMANDS)
+        try:
+            system = json.loads(results['info'][0]) if results['info'][2] == 0 else {}
+            if 'memory' in system and results['board'][2] == 0:
+                return info_from_ubus(system, json.loads(results['board'][0]))
+        except (ValueError, AttributeError):
+            pass
+        return info_from_results(await self.execute_batch(SYSTEM_INFO_COMMANDS))
+    
+    async def get_system_stats(self) -> SystemStats:
+        """Get memory, load, uptime, mounts and disk usage as exact, structured values"""
+        return parse_system_stats(await self.execute_batch(SYSTEM_STATS_COMMANDS))
+    
+    async def get_storage_info(self) -> Dict[str, str]:
+        """Get detailed storage information"""
+        return info_from_results(await self.execute_batch(STORAGE_INFO_COMMANDS))
+    
+    async def get_wireless_status(self) -> Dict[str, str]:
+        """Get wireless interface status and connection info"""
+        return info_from_results(await self.execute_batch(WIRELESS_STATUS_COMMANDS))
+    
+    async def update_packages(self) -> bool:
+        """Update package lists"""
+        print("Updating package lists...")
+        stdout, stderr, exit_code = await self.execute_command("opkg update", timeout=60)
+        
+        if exit_code == 0:
+            print("Package lists updated successfully")
+            return True
+        else:
+            print(f"Failed to update packages: {stderr}")
+            return False
+    
+    async def install_package(self, package_name: str) -> bool:
+        """Install a package using opkg"""
+        print(f"Installing package: {package_name}")
+        stdout, stderr, exit_code = await self.execute_command(f"opkg install {package_name}", timeout=120)
+        
+        if exit_code == 0:
+            print(f"Successfully installed {package_name}")
+            return True
+        else:
+            print(f"Failed to install {package_name}: {stderr}")
+            return False
+    
+    async def get_installed_packages(self) -> Dict[str, str]:
+        """Get installed packages as {name: version}, re-reading opkg's status file only when it changed"""
+        stdout, stderr, exit_code = await self.execute_command(OPKG_STATUS_FINGERPRINT_COMMAND, use_cache=False)
+        fingerprint = InstalledPackages.fingerprint_from(stdout) if exit_code == 0 else ""
+        if fingerprint and not self.installed_packages.is_current(fingerprint):
+            stdout, stderr, exit_code = await self.execute_command(f"cat {OPKG_STATUS_PATH}", use_cache=False)
+            if exit_code == 0:
+                self.installed_packages.update(fingerprint, parse_opkg_status(stdout))
+            else:
+                fingerprint = ""
+        if fingerprint:
+            return dict(self.installed_packages.packages)
+        
+        # The status file could not be fingerprinted or read; ask opkg itself
+        stdout, stderr, exit_code = await self.execute_command(OPKG_LIST_INSTALLED_COMMAND, use_cache=False)
+        if exit_code != 0:
+            print(f"Failed to list packages: {stderr}")
+            return {}
+        return parse_opkg_list_installed(stdout)
+    
+    async def list_installed_packages(self) -> List[str]:
+        """List all installed packages"""
+        return sorted(await self.get_installed_packages())
+    
+    async def answer_package_query(self, command: str) -> Optional[Tuple[str, str, int]]:
+        """Answer `opkg list-installed` from the tracked package set; None for anything else"""
+        if command.strip() != 'opkg list-installed':
+            return None
+        packages = await self.get_installed_packages()
+        if not packages:
+            return None
+        return "".join(f"{name} - {version}\n" for name, version in sorted(packages.items())), "", 0
+    
+    def start_log_collection(self, batch_interval: float = 1.0, retry_interval: float = 5.0):
+        """Follow `logread -f` in a background task and add every line to the host-side log index"""
+        if self.log_index is None:
+            self.log_index = LogIndex(self.config.log_index_path or os.path.join(
+                DEFAULT_CACHE_DIR, DEFAULT_LOG_INDEX_NAME
+            ))
+        if self._log_task is None or self._log_task.done():
+            self._log_task = asyncio.ensure_future(self._collect_logs(batch_interval, retry_interval))
+    
+    async def _collect_logs(self, batch_interval: float, retry_interval: float):
+        index, router = self.log_index, self.config.host
+        command = LOGREAD_FOLLOW_COMMAND
+        
+        def store(records: List[LogRecord], indexed: Optional[Counter]) -> Optional[Counter]:
+            # The start of every stream replays lines an earlier stream (or run) may have indexed
+            if indexed is None and records:
+                indexed = index.indexed_counts(router, replay_start(records))
+            index.add(router, skip_indexed(records, indexed) if records else [])
+            return indexed
+        
+        while True:
+            try:
+                stream = await self.stream_command(command, timeout=None)
+                async with stream:
+                    records, indexed, flushed = [], None, time.monotonic()
+                    next_line = asyncio.ensure_future(stream.__anext__())
+                    try:
+                        while True:
+                            # Wait at most batch_interval so a lone line is indexed without waiting for the next
+                            done, _ = await asyncio.wait({next_line}, timeout=batch_interval)
+                            if done:
+                                try:
+                                    records.append(parse_logread_line(next_line.result()))
+                                except StopAsyncIteration:
+                                    break
+                                next_line = asyncio.ensure_future(stream.__anext__())
+                            elapsed = time.monotonic() - flushed
+                            # Quiet logs still get a periodic write: the heartbeat keeps is_live() true
+                            if (records and elapsed >= batch_interval) or elapsed > 15:
+                                indexed = await asyncio.to_thread(store, records, indexed)
+                                records, flushed = [], time.monotonic()
+                    finally:
+                        next_line.cancel()
+                    if records:
+                        await asyncio.to_thread(store, records, indexed)
+            except (OSError, asyncssh.Error, ConnectionError) as e:
+                print(f"Log collection interrupted: {e}")
+            # Lines replayed after a reconnect are already indexed and get skipped
+            command = f"{LOGREAD_FOLLOW_COMMAND} -l {RESUME_LINES}"
+            await asyncio.sleep(retry_interval)
+    
+    async def search_logs(self, text: str = "", daemon: Optional[str] = None, since: Optional[float] = None,
+                          until: Optional[float] = None, limit: int = 100) -> List[LogRecord]:
+        """Search this router's indexed log history without running anything on the router"""
+        if self.log_index is None:
+            self.log_index = LogIndex(self.config.log_index_path or os.path.join(
+                DEFAULT_CACHE_DIR, DEFAULT_LOG_INDEX_NAME
+            ))
+        return await asyncio.to_thread(self.log_index.search, text, self.config.host, daemon,
+                                       None, since, until, limit)
+    
+    async def answer_log_query(self, command: str) -> Optional[Tuple[str, str, int]]:
+        """Answer `logread | grep term` / `logread -e term` from the log index while it is being fed"""
+        terms = log_search_terms(command)
+        if terms is None or self.log_index is None or not self.log_index.is_live(self.config.host):
+            return None
+        text, ignore_case = terms
+        records, truncated = await asyncio.to_thread(self.log_index.grep, text, self.config.host, ignore_case)
+        return format_log_records(records), log_grep_note(records, truncated), 0 if records else 1
+    
+    async def get_usb_devices(self) -> List[str]:
+        """List USB devices"""
+        stdout, stderr, exit_code = await self.execute_command("lsusb")
+        if exit_code == 0:
+            return stdout.strip().split('\n')
+        return []
+    
+    async def get_wifi_radios(self) -> List[str]:
+        """Radio names from the wireless config"""
+        stdout, stderr, exit_code = await self.execute_command("uci show wireless")
+        radios = parse_wifi_devices(stdout) if exit_code == 0 else []
+        return radios or list(DEFAULT_RADIOS)
+    
+    async def scan_wireless(self, force: bool = False) -> List[WirelessNetwork]:
+        """Scan every radio concurrently; a scan younger than wireless_scan_ttl is reused unless force"""
+        scanner = self.wireless_scanner
+        async with self._scan_lock:
+            if force or not scanner.is_fresh():
+                radios = await self.get_wifi_radios()
+                results = await self.execute_commands([scan_command(radio) for radio in radios], timeout=15,
+                                                      use_cache=False)
+                scanner.update(dict(zip(radios, results)))
+            return list(scanner.networks)
+    
+    async def scan_wireless_networks(self) -> str:
+        """Scan for available wireless networks"""
+        if not self.wireless_scanner.is_fresh():
+            print("Scanning for wireless networks...")
+        await self.scan_wireless()
+        return self.wireless_scanner.report()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+import gzip
+import hashlib
+import json
+import os
+import random
+import tempfile
+import time
+import zlib
+from dataclasses import dataclass, field, asdict
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# `sysupgrade -b -` writes the .tar.gz to stdout, so nothing is staged in the router's tmpfs
+BACKUP_COMMAND = "sysupgrade -b -"
+
+# Content-defined chunking: cut points depend on the bytes, not their offsets, so an
+# edit to one file only changes the chunks around it
+MIN_CHUNK = 2 * 1024
+AVG_CHUNK_BITS = 13  # ~8 KiB
+MAX_CHUNK = 64 * 1024
+# Test the high bits: they depend on the last 64 bytes, the low ones only on the last few
+_CHUNK_SHIFT = 64 - AVG_CHUNK_BITS
+_GEAR = [random.Random(0x6f70656e77727421 + i).getrandbits(64) for i in range(256)]
+
+def chunk_stream(blocks: Iterable[bytes]) -> Iterator[bytes]:
+    """Re-cut a byte stream into content-defined chunks (gear rolling hash)"""
+    buffer = bytearray()
+    digest = 0
+    scanned = 0
+    for block in blocks:
+        buffer += block
+        while scanned < len(buffer):
+            digest = ((digest << 1) + _GEAR[buffer[scanned]]) & 0xFFFFFFFFFFFFFFFF
+            scanned += 1
+            if (scanned >= MIN_CHUNK and not digest >> _CHUNK_SHIFT) or scanned >= MAX_CHUNK:
+                yield bytes(buffer[:scanned])
+                del buffer[:scanned]
+                digest = scanned = 0
+    if buffer:
+        yield bytes(buffer)
+
+@dataclass
+class BackupManifest:
+    router: str
+    created: float
+    label: str
+    size: int  # bytes of the uncompressed tar
+    sha256: str  # of the uncompressed tar
+    compressed_size: int  # bytes received from the router
+    chunks: List[str] = field(default_factory=list)
+    
+    @property
+    def name(self) -> str:
+        return f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.created))}-{self.sha256[:12]}"
+
+class BackupStore:
+    """Deduplicated store of sysupgrade backups for any number of routers.
+    
+    The gzip stream from the router is decompressed on the fly and the tar
+    inside is split with chunk_stream(); each distinct chunk is kept once,
+    zlib-compressed, under chunks/ no matter how many backups or routers
+    contain it. A backup itself is just a JSON manifest of chunk hashes.
+    """
+    
+    def __init__(self, root: str):
+        self.root = root
+        self.chunks_dir = os.path.join(root, "chunks")
+        os.makedirs(self.chunks_dir, exist_ok=True)
+    
+    def _chunk_path(self, digest: str) -> str:
+        return os.path.join(self.chunks_dir, digest[:2], digest)
+    
+    def _put_chunk(self, data: bytes) -> Tuple[str, bool]:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._chunk_path(digest)
+        if os.path.exists(path):
+            return digest, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A unique temp name per writer: concurrent backups often store the same chunk
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f".{digest}.")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(zlib.compress(data, 9))
+            if os.path.exists(path):
+                os.unlink(temp_path)
+                return digest, False
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return digest, True
+    
+    def _get_chunk(self, digest: str) -> bytes:
+        with open(self._chunk_path(digest), 'rb') as f:
+            data = zlib.decompress(f.read())
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Backup chunk {digest} is corrupt")
+        return data
+    
+    def ingest(self, router: str, blocks: Iterable[bytes], label: str = "") -> BackupManifest:
+        """Store a .tar.gz backup arriving as blocks of bytes; the manifest is only written once it completes"""
+        manifest = BackupManifest(router, time.time(), label, 0, "", 0)
+        tar_hash = hashlib.sha256()
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        
+        def tar_blocks():
+            for block in blocks:
+                manifest.compressed_size += len(block)
+                data = decompressor.decompress(block)
+                if data:
+                    yield data
+            data = decompressor.flush()
+            if data:
+                yield data
+            if not decompressor.eof:
+                raise ValueError("Backup stream ended before the end of the gzip data")
+        
+        for chunk in chunk_stream(tar_blocks()):
+            digest, _ = self._put_chunk(chunk)
+            manifest.chunks.append(digest)
+            manifest.size += len(chunk)
+            tar_hash.update(chunk)
+        manifest.sha256 = tar_hash.hexdigest()
+        
+        directory = os.path.join(self.root, router)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, manifest.name + ".json")
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(asdict(manifest), f)
+        os.replace(path + ".tmp", path)
+        return manifest
+    
+    def list(self, router: Optional[str] = None) -> List[BackupManifest]:
+        """Backups of one router (or all), oldest first"""
+        routers = [router] if router else [
+            name for name in os.listdir(self.root)
+            if name != "chunks" and os.path.isdir(os.path.join(self.root, name))
+        ]
+        manifests = []
+        for name in routers:
+            directory = os.path.join(self.root, name)
+            if not os.path.isdir(directory):
+                continue
+            for entry in os.listdir(directory):
+                if entry.endswith(".json"):
+                    try:
+                        with open(os.path.join(directory, entry), 'r', encoding='utf-8') as f:
+                            manifests.append(BackupManifest(**json.load(f)))
+                    except (OSError, ValueError, TypeError):
+                        continue
+        return sorted(manifests, key=lambda m: m.created)
+    
+    def iter_tar(self, manifest: BackupManifest) -> Iterator[bytes]:
+        """The backup's uncompressed tar, chunk by chunk"""
+        for digest in manifest.chunks:
+            yield self._get_chunk(digest)
+    
+    def restore(self, manifest: BackupManifest, path: str):
+        """Write the backup as a .tar.gz that `sysupgrade -r` accepts, verifying its hash"""
+        tar_hash = hashlib.sha256()
+        with gzip.open(path + ".tmp", 'wb') as f:
+            for data in self.iter_tar(manifest):
+                tar_hash.update(data)
+                f.write(data)
+        if tar_hash.hexdigest() != manifest.sha256:
+            os.remove(path + ".tmp")
+            raise ValueError(f"Backup {manifest.name} does not match its recorded hash")
+        os.replace(path + ".tmp", path)
+    
+    def stats(self) -> Tuple[int, int, int]:
+        """(backups, bytes the router sent for them all, bytes actually on disk for chunks)"""
+        manifests = self.list()
+        stored = 0
+        for directory, _, files in os.walk(self.chunks_dir):
+            stored += sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+        return len(manifests), sum(m.compressed_size for m in manifests), stored
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+
+import hashlib
+import io
+import json
+import os
+import shlex
+import tarfile
+import tempfile
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional, Tuple
+from router_parsers import parse_md5sums, parse_uci_config
+
+CONFIG_DIR = "/etc/config"
+
+@dataclass
+class ConfigSnapshot:
+    id: str  # sha256 over the (file, content hash) pairs, so identical configs share an id
+    created: float
+    label: str
+    files: Dict[str, str]  # file name -> sha256 of its content in the object store
+    checksums: Dict[str, str]  # file name -> md5, as the router reports it
+
+@dataclass
+class SectionChange:
+    config: str
+    section: str
+    kind: str  # "added", "removed" or "changed"
+    section_type: str
+    options: Dict[str, Tuple[Any, Any]] = field(default_factory=dict)  # option -> (before, after); None = unset
+    
+    def report(self) -> str:
+        sign = {'added': '+', 'removed': '-', 'changed': '~'}[self.kind]
+        lines = [f"{sign} {self.config}.{self.section} ({self.section_type})"]
+        for option, (before, after) in sorted(self.options.items()):
+            if before is None:
+                lines.append(f"    + {option}={after!r}")
+            elif after is None:
+                lines.append(f"    - {option}={before!r}")
+            else:
+                lines.append(f"    {option}: {before!r} -> {after!r}")
+        return "\n".join(lines)
+
+@dataclass
+class ConfigDiff:
+    before: str  # snapshot ids
+    after: str
+    changes: List[SectionChange] = field(default_factory=list)
+    
+    @property
+    def empty(self) -> bool:
+        return not self.changes
+    
+    def report(self) -> str:
+        return "\n".join(change.report() for change in self.changes) or "No configuration changes"
+
+@dataclass
+class ConfigChanges:
+    """Filled in by OpenWrtManager.config_changes() when its block ends"""
+    before: ConfigSnapshot
+    after: Optional[ConfigSnapshot] = None
+    diff: Optional[ConfigDiff] = None
+
+def snapshot_id(files: Dict[str, str]) -> str:
+    manifest = "\n".join(f"{name} {digest}" for name, digest in sorted(files.items()))
+    return hashlib.sha256(manifest.encode()).hexdigest()
+
+def diff_sections(config: str, before: Dict[str, Dict[str, Any]],
+                  after: Dict[str, Dict[str, Any]]) -> List[SectionChange]:
+    """Section-level differences between two parsed versions of one UCI config file"""
+    changes = []
+    for name, section in before.items():
+        if name not in after:
+            changes.append(SectionChange(config, name, 'removed', section['.type'],
+                                         {k: (v, None) for k, v in section.items() if k != '.type'}))
+    for name, section in after.items():
+        old = before.get(name)
+        if old is None:
+            changes.append(SectionChange(config, name, 'added', section['.type'],
+                                         {k: (None, v) for k, v in section.items() if k != '.type'}))
+            continue
+        options = {k: (old.get(k), section.get(k)) for k in set(old) | set(section)
+                   if k != '.type' and old.get(k) != section.get(k)}
+        if options or old['.type'] != section['.type']:
+            changes.append(SectionChange(config, name, 'changed', section['.type'], options))
+    return changes
+
+def _write_atomic(path: str, data: bytes):
+    # Unique temp name per writer, so concurrent snapshots of routers sharing an
+    # object never rename each other's half-written files
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+class ConfigStore:
+    """Content-addressed store of config files plus one JSON manifest per snapshot.
+    
+    File contents live once under objects/ (shared by every router using the
+    same root); manifests live under <router>/ and only name the hashes.
+    """
+    
+    def __init__(self, root: str, router: str):
+        self.objects_dir = os.path.join(root, "objects")
+        self.snapshots_dir = os.path.join(root, router)
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+    
+    def put_object(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = os.path.join(self.objects_dir, digest[:2], digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _write_atomic(path, data)
+        return digest
+    
+    def get_object(self, digest: str) -> bytes:
+        with open(os.path.join(self.objects_dir, digest[:2], digest), 'rb') as f:
+            return f.read()
+    
+    def save(self, snapshot: ConfigSnapshot):
+        name = f"{int(snapshot.created * 1000):015d}-{snapshot.id[:16]}.json"
+        _write_atomic(os.path.join(self.snapshots_dir, name),
+                      json.dumps(asdict(snapshot), indent=1).encode('utf-8'))
+    
+    def list(self) -> List[ConfigSnapshot]:
+        """Every snapshot of this router, oldest first"""
+        snapshots = []
+        for name in sorted(os.listdir(self.snapshots_dir)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.snapshots_dir, name), 'r', encoding='utf-8') as f:
+                    snapshots.append(ConfigSnapshot(**json.load(f)))
+            except (OSError, ValueError, TypeError):
+                continue
+        return snapshots
+    
+    def latest(self) -> Optional[ConfigSnapshot]:
+        snapshots = self.list()
+        return snapshots[-1] if snapshots else None
+    
+    def find(self, snapshot_id: str) -> Optional[ConfigSnapshot]:
+        """Newest snapshot whose id starts with snapshot_id"""
+        matches = [s for s in self.list() if s.id.startswith(snapshot_id)]
+        return matches[-1] if matches else None
+    
+    def read_config(self, snapshot: ConfigSnapshot, name: str) -> Dict[str, Dict[str, Any]]:
+        digest = snapshot.files.get(name)
+        if digest is None:
+            return {}
+        return parse_uci_config(self.get_object(digest).decode('utf-8', 'replace'))
+    
+    def diff(self, before: ConfigSnapshot, after: ConfigSnapshot) -> ConfigDiff:
+        """Section-level UCI diff; files whose hash did not change are not even read"""
+        diff = ConfigDiff(before.id, after.id)
+        for name in sorted(set(before.files) | set(after.files)):
+            if before.files.get(name) != after.files.get(name):
+                diff.changes += diff_sections(name, self.read_config(before, name), self.read_config(after, name))
+        return diff
+
+class ConfigSnapshotter:
+    """Take snapshots of a router's /etc/config into a ConfigStore.
+    
+    Every snapshot starts with one `md5sum` of the config files. If nothing
+    changed since the latest snapshot that is all it costs; otherwise only
+    the changed files are fetched, as one tar stream over a single exec.
+    """
+    
+    def __init__(self, manager, store: ConfigStore, config_dir: str = CONFIG_DIR):
+        self.manager = manager
+        self.store = store
+        self.config_dir = config_dir
+    
+    def checksums(self) -> Dict[str, str]:
+        stdout, stderr, exit_code = self.manager.execute_command(
+            f"md5sum {shlex.quote(self.config_dir)}/*", use_cache=False
+        )
+        if exit_code != 0:
+            raise RuntimeError(f"Failed to checksum {self.config_dir}: {stderr.strip() or exit_code}")
+        return parse_md5sums(stdout)
+    
+    def fetch(self, names: List[str]) -> Dict[str, bytes]:
+        """Contents of the named config files, pulled as one tar archive"""
+        command = f"tar -cf - -C {shlex.quote(self.config_dir)} " + " ".join(shlex.quote(n) for n in names)
+        stdout, stderr, exit_code = self.manager.execute_command_output(command, timeout=60)
+        try:
+            if exit_code != 0:
+                raise RuntimeError(f"Failed to read {self.config_dir}: "
+                                   f"{stderr.text().strip() or exit_code}")
+            archive = io.BytesIO(b"".join(stdout.iter_bytes()))
+        finally:
+            stdout.close()
+            stderr.close()
+        
+        contents = {}
+        with tarfile.open(fileobj=archive, mode='r:') as tar:
+            for member in tar.getmembers():
+                if member.isfile():
+                    contents[os.path.basename(member.name)] = tar.extractfile(member).read()
+        return contents
+    
+    def take(self, label: str = "") -> ConfigSnapshot:
+        """Snapshot the config, returning the latest snapshot unchanged if the checksums all match"""
+        checksums = self.checksums()
+        latest = self.store.latest()
+        if latest is not None and latest.checksums == checksums:
+            return latest
+        
+        files, sums = {}, {}
+        changed = [name for name in checksums if latest is None or latest.checksums.get(name) != checksums[name]]
+        for name in checksums:
+            if name not in changed:
+                files[name], sums[name] = latest.files[name], latest.checksums[name]
+        for name, data in (self.fetch(changed) if changed else {}).items():
+            files[name] = self.store.put_object(data)
+            # Checksum what was actually fetched, in case the file changed in between
+            sums[name] = hashlib.md5(data).hexdigest()
+        
+        snapshot = ConfigSnapshot(snapshot_id(files), time.time(), label, files, sums)
+        self.store.save(snapshot)
+        return snapshot
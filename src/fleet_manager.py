@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field, fields
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+from router_manager import OpenWrtManager, RouterConfig
+
+@dataclass
+class HostResult:
+    name: str
+    host: str
+    success: bool
+    result: Any = None
+    error: str = ""
+    duration: float = 0.0
+
+@dataclass
+class FleetSummary:
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    duration: float = 0.0
+    slowest_host: str = ""
+    slowest_duration: float = 0.0
+    failures: Dict[str, str] = field(default_factory=dict)
+
+def load_inventory(path: str) -> Dict[str, RouterConfig]:
+    """Read a JSON inventory into {name: RouterConfig}.
+    
+    Format: {"defaults": {...}, "routers": [{"name": "office", "host": "10.0.0.1"}, ...]}.
+    Entries take RouterConfig field names; "password_env" names an environment
+    variable holding the password so it does not have to live in the file.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    
+    if isinstance(data, list):
+        data = {"routers": data}
+    
+    known_fields = {f.name for f in fields(RouterConfig)}
+    defaults = data.get("defaults", {})
+    routers = {}
+    for entry in data.get("routers", []):
+        merged = {**defaults, **entry}
+        password_env = merged.pop("password_env", None)
+        if password_env:
+            merged["password"] = os.getenv(password_env, "")
+        
+        name = merged.pop("name", None) or merged.get("host")
+        if name in routers:
+            raise ValueError(f"Duplicate router name in inventory: {name}")
+        routers[name] = RouterConfig(**{k: v for k, v in merged.items() if k in known_fields})
+    
+    return routers
+
+class FleetManager:
+    """Run OpenWrtManager operations across many routers at once.
+    
+    One OpenWrtManager per router; at most max_concurrency hosts are worked on at
+    the same time and each host gets host_timeout seconds (connect included).
+    Results are yielded as each host finishes, so a fleet-wide call takes about as
+    long as the slowest router rather than the sum of all of them.
+    """
+    
+    def __init__(self, routers: Dict[str, RouterConfig], max_concurrency: int = 8,
+                 host_timeout: float = 60):
+        self.managers = {name: OpenWrtManager(config) for name, config in routers.items()}
+        self.max_concurrency = max(1, max_concurrency)
+        self.host_timeout = host_timeout
+    
+    @classmethod
+    def from_inventory(cls, path: str, **kwargs) -> "FleetManager":
+        """Create a fleet from a JSON inventory file (see load_inventory)"""
+        return cls(load_inventory(path), **kwargs)
+    
+    def connect_all(self) -> Dict[str, bool]:
+        """Connect to every router concurrently, returning {name: connected}"""
+        return {r.name: r.success for r in self.run(lambda manager: True)}
+    
+    def disconnect_all(self):
+        """Close every router connection"""
+        for manager in self.managers.values():
+            manager.disconnect()
+    
+    def run(self, operation: Union[str, Callable[..., Any]], *args,
+            hosts: Optional[List[str]] = None, **kwargs) -> Iterator[HostResult]:
+        """Call an OpenWrtManager method (by name) or a callable(manager, ...) on each host.
+        
+        Yields a HostResult per host in completion order. Hosts still running
+        when their timeout expires are reported as failed and disconnected, which
+        unblocks the stuck worker thread; the next run reconnects them.
+        """
+        names = hosts if hosts is not None else list(self.managers)
+        if not names:
+            return
+        
+        if isinstance(operation, str):
+            if not callable(getattr(OpenWrtManager, operation, None)):
+                raise AttributeError(f"OpenWrtManager has no method {operation}")
+            method_name = operation
+            operation = lambda manager, *a, **kw: getattr(manager, method_name)(*a, **kw)
+        
+        started = {}
+        
+        def task(name: str) -> HostResult:
+            manager = self.managers[name]
+            started[name] = time.monotonic()
+            try:
+                if not manager.connected and not manager.connect():
+                    return HostResult(name, manager.config.host, False, error="Failed to connect")
+                result = operation(manager, *args, **kwargs)
+                return HostResult(name, manager.config.host, self._succeeded(result), result)
+            except Exception as e:
+                return HostResult(name, manager.config.host, False, error=str(e))
+        
+        executor = ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(names)))
+        try:
+            pending = {executor.submit(task, name): name for name in names}
+            while pending:
+                done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    name = pending.pop(future)
+                    result = future.result()
+                    result.duration = time.monotonic() - started[name]
+                    if not result.success and not result.error:
+                        result.error = self._describe_failure(result.result)
+                    yield result
+                
+                now = time.monotonic()
+                for future, name in list(pending.items()):
+                    if name in started and now - started[name] > self.host_timeout:
+                        del pending[future]
+                        manager = self.managers[name]
+                        manager.disconnect()
+                        yield HostResult(name, manager.config.host, False,
+                                         error=f"Timed out after {self.host_timeout}s",
+                                         duration=now - started[name])
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def run_command(self, command: str, timeout: int = 30,
+                    hosts: Optional[List[str]] = None) -> Iterator[HostResult]:
+        """Run a raw shell command on each host; result is (stdout, stderr, exit_code)"""
+        return self.run("execute_command", command, timeout, hosts=hosts)
+    
+    def run_all(self, operation: Union[str, Callable[..., Any]], *args,
+                **kwargs) -> Tuple[Dict[str, HostResult], FleetSummary]:
+        """Run an operation everywhere and wait, returning per-host results and a summary"""
+        start = time.monotonic()
+        results = {r.name: r for r in self.run(operation, *args, **kwargs)}
+        summary = self.summarize(results.values())
+        summary.duration = time.monotonic() - start
+        return results, summary
+    
+    @staticmethod
+    def summarize(results) -> FleetSummary:
+        """Aggregate HostResults into success/failure counts"""
+        summary = FleetSummary()
+        for result in results:
+            summary.total += 1
+            if result.success:
+                summary.succeeded += 1
+            else:
+                summary.failed += 1
+                summary.failures[result.name] = result.error
+            if result.duration >= summary.slowest_duration:
+                summary.slowest_host = result.name
+                summary.slowest_duration = result.duration
+        return summary
+    
+    @staticmethod
+    def _succeeded(result: Any) -> bool:
+        # Match the conventions of OpenWrtManager's return values; Optional results
+        # (backup(), get_system_info(), ...) are None on failure
+        if result is None:
+            return False
+        if isinstance(result, bool):
+            return result
+        if isinstance(result, tuple) and len(result) == 3 and isinstance(result[2], int):
+            return result[2] == 0
+        return True
+    
+    @staticmethod
+    def _describe_failure(result: Any) -> str:
+        if isinstance(result, tuple) and len(result) == 3:
+            return (result[1] or "").strip() or f"Exit code {result[2]}"
+        if result is None:
+            return "Operation returned no result"
+        return "Operation returned False"
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+
+import hashlib
+import os
+import re
+import shlex
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+from router_parsers import LogRecord
+
+DEFAULT_LOG_INDEX_NAME = "logs.sqlite"
+
+# `logread | grep [-i] term` and `logread -e term`, the usual ways of searching the log on the router
+_LOG_GREP_COMMAND = re.compile(
+    r'^logread\s*(?:\|\s*grep\s+(?P<ignore_case>-i\s+)?(?P<grep>.+?)|-e\s+(?P<expr>.+?))\s*$'
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY,
+    router TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    facility TEXT NOT NULL,
+    level TEXT NOT NULL,
+    daemon TEXT NOT NULL,
+    pid INTEGER,
+    raw TEXT NOT NULL,
+    message_offset INTEGER NOT NULL,  -- the message is raw[message_offset:]
+    digest INTEGER NOT NULL  -- 64-bit hash of raw, for spotting replayed lines without a second copy of it
+);
+CREATE INDEX IF NOT EXISTS logs_router_time ON logs (router, timestamp);
+CREATE INDEX IF NOT EXISTS logs_router_daemon_time ON logs (router, daemon, timestamp);
+CREATE TABLE IF NOT EXISTS collectors (router TEXT PRIMARY KEY, heartbeat REAL NOT NULL);
+"""
+
+# External-content FTS5 index over a view of logs, kept in step by triggers
+FTS_SCHEMA = """
+CREATE VIEW IF NOT EXISTS log_messages AS SELECT id, daemon, substr(raw, message_offset + 1) AS message FROM logs;
+CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5(daemon, message, content='log_messages', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS logs_fts_insert AFTER INSERT ON logs BEGIN
+    INSERT INTO logs_fts (rowid, daemon, message)
+    VALUES (new.id, new.daemon, substr(new.raw, new.message_offset + 1));
+END;
+CREATE TRIGGER IF NOT EXISTS logs_fts_delete AFTER DELETE ON logs BEGIN
+    INSERT INTO logs_fts (logs_fts, rowid, daemon, message)
+    VALUES ('delete', old.id, old.daemon, substr(old.raw, old.message_offset + 1));
+END;
+"""
+
+def _digest(raw: str) -> int:
+    return int.from_bytes(hashlib.blake2b(raw.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query: every word must appear, as a word prefix"""
+    words = [word.replace('"', '""') for word in text.split()]
+    return " ".join(f'"{word}"*' for word in words)
+
+def log_search_terms(command: str) -> Optional[Tuple[str, bool]]:
+    """(fixed string, ignore case) of a simple logread grep command; None for anything else"""
+    match = _LOG_GREP_COMMAND.match(command.strip())
+    if not match:
+        return None
+    try:
+        words = shlex.split(match.group('grep') or match.group('expr'))
+    except ValueError:
+        return None
+    if len(words) != 1 or not words[0] or '|' in words[0] or any(c in words[0] for c in '^$[]()\\*?+{}'):
+        return None
+    return words[0], bool(match.group('ignore_case'))
+
+def skip_indexed(records: Iterable[LogRecord], indexed: Counter) -> List[LogRecord]:
+    """records minus the lines LogIndex.indexed_counts() says are stored already.
+    
+    Counts are consumed as lines match, so a line that really was logged twice
+    is only dropped as often as it is already indexed.
+    """
+    fresh = []
+    for record in records:
+        digest = _digest(record.raw)
+        if indexed[digest] > 0:
+            indexed[digest] -= 1
+        else:
+            fresh.append(record)
+    return fresh
+
+def replay_start(records: List[LogRecord]) -> float:
+    """Earliest timestamp in a replayed batch, to pass to LogIndex.indexed_counts()"""
+    return min((record.timestamp for record in records if record.timestamp), default=0.0)
+
+def format_log_records(records: Iterable[LogRecord]) -> str:
+    return "".join(record.raw + "\n" for record in records)
+
+def log_grep_note(records: List[LogRecord], truncated: bool) -> str:
+    """stderr for a LogIndex.grep() answer: says so when older matches were left out"""
+    if not truncated:
+        return ""
+    return f"Only the newest {len(records)} matching lines are shown; older matches were left out\n"
+
+class LogIndex:
+    """Host-side syslog history for any number of routers, searchable with SQLite FTS5.
+    
+    Records are keyed by router name. Identical lines are all kept; callers
+    that replay part of a log (after a restart or reconnect) drop the overlap
+    with indexed_counts() and skip_indexed() first. Without FTS5 in the local
+    SQLite build, search() falls back to LIKE scans.
+    """
+    
+    def __init__(self, path: str, retention_days: float = 90):
+        self.path = path
+        self.retention = retention_days * 86400
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        try:
+            self._db.executescript(FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            self.has_fts = False
+        self._lock = threading.Lock()
+        self._followers = []
+    
+    def close(self):
+        for stop, thread in self._followers:
+            stop.set()
+            thread.join(5)
+        self._followers = []
+        self._db.close()
+    
+    def add(self, router: str, records: Iterable[LogRecord]) -> int:
+        """Index records for router in one transaction, returning how many were added"""
+        rows = [(router, r.timestamp, r.facility, r.level, r.daemon, r.pid, r.raw,
+                 len(r.raw) - len(r.message), _digest(r.raw)) for r in records]
+        with self._lock, self._db:
+            cursor = self._db.executemany(
+                "INSERT INTO logs (router, timestamp, facility, level, daemon, pid, raw, message_offset, "
+                "digest) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            added = max(cursor.rowcount, 0)
+            self._db.execute("INSERT OR REPLACE INTO collectors VALUES (?, ?)", (router, time.time()))
+        return added
+    
+    def indexed_counts(self, router: str, since: float) -> Counter:
+        """How many times each line (by digest) is already indexed for router at or after since"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT digest, count(*) FROM logs WHERE router = ? AND timestamp >= ? GROUP BY digest",
+                (router, since)
+            ).fetchall()
+        return Counter(dict(rows))
+    
+    def is_live(self, router: str, max_age: float = 60) -> bool:
+        """True if something indexed router's log within max_age seconds"""
+        with self._lock:
+            row = self._db.execute("SELECT heartbeat FROM collectors WHERE router = ?", (router,)).fetchone()
+        return row is not None and time.time() - row[0] <= max_age
+    
+    def search(self, text: str = "", router: Optional[str] = None, daemon: Optional[str] = None,
+               level: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+               limit: int = 100) -> List[LogRecord]:
+        """The newest limit records matching every filter, returned oldest first.
+        
+        text matches words (or word prefixes) in the daemon name and message.
+        """
+        where, params = [], []
+        if text.strip():
+            if self.has_fts:
+                where.append("logs.id IN (SELECT rowid FROM logs_fts WHERE logs_fts MATCH ?)")
+                params.append(fts_query(text))
+            else:
+                for word in text.split():
+                    where.append("(substr(raw, message_offset + 1) LIKE ? OR daemon LIKE ?)")
+                    params += [f"%{word}%", f"%{word}%"]
+        for column, value in (('router', router), ('daemon', daemon), ('level', level)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            where.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("timestamp < ?")
+            params.append(until)
+        
+        sql = ("SELECT timestamp, facility, level, daemon, pid, substr(raw, message_offset + 1), raw FROM logs"
+               + (" WHERE " + " AND ".join(where) if where else "")
+               + " ORDER BY timestamp DESC, id DESC LIMIT ?")
+        with self._lock:
+            rows = self._db.execute(sql, params + [int(limit)]).fetchall()
+        return [LogRecord(*row) for row in reversed(rows)]
+    
+    def grep(self, text: str, router: str, ignore_case: bool = False,
+             limit: int = 1000) -> Tuple[List[LogRecord], bool]:
+        """Records whose whole line matches text as `logread | grep [-i] text` would match it.
+        
+        text is a literal apart from '.', which matches any character as in
+        grep. Unlike search() this is a substring scan, not a word-prefix FTS
+        match. Returns the newest limit records (oldest first) and whether
+        older matches were left out.
+        """
+        pattern = re.compile(".".join(re.escape(part) for part in text.split(".")), re.I if ignore_case else 0)
+        # Narrow the scan in SQL by the longest literal piece, then match exactly
+        literal = max(text.split("."), key=len)
+        if not literal:
+            condition, params = "", ()
+        elif ignore_case:
+            escaped = literal.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            condition, params = " AND raw LIKE ? ESCAPE '\\'", (f"%{escaped}%",)
+        else:
+            condition, params = " AND instr(raw, ?) > 0", (literal,)
+        sql = ("SELECT timestamp, facility, level, daemon, pid, substr(raw, message_offset + 1), raw FROM logs "
+               f"WHERE router = ?{condition} ORDER BY timestamp DESC, id DESC")
+        
+        rows = []
+        with self._lock:
+            for row in self._db.execute(sql, (router, *params)):
+                if pattern.search(row[6]):
+                    rows.append(row)
+                    if len(rows) > limit:
+                        break
+        truncated = len(rows) > limit
+        return [LogRecord(*row) for row in reversed(rows[:limit])], truncated
+    
+    def prune(self) -> int:
+        """Drop records older than the retention period, returning how many went"""
+        with self._lock, self._db:
+            cursor = self._db.execute("DELETE FROM logs WHERE timestamp < ?", (time.time() - self.retention,))
+        return cursor.rowcount
+    
+    def follow(self, tailer, router: str, batch_interval: float = 1.0):
+        """Index everything a LogTailer has seen and keeps seeing, batching writes on a background thread"""
+        subscription = tailer.subscribe(maxlen=10000)
+        stop = threading.Event()
+        
+        def run():
+            # The tailer's history may overlap what an earlier run already indexed
+            history = tailer.recent()
+            self.add(router, skip_indexed(history, self.indexed_counts(router, replay_start(history))))
+            last_prune = last_write = time.monotonic()
+            while not stop.is_set():
+                first = subscription.get(timeout=batch_interval)
+                records = ([first] if first is not None else []) + subscription.drain()
+                # Quiet logs still get a periodic write: the heartbeat tells other processes the index is current
+                if records or time.monotonic() - last_write > 15:
+                    self.add(router, records)
+                    last_write = time.monotonic()
+                if time.monotonic() - last_prune > 3600:
+                    self.prune()
+                    last_prune = time.monotonic()
+                stop.wait(batch_interval)
+            tailer.unsubscribe(subscription)
+        
+        thread = threading.Thread(target=run, name=f"log-index-{router}", daemon=True)
+        self._followers.append((stop, thread))
+        thread.start()
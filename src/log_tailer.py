@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+import threading
+from collections import deque
+from typing import Callable, List, Optional
+from router_parsers import LogRecord, parse_logread_line
+
+LOGREAD_FOLLOW_COMMAND = "logread -f"
+# After a reconnect only this many lines are replayed; records seen before the gap are skipped
+RESUME_LINES = 50
+
+class LogSubscription:
+    """A subscriber's bounded queue of LogRecords; when full the oldest record is dropped"""
+    
+    def __init__(self, maxlen: int = 1000, predicate: Optional[Callable[[LogRecord], bool]] = None):
+        self.predicate = predicate
+        self.dropped = 0
+        self._queue = deque(maxlen=max(1, maxlen))
+        self._ready = threading.Condition()
+    
+    def put(self, record: LogRecord):
+        if self.predicate is not None and not self.predicate(record):
+            return
+        with self._ready:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append(record)
+            self._ready.notify()
+    
+    def get(self, timeout: Optional[float] = None) -> Optional[LogRecord]:
+        """Next record, waiting up to timeout; None if nothing arrived"""
+        with self._ready:
+            if not self._queue:
+                self._ready.wait(timeout)
+            return self._queue.popleft() if self._queue else None
+    
+    def drain(self) -> List[LogRecord]:
+        """Everything queued so far, without waiting"""
+        with self._ready:
+            records = list(self._queue)
+            self._queue.clear()
+            return records
+    
+    def __len__(self) -> int:
+        return len(self._queue)
+
+class LogTailer:
+    """Follow the router's syslog over one long-lived `logread -f` exec channel.
+    
+    The first connect replays the whole ring buffer into `history`; from then on
+    each new line is parsed once and handed to every subscription. If the stream
+    drops it is reopened with only the last RESUME_LINES lines, and lines
+    already seen are skipped, so the full log is never fetched again.
+    """
+    
+    def __init__(self, manager, history: int = 2000, retry_interval: float = 5.0):
+        self.manager = manager
+        self.retry_interval = retry_interval
+        self.history = deque(maxlen=history)
+        self.records_seen = 0
+        self.reconnects = 0
+        self.last_error = ""
+        self._subscriptions: List[LogSubscription] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._stream = None
+        self._thread = None
+    
+    def subscribe(self, maxlen: int = 1000,
+                  predicate: Optional[Callable[[LogRecord], bool]] = None) -> LogSubscription:
+        """New queue receiving every record from now on (optionally only those matching predicate)"""
+        subscription = LogSubscription(maxlen, predicate)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: LogSubscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+    
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self):
+        """Open the stream and follow it in the background"""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="log-tailer", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: Optional[float] = None):
+        """Close the stream and wait for the reader thread"""
+        self._stop.set()
+        stream = self._stream
+        if stream is not None:
+            stream.close()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def recent(self, count: Optional[int] = None) -> List[LogRecord]:
+        """The newest count records (all of history by default), oldest first"""
+        with self._lock:
+            records = list(self.history)
+        return records if count is None else records[-count:] if count > 0 else []
+    
+    def _run(self):
+        while not self._stop.is_set():
+            resume = bool(self.history)
+            command = f"{LOGREAD_FOLLOW_COMMAND} -l {RESUME_LINES}" if resume else LOGREAD_FOLLOW_COMMAND
+            seen = {record.raw for record in self.recent(RESUME_LINES)} if resume else set()
+            try:
+                self._stream = self.manager.stream_command(command, timeout=None)
+                with self._stream as stream:
+                    for line in stream:
+                        if self._stop.is_set():
+                            break
+                        record = parse_logread_line(line)
+                        if seen:
+                            if record.raw in seen:
+                                continue
+                            # First line past the overlap; nothing older can follow
+                            seen = set()
+                        self._publish(record)
+                if not self._stop.is_set():
+                    self.last_error = stream.stderr.strip() or f"logread exited ({stream.exit_code})"
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                self.last_error = str(e)
+            finally:
+                self._stream = None
+            
+            if self._stop.wait(self.retry_interval):
+                break
+            self.reconnects += 1
+    
+    def _publish(self, record: LogRecord):
+        with self._lock:
+            self.history.append(record)
+            self.records_seen += 1
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.put(record)
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+MINUTE = 60
+HOUR = 3600
+DAY = 86400
+
+# (timestamp, average, minimum, maximum)
+MetricPoint = Tuple[float, float, float, float]
+
+# Rollups are stored a block at a time: one row per metric and hour holds its 60 minutes,
+# one row per metric and day its 24 hours. Each slot is (count, sum, min, max) as float32,
+# 16 bytes instead of the ~40 a row per bucket costs in SQLite.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metrics (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS minute_blocks (
+    metric INTEGER NOT NULL, start INTEGER NOT NULL, slots BLOB NOT NULL,
+    PRIMARY KEY (metric, start)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS hour_blocks (
+    metric INTEGER NOT NULL, start INTEGER NOT NULL, slots BLOB NOT NULL,
+    PRIMARY KEY (metric, start)
+) WITHOUT ROWID;
+"""
+# resolution -> (table, seconds per block)
+TIERS = {MINUTE: ("minute_blocks", HOUR), HOUR: ("hour_blocks", DAY)}
+
+def _empty_block(resolution: int) -> array:
+    return array('f', bytes(4 * 4 * (TIERS[resolution][1] // resolution)))
+
+class RingBuffer:
+    """Fixed-size (timestamp, value) history in two preallocated double arrays"""
+    
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self.times = array('d', [0.0] * self.capacity)
+        self.values = array('d', [0.0] * self.capacity)
+        self.count = 0
+        self._next = 0
+    
+    def append(self, timestamp: float, value: float):
+        self.times[self._next] = timestamp
+        self.values[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+    
+    @property
+    def oldest(self) -> Optional[float]:
+        if not self.count:
+            return None
+        return self.times[(self._next - self.count) % self.capacity]
+    
+    def range(self, start: float, end: float) -> List[MetricPoint]:
+        """Samples with start <= timestamp < end, oldest first"""
+        points = []
+        for i in range(self.count):
+            index = (self._next - self.count + i) % self.capacity
+            timestamp = self.times[index]
+            if start <= timestamp < end:
+                value = self.values[index]
+                points.append((timestamp, value, value, value))
+        return points
+
+class MetricsStore:
+    """Per-router metric history: raw samples in memory, rollups in SQLite.
+    
+    The newest ring_capacity samples of each metric stay in a RingBuffer. Each
+    minute is folded into a count/sum/min/max slot when it closes, and each
+    hour into a slot built from its minutes. With the default retention a
+    metric costs about 70 KB of minutes and 35 KB of hours, so the ~46
+    metrics of a router with ten interfaces fit in about 5 MB. query()
+    answers from whichever tier covers the range at the requested resolution.
+    """
+    
+    def __init__(self, path: str, ring_capacity: int = 3600, minute_retention_days: float = 3,
+                 hour_retention_days: float = 90):
+        self.path = path
+        self.ring_capacity = ring_capacity
+        self.minute_retention = minute_retention_days * 86400
+        self.hour_retention = hour_retention_days * 86400
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._ids = {name: metric_id for metric_id, name in self._db.execute("SELECT id, name FROM metrics")}
+        self._rings: Dict[str, RingBuffer] = {}
+        self._minutes: Dict[str, List[float]] = {}  # name -> [bucket, count, sum, min, max] of the open minute
+        self._hour = None
+        self._lock = threading.Lock()
+    
+    def _metric_id(self, name: str) -> int:
+        if name not in self._ids:
+            cursor = self._db.execute("INSERT OR IGNORE INTO metrics (name) VALUES (?)", (name,))
+            self._ids[name] = cursor.lastrowid or self._db.execute(
+                "SELECT id FROM metrics WHERE name = ?", (name,)).fetchone()[0]
+        return self._ids[name]
+    
+    def record(self, name: str, value: float, timestamp: Optional[float] = None):
+        """Add one sample"""
+        self.record_many({name: value}, timestamp)
+    
+    def record_many(self, values: Dict[str, float], timestamp: Optional[float] = None):
+        """Add samples for several metrics taken at the same time"""
+        timestamp = time.time() if timestamp is None else timestamp
+        bucket = int(timestamp // MINUTE) * MINUTE
+        with self._lock:
+            closed = []
+            for name, value in values.items():
+                ring = self._rings.get(name)
+                if ring is None:
+                    ring = self._rings[name] = RingBuffer(self.ring_capacity)
+                ring.append(timestamp, value)
+                
+                minute = self._minutes.get(name)
+                if minute is not None and minute[0] != bucket:
+                    closed.append((name, minute))
+                    minute = None
+                if minute is None:
+                    self._minutes[name] = [bucket, 1, value, value, value]
+                else:
+                    minute[1] += 1
+                    minute[2] += value
+                    minute[3] = min(minute[3], value)
+                    minute[4] = max(minute[4], value)
+            
+            if closed:
+                self._write_minutes(closed)
+            hour = int(timestamp // HOUR) * HOUR
+            if self._hour is not None and hour != self._hour:
+                # Metrics not seen this tick may still hold an open minute of the old hour
+                stale = [(n, m) for n, m in self._minutes.items() if m[0] < hour]
+                if stale:
+                    self._write_minutes(stale)
+                    for n, _ in stale:
+                        del self._minutes[n]
+                self._roll_up_hour(self._hour)
+            self._hour = hour
+    
+    def _read_block(self, resolution: int, metric_id: int, start: int) -> array:
+        table = TIERS[resolution][0]
+        row = self._db.execute(f"SELECT slots FROM {table} WHERE metric = ? AND start = ?",
+                               (metric_id, start)).fetchone()
+        block = _empty_block(resolution)
+        if row is not None and len(row[0]) == len(block) * 4:
+            block = array('f', row[0])
+        return block
+    
+    def _write_block(self, resolution: int, metric_id: int, start: int, block: array):
+        table = TIERS[resolution][0]
+        self._db.execute(f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?)", (metric_id, start, block.tobytes()))
+    
+    def _write_minutes(self, minutes: List[Tuple[str, List[float]]]):
+        with self._db:
+            for name, (bucket, count, total, low, high) in minutes:
+                metric_id = self._metric_id(name)
+                start = int(bucket // HOUR) * HOUR
+                block = self._read_block(MINUTE, metric_id, start)
+                i = 4 * int((bucket - start) // MINUTE)
+                # A minute written by flush() may get more samples before it closes
+                if block[i]:
+                    low, high = min(low, block[i + 2]), max(high, block[i + 3])
+                block[i:i + 4] = array('f', (block[i] + count, block[i + 1] + total, low, high))
+                self._write_block(MINUTE, metric_id, start, block)
+    
+    def _roll_up_hour(self, hour: int):
+        now = time.time()
+        day = int(hour // DAY) * DAY
+        i = 4 * ((hour - day) // HOUR)
+        with self._db:
+            for metric_id, slots in self._db.execute(
+                    "SELECT metric, slots FROM minute_blocks WHERE start = ?", (hour,)).fetchall():
+                minutes = array('f', slots)
+                filled = [minutes[j:j + 4] for j in range(0, len(minutes), 4) if minutes[j]]
+                if not filled:
+                    continue
+                block = self._read_block(HOUR, metric_id, day)
+                block[i:i + 4] = array('f', (sum(s[0] for s in filled), sum(s[1] for s in filled),
+                                             min(s[2] for s in filled), max(s[3] for s in filled)))
+                self._write_block(HOUR, metric_id, day, block)
+            self._db.execute("DELETE FROM minute_blocks WHERE start + ? <= ?", (HOUR, now - self.minute_retention))
+            self._db.execute("DELETE FROM hour_blocks WHERE start + ? <= ?", (DAY, now - self.hour_retention))
+    
+    def flush(self):
+        """Write the open minutes (and their hour) to disk"""
+        with self._lock:
+            if self._minutes:
+                self._write_minutes(list(self._minutes.items()))
+                self._minutes = {}
+            if self._hour is not None:
+                self._roll_up_hour(self._hour)
+    
+    def close(self):
+        self.flush()
+        self._db.close()
+    
+    def metrics(self) -> List[str]:
+        """Names of every metric with stored data"""
+        with self._lock:
+            return sorted(set(self._ids) | set(self._rings))
+    
+    def query(self, name: str, start: float, end: Optional[float] = None,
+              resolution: Optional[int] = None) -> List[MetricPoint]:
+        """Points for start <= t < end as (timestamp, avg, min, max), oldest first.
+        
+        resolution is 1 (raw), 60 or 3600 seconds; by default the finest tier
+        that still holds start is used.
+        """
+        end = time.time() if end is None else end
+        with self._lock:
+            ring = self._rings.get(name)
+            if resolution is None:
+                if ring is not None and ring.oldest is not None and ring.oldest <= start:
+                    resolution = 1
+                elif start >= time.time() - self.minute_retention:
+                    resolution = MINUTE
+                else:
+                    resolution = HOUR
+            
+            if resolution == 1:
+                return ring.range(start, end) if ring is not None else []
+            
+            table, span = TIERS[resolution]
+            metric_id = self._ids.get(name)
+            first = int(start // resolution) * resolution
+            points = []
+            if metric_id is not None:
+                for block_start, slots in self._db.execute(
+                        f"SELECT start, slots FROM {table} WHERE metric = ? AND start > ? AND start < ? ORDER BY start",
+                        (metric_id, first - span, end)):
+                    block = array('f', slots)
+                    for i in range(0, len(block), 4):
+                        bucket = block_start + (i // 4) * resolution
+                        count = block[i]
+                        if count and first <= bucket < end:
+                            points.append((float(bucket), block[i + 1] / count, block[i + 2], block[i + 3]))
+            
+            # The minute still being collected has not reached the disk yet
+            minute = self._minutes.get(name)
+            if resolution == MINUTE and minute is not None and start <= minute[0] + MINUTE and minute[0] < end:
+                points.append((float(minute[0]), minute[2] / minute[1], minute[3], minute[4]))
+            return points
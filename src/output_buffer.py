@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+import tempfile
+from typing import BinaryIO, Iterator, Optional
+
+class BoundedOutput:
+    """Byte sink that keeps the first head_bytes and last tail_bytes in memory.
+    
+    Everything in between goes to an anonymous temp file, so memory stays flat
+    however much a command prints. total_bytes counts all of it, and the spilled
+    middle stays readable through open_middle() until close().
+    """
+    
+    def __init__(self, head_bytes: int = 256 * 1024, tail_bytes: int = 256 * 1024):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total_bytes = 0
+        self.spilled_bytes = 0
+        self._spill: Optional[BinaryIO] = None
+    
+    def write(self, data: bytes):
+        self.total_bytes += len(data)
+        room = self.head_bytes - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if not data:
+            return
+        
+        self.tail += data
+        overflow = len(self.tail) - self.tail_bytes
+        if overflow > 0:
+            if self._spill is None:
+                self._spill = tempfile.TemporaryFile(prefix="routertools-")
+            self._spill.write(self.tail[:overflow])
+            self.spilled_bytes += overflow
+            del self.tail[:overflow]
+    
+    @property
+    def truncated(self) -> bool:
+        """True when part of the output is only on disk"""
+        return self.spilled_bytes > 0
+    
+    def last(self, size: int) -> bytes:
+        """The final size bytes of the output (from memory; size must not exceed tail_bytes)"""
+        if size <= 0:
+            return b""
+        if self.truncated or len(self.tail) >= size:
+            return bytes(self.tail[-size:])
+        return bytes(self.head[len(self.head) - (size - len(self.tail)):]) + bytes(self.tail)
+    
+    def text(self, skip_head: int = 0, drop_tail: int = 0) -> str:
+        """Decode what is in memory, noting the omitted middle if anything spilled.
+        
+        skip_head/drop_tail cut bytes off the very start and end of the output
+        (e.g. framing sentinels); drop_tail must lie within the tail.
+        """
+        if not self.truncated:
+            data = bytes(self.head + self.tail)
+            return data[skip_head:len(data) - drop_tail].decode('utf-8', 'replace')
+        
+        head = bytes(self.head[skip_head:]).decode('utf-8', 'replace')
+        tail = bytes(self.tail[:len(self.tail) - drop_tail]).decode('utf-8', 'replace')
+        return f"{head}\n... [{self.spilled_bytes} bytes omitted of {self.total_bytes}] ...\n{tail}"
+    
+    def open_middle(self) -> Optional[BinaryIO]:
+        """The spilled middle part, rewound for reading once writing is done (None if nothing spilled)"""
+        if self._spill is None:
+            return None
+        self._spill.flush()
+        self._spill.seek(0)
+        return self._spill
+    
+    def iter_bytes(self, chunk_size: int = 65536) -> Iterator[bytes]:
+        """Yield the complete output, reading the middle back from disk"""
+        yield bytes(self.head)
+        middle = self.open_middle()
+        if middle is not None:
+            while True:
+                chunk = middle.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        yield bytes(self.tail)
+    
+    def close(self):
+        """Delete the spill file"""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import requests
+from router_parsers import parse_control_file, parse_depends
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "routertools")
+
+OPKG_STATUS_PATH = "/usr/lib/opkg/status"
+# Prints "<md5>  <path>", a few dozen bytes however many packages are installed. Only md5sum:
+# busybox builds of OpenWrt usually lack `stat` (it comes with coreutils-stat)
+OPKG_STATUS_FINGERPRINT_COMMAND = f"md5sum {OPKG_STATUS_PATH}"
+# Used when the status file cannot be fingerprinted or read
+OPKG_LIST_INSTALLED_COMMAND = "opkg list-installed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feeds (
+    name TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS packages (
+    feed TEXT NOT NULL,
+    name TEXT NOT NULL,
+    version TEXT NOT NULL,
+    depends TEXT NOT NULL DEFAULT '',
+    size INTEGER NOT NULL DEFAULT 0,
+    installed_size INTEGER NOT NULL DEFAULT 0,
+    section TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT '',
+    filename TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS packages_name ON packages (name);
+"""
+
+@dataclass
+class PackageInfo:
+    name: str
+    version: str
+    depends: List[str]
+    size: int
+    installed_size: int
+    section: str
+    description: str
+    feed: str
+    filename: str
+    
+    @property
+    def summary(self) -> str:
+        return self.description.split('\n', 1)[0]
+
+class PackageIndex:
+    """Host-side copy of the router's opkg feed indexes, stored in SQLite.
+    
+    refresh() fetches each feed's Packages.gz straight from the feed server
+    (not through the router) with If-None-Match/If-Modified-Since, so an
+    unchanged feed costs one 304. Queries never touch the router.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self.session = requests.Session()
+    
+    def close(self):
+        self.session.close()
+        self._db.close()
+    
+    def age(self) -> float:
+        """Seconds since the oldest feed was last checked (inf if never)"""
+        row = self._db.execute("SELECT MIN(fetched_at), COUNT(*) FROM feeds").fetchone()
+        return time.time() - row[0] if row[1] else float('inf')
+    
+    def refresh(self, feeds: Dict[str, str], timeout: float = 30) -> Dict[str, str]:
+        """Update from {feed name: base url}, returning {feed: "updated" | "unchanged" | error}"""
+        statuses = {}
+        with self._lock:
+            # Feeds no longer configured on the router are dropped
+            known = [row[0] for row in self._db.execute("SELECT name FROM feeds")]
+            for name in known:
+                if name not in feeds:
+                    with self._db:
+                        self._db.execute("DELETE FROM packages WHERE feed = ?", (name,))
+                        self._db.execute("DELETE FROM feeds WHERE name = ?", (name,))
+            
+            for name, url in feeds.items():
+                try:
+                    statuses[name] = self._refresh_feed(name, url, timeout)
+                except (requests.RequestException, OSError, EOFError) as e:
+                    statuses[name] = f"error: {e}"
+        return statuses
+    
+    def _refresh_feed(self, name: str, url: str, timeout: float) -> str:
+        row = self._db.execute("SELECT url, etag, last_modified FROM feeds WHERE name = ?", (name,)).fetchone()
+        headers = {}
+        if row and row[0] == url:
+            if row[1]:
+                headers['If-None-Match'] = row[1]
+            if row[2]:
+                headers['If-Modified-Since'] = row[2]
+        
+        response = self.session.get(f"{url}/Packages.gz", headers=headers, timeout=timeout)
+        if response.status_code == 304:
+            with self._db:
+                self._db.execute("UPDATE feeds SET fetched_at = ? WHERE name = ?", (time.time(), name))
+            return "unchanged"
+        response.raise_for_status()
+        
+        stanzas = parse_control_file(gzip.decompress(response.content).decode('utf-8', 'replace'))
+        rows = [
+            (name, s['Package'], s.get('Version', ''), ",".join(parse_depends(s.get('Depends', ''))),
+             int(s.get('Size', 0) or 0), int(s.get('Installed-Size', 0) or 0), s.get('Section', ''),
+             s.get('Description', ''), s.get('Filename', ''))
+            for s in stanzas if 'Package' in s
+        ]
+        with self._db:
+            self._db.execute("DELETE FROM packages WHERE feed = ?", (name,))
+            self._db.executemany("INSERT INTO packages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._db.execute("INSERT OR REPLACE INTO feeds VALUES (?, ?, ?, ?, ?)",
+                             (name, url, response.headers.get('ETag'),
+                              response.headers.get('Last-Modified'), time.time()))
+        return "updated"
+    
+    def _query(self, where: str, params=()) -> List[PackageInfo]:
+        rows = self._db.execute(
+            "SELECT name, version, depends, size, installed_size, section, description, feed, filename "
+            f"FROM packages {where}", params
+        ).fetchall()
+        return [PackageInfo(r[0], r[1], r[2].split(',') if r[2] else [], r[3], r[4], r[5], r[6], r[7], r[8])
+                for r in rows]
+    
+    def get(self, name: str) -> Optional[PackageInfo]:
+        """Look up a package by exact name"""
+        packages = self._query("WHERE name = ? LIMIT 1", (name,))
+        return packages[0] if packages else None
+    
+    def is_available(self, name: str) -> bool:
+        return self._db.execute("SELECT 1 FROM packages WHERE name = ? LIMIT 1", (name,)).fetchone() is not None
+    
+    def search(self, term: str, descriptions: bool = True, limit: Optional[int] = None) -> List[PackageInfo]:
+        """Packages whose name (or description) contains term, case-insensitively"""
+        pattern = f"%{term}%"
+        where = "WHERE name LIKE ?" + (" OR description LIKE ?" if descriptions else "")
+        params = (pattern, pattern) if descriptions else (pattern,)
+        return self._query(f"{where} ORDER BY name" + (f" LIMIT {int(limit)}" if limit else ""), params)
+    
+    def match(self, glob: str) -> List[PackageInfo]:
+        """Packages whose name matches an opkg-style glob (`opkg list 'kmod-usb*'`)"""
+        return self._query("WHERE name GLOB ? ORDER BY name", (glob,))
+    
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM packages").fetchone()[0]
+
+class InstalledPackages:
+    """Installed packages ({name: version}) keyed by a fingerprint of opkg's status file.
+    
+    The set lives in memory and in a JSON file, so after a restart the router
+    only has to answer OPKG_STATUS_FINGERPRINT_COMMAND to confirm it is current.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.fingerprint = None
+        self.packages: Dict[str, str] = {}
+        self._load()
+    
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.fingerprint = data['fingerprint']
+            self.packages = data['packages']
+        except (OSError, ValueError, KeyError):
+            self.fingerprint, self.packages = None, {}
+    
+    @staticmethod
+    def fingerprint_from(md5sum_output: str) -> str:
+        """Reduce OPKG_STATUS_FINGERPRINT_COMMAND output to the md5 of the status file"""
+        return md5sum_output.split()[0] if md5sum_output.split() else ""
+    
+    def is_current(self, fingerprint: str) -> bool:
+        return self.fingerprint is not None and fingerprint == self.fingerprint
+    
+    def update(self, fingerprint: str, packages: Dict[str, str]):
+        """Replace the tracked set and persist it"""
+        self.fingerprint = fingerprint
+        self.packages = packages
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'fingerprint': fingerprint, 'packages': packages}, f)
+        os.replace(temp_path, self.path)
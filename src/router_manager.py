@@ -1,13 +1,45 @@
 #!/usr/bin/env python3
 
 import paramiko
+import asyncio
+import codecs
+import os
 import sys
 import time
+import random
 import re
-from typing import Optional, Dict, List, Tuple
-from dataclasses import dataclass
+import select
+import threading
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Optional, Dict, List, Tuple, Iterator, Any, Callable
+from dataclasses import dataclass, field, replace
 import subprocess
 import json
+import shlex
+import tarfile
+import uuid
+from router_parsers import (
+    SystemStats, SYSTEM_STATS_COMMANDS, parse_system_stats, parse_openwrt_release, parse_ip_addr,
+    parse_opkg_feeds, parse_opkg_status, parse_opkg_list_installed, parse_df, parse_wifi_devices, LogRecord, WirelessNetwork
+)
+from package_index import (
+    PackageIndex, PackageInfo, InstalledPackages, DEFAULT_CACHE_DIR, OPKG_STATUS_PATH,
+    OPKG_STATUS_FINGERPRINT_COMMAND, OPKG_LIST_INSTALLED_COMMAND
+)
+from ssh_connect import ConnectTiming, open_transport
+from output_buffer import BoundedOutput
+from sftp_transfer import SftpTransfer, TransferResult, ProgressCallback
+from backup_store import BackupStore, BackupManifest, BACKUP_COMMAND
+from config_snapshot import ConfigSnapshotter, ConfigStore, ConfigSnapshot, ConfigDiff, ConfigChanges
+from log_index import LogIndex, DEFAULT_LOG_INDEX_NAME, log_search_terms, format_log_records, log_grep_note
+from log_tailer import LogTailer
+from metrics_store import MetricsStore
+from telemetry import TelemetrySampler
+from uci_transaction import UciTransaction
+from wireless_scan import WirelessScanner, DEFAULT_RADIOS, scan_command
+from ubus_backend import SshUbusBackend, RpcdUbusBackend, UbusCall, UBUS_STATUS_OK, UBUS_STATUS_UNAVAILABLE
 
 @dataclass
 class RouterConfig:
@@ -16,27 +48,825 @@ class RouterConfig:
     password: str = ""
     port: int = 22
     timeout: int = 30
+    max_channels: int = 4
+    exec_backend: str = "exec"  # "exec" (channel per command) or "shell" (persistent shell)
+    keepalive_interval: int = 15
+    reconnect_attempts: int = 6
+    reconnect_backoff: float = 1.0
+    reconnect_max_delay: float = 30.0
+    cache_size: int = 128  # cached command results kept; 0 disables the cache
+    ubus_transport: str = "ssh"  # "ssh" (ubus CLI), "http" (rpcd JSON-RPC on uhttpd) or "none"
+    rpcd_url: str = ""  # defaults to http://<host>/ubus
+    package_index_path: str = ""  # defaults to ~/.cache/routertools/opkg-<host>.sqlite
+    package_index_max_age: float = 24 * 3600  # seconds before feeds are re-checked
+    installed_packages_path: str = ""  # defaults to ~/.cache/routertools/opkg-installed-<host>.json
+    metrics_store_path: str = ""  # defaults to ~/.cache/routertools/metrics-<host>.sqlite
+    log_index_path: str = ""  # shared by all routers; defaults to ~/.cache/routertools/logs.sqlite
+    wireless_scan_ttl: float = 30.0  # seconds a wireless scan is reused for
+    config_snapshot_dir: str = ""  # defaults to ~/.cache/routertools/config-snapshots
+    backup_dir: str = ""  # shared by all routers; defaults to ~/.cache/routertools/backups
+    key_filename: str = ""  # private key; tried before the password
+    key_passphrase: str = ""
+    allow_agent: bool = False  # also offer ssh-agent keys
+    known_hosts_path: str = ""  # defaults to ~/.cache/routertools/known_hosts
+    host_key_policy: str = "tofu"  # "tofu" (remember new hosts, reject changed keys), "strict" or "ignore"
+    output_head_bytes: int = 256 * 1024  # command output kept in memory from the start...
+    output_tail_bytes: int = 256 * 1024  # ...and from the end; the middle spills to a temp file
+
+@dataclass
+class ConnectionMetrics:
+    connects: int = 0
+    reconnects: int = 0
+    reconnect_attempts: int = 0
+    failed_reconnects: int = 0
+    retried_commands: int = 0
+    last_reconnect_seconds: float = 0.0
+    total_reconnect_seconds: float = 0.0
+    last_connect: ConnectTiming = field(default_factory=ConnectTiming)
+
+@dataclass
+class InstallPlan:
+    requested: List[str]
+    to_install: List[PackageInfo] = field(default_factory=list)  # dependencies first
+    already_installed: List[str] = field(default_factory=list)
+    unknown: List[str] = field(default_factory=list)  # not in the index (virtual, or missing feed)
+    required_bytes: int = 0
+    free_bytes: Optional[int] = None
+    
+    @property
+    def fits(self) -> bool:
+        return self.free_bytes is None or self.required_bytes <= self.free_bytes
+
+# opkg install progress lines, e.g. "Installing wget (1.21.3-1) to root..." / "Configuring wget."
+OPKG_PROGRESS_PATTERNS = [
+    (re.compile(r'^Installing (\S+) \(([^)]*)\) to '), 'installing'),
+    (re.compile(r'^Package (\S+) \(([^)]*)\) installed in \S+ is up to date'), 'up to date'),
+    (re.compile(r'^Configuring (\S+?)\.?$'), 'configured'),
+]
+
+@dataclass
+class ReadinessResult:
+    ready: bool
+    elapsed: float
+    settle_times: Dict[str, float] = field(default_factory=dict)  # condition -> seconds until it held
+    pending: List[str] = field(default_factory=list)  # conditions still false at the deadline
+
+def wait_until(conditions: Dict[str, Callable[[], bool]], timeout: float = 60,
+               interval: float = 0.25) -> ReadinessResult:
+    """Poll named conditions (in order) every interval seconds until all hold or timeout expires.
+    
+    A condition that raises counts as not holding yet. Once a condition holds it
+    is not checked again, so later ones can rely on it (e.g. SSH is back).
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    settle_times = {}
+    
+    while True:
+        for name, condition in conditions.items():
+            if name in settle_times:
+                continue
+            try:
+                held = condition()
+            except Exception:
+                held = False
+            if not held:
+                break
+            settle_times[name] = time.monotonic() - start
+        
+        now = time.monotonic()
+        if len(settle_times) == len(conditions) or now >= deadline:
+            pending = [name for name in conditions if name not in settle_times]
+            return ReadinessResult(not pending, now - start, settle_times, pending)
+        time.sleep(min(interval, deadline - now))
+
+# Commands (and sub-commands) that only read router state, so they are safe to
+# re-run after the connection dropped mid-flight
+READ_ONLY_COMMANDS = {
+    'cat', 'uname', 'uptime', 'free', 'df', 'du', 'ls', 'ps', 'top', 'logread', 'dmesg',
+    'iwinfo', 'iwconfig', 'ifconfig', 'mount', 'lsusb', 'lsblk', 'grep', 'egrep', 'head',
+    'tail', 'wc', 'sort', 'uniq', 'cut', 'tr', 'awk', 'echo', 'printf', 'date', 'hostname',
+    'id', 'whoami', 'which', 'stat', 'md5sum', 'sha256sum', 'true', 'test', 'seq', 'netstat',
+    'route', 'nslookup', 'ping', 'sed', 'find', 'sleep',
+}
+READ_ONLY_SUBCOMMANDS = {
+    'uci': {'show', 'get', 'export', 'changes'},
+    'opkg': {'list', 'list-installed', 'list-upgradable', 'info', 'status', 'files', 'find',
+             'search', 'whatdepends', 'whatprovides', 'depends'},
+    'ip': {'a', 'addr', 'address', 'r', 'route', 'link', 'neigh', '-4', '-6', '-s'},
+    'ubus': {'list', 'call'},
+    'wifi': {'status'},
+    'block': {'info'},
+    'tar': {'-c', '-cf', 'c', 'cf'},
+}
+READ_ONLY_UBUS_METHODS = {'info', 'board', 'status', 'dump', 'devices', 'list'}
+UNSAFE_ARGUMENTS = {'-i', '--in-place', '-delete', '-exec', '-execdir', 'add', 'del', 'delete',
+                    'set', 'flush', 'replace', 'change'}
+# find actions that write files or run other commands
+UNSAFE_FIND_PREFIXES = ('-fprint', '-fls', '-exec', '-ok', '-delete')
+# sed options allowed in a read-only command; anything else (-i, -s, -f FILE, ...) is refused
+READ_ONLY_SED_OPTIONS = {'-n', '-e', '-r', '-E', '-ne', '-en', '-nr', '-rn', '-nE', '-En', '-re', '-Ee'}
+# sed scripts made only of p/d/q/= and s///[gpI0-9] commands, each with optional line or /regex/ addresses
+_SAFE_SED_SCRIPT = re.compile(
+    r'^(?:\s*(?:(?:\d+|\$|/[^/]*/)(?:,(?:\d+|\$|/[^/]*/))?!?)?\s*'
+    r'(?:[pdq=]|s(?P<d>[^\s\\])(?:(?!(?P=d)).)*(?P=d)(?:(?!(?P=d)).)*(?P=d)[gpI0-9]*)\s*(?:;|$))+$'
+)
+# awk programs mentioning any of these could write files or run commands (`>` also catches comparisons)
+UNSAFE_AWK_WORDS = ('system', 'getline', 'close', 'fflush', '|', '>')
+# Flags that only change how hostname/date print; any other argument would set the value
+READ_ONLY_HOSTNAME_OPTIONS = {'-s', '-f', '-d', '-i'}
+READ_ONLY_DATE_OPTIONS = {'-u', '-R', '-I'}
+
+def is_read_only_command(command: str) -> bool:
+    """Conservatively decide whether a shell command line only reads router state.
+
+    Every pipeline/list segment must start with an allowlisted command, and output
+    may only be redirected to /dev/null or another descriptor.
+    """
+    if '`' in command or '$(' in command:
+        return False
+    
+    try:
+        # Line breaks separate commands just like ';' (shlex would treat them as spaces)
+        lexer = shlex.shlex(command.replace('\r', ';').replace('\n', ';'), posix=True, punctuation_chars=True)
+        lexer.whitespace_split = True
+        tokens = list(lexer)
+    except ValueError:
+        return False
+    
+    segments = [[]]
+    expect_target = False
+    for token in tokens:
+        if expect_target:
+            if token != '/dev/null' and not token.isdigit():
+                return False
+            expect_target = False
+        elif token in ('|', '||', '&&', ';'):
+            segments.append([])
+        elif token in ('>', '>>', '>&', '&>'):
+            expect_target = True
+        elif token in ('<', '2'):
+            continue
+        elif not token or token[0] in '&()<>;|':
+            return False
+        else:
+            segments[-1].append(token)
+    
+    for words in segments:
+        if not words:
+            continue
+        name, args = words[0], words[1:]
+        if any(arg in UNSAFE_ARGUMENTS for arg in args) or not _arguments_read_only(name, args):
+            return False
+        if name in READ_ONLY_COMMANDS:
+            continue
+        if name not in READ_ONLY_SUBCOMMANDS or not args or args[0] not in READ_ONLY_SUBCOMMANDS[name]:
+            return False
+        if name == 'ubus' and args[0] == 'call' and (len(args) < 3 or args[2] not in READ_ONLY_UBUS_METHODS):
+            return False
+    return True
+
+def _arguments_read_only(name: str, args: List[str]) -> bool:
+    """Refuse the options and scripts that let otherwise read-only commands write files"""
+    if name in ('mount', 'ifconfig', 'iwconfig'):
+        # Listing only: `mount DEV DIR`, `ifconfig IF ADDR`, `iwconfig IF essid X` reconfigure
+        if name == 'ifconfig' and args == ['-a']:
+            return True
+        return not args or (name != 'mount' and len(args) == 1 and not args[0].startswith('-'))
+    if name == 'hostname':
+        return all(arg in READ_ONLY_HOSTNAME_OPTIONS for arg in args)
+    if name == 'date':
+        # `date -s TIME` and `date MMDDhhmm` set the clock
+        return all(arg.startswith('+') or arg in READ_ONLY_DATE_OPTIONS or arg.startswith('-I') for arg in args)
+    if name == 'find':
+        return not any(arg.startswith(UNSAFE_FIND_PREFIXES) for arg in args)
+    if name == 'sort':
+        return not any(arg.startswith('--o') or (arg.startswith('-') and not arg.startswith('--') and 'o' in arg)
+                       for arg in args)
+    if name == 'tar':
+        # Only an archive written to stdout leaves the router's files untouched
+        for i, arg in enumerate(args):
+            if arg.startswith('--'):
+                return False
+            if (i == 0 or arg.startswith('-')) and 'f' in arg:
+                if not arg.endswith('f') or args[i + 1:i + 2] != ['-']:
+                    return False
+        return True
+    if name == 'sed':
+        scripts, expect_script = [], False
+        for arg in args:
+            if expect_script:
+                scripts.append(arg)
+                expect_script = False
+            elif arg.startswith('-') and arg != '-':
+                if arg not in READ_ONLY_SED_OPTIONS:
+                    return False
+                expect_script = arg.endswith('e')
+            elif not scripts:
+                scripts.append(arg)
+        return bool(scripts) and all(_SAFE_SED_SCRIPT.match(script) for script in scripts)
+    if name == 'awk':
+        programs, skip = [], False
+        for arg in args:
+            if skip:
+                skip = False
+            elif arg in ('-F', '-v'):
+                skip = True
+            elif arg.startswith(('-F', '-v')):
+                continue
+            elif arg.startswith('-') and arg != '-':
+                return False  # -f FILE and anything unknown
+            else:
+                programs.append(arg)
+                break
+        return bool(programs) and not any(word in programs[0] for word in UNSAFE_AWK_WORDS)
+    return True
+
+def build_batch_script(commands: Dict[str, str]) -> Tuple[str, str]:
+    """Build one shell script running every command, returning (script, marker).
+
+    Each command runs in its own `sh -c` so an `exit` or syntax error only affects
+    that entry. Its stdout and stderr are framed with a per-batch random marker
+    plus the entry index, and the end marker carries the exit code.
+    """
+    marker = f"__RT_{uuid.uuid4().hex}__"
+    script = []
+    for i, command in enumerate(commands.values()):
+        script.append(f"printf '%s\\n' '{marker}:B:{i}'; printf '%s\\n' '{marker}:B:{i}' >&2")
+        script.append(f"sh -c {shlex.quote(command)} </dev/null; rc=$?")
+        script.append(f"printf '\\n%s\\n' \"{marker}:E:{i}:$rc\"; printf '\\n%s\\n' '{marker}:E:{i}' >&2")
+    return "\n".join(script), marker
+
+def _split_batch_output(data: str, marker: str) -> Dict[int, Tuple[str, Optional[int]]]:
+    """Parse marker-framed batch output into {index: (text, exit_code)}"""
+    pattern = re.compile(
+        re.escape(marker) + r":B:(\d+)\n(.*?)\n" + re.escape(marker) + r":E:\1(?::(\d+))?\n",
+        re.DOTALL
+    )
+    
+    sections = {}
+    for match in pattern.finditer(data):
+        code = int(match.group(3)) if match.group(3) is not None else None
+        sections[int(match.group(1))] = (match.group(2), code)
+    return sections
+
+def parse_batch_output(keys: List[str], marker: str, stdout: str, stderr: str,
+                       exit_code: int) -> Dict[str, Tuple[str, str, int]]:
+    """Split the output of a build_batch_script() run back into {key: (stdout, stderr, exit_code)}"""
+    stdout_sections = _split_batch_output(stdout, marker)
+    stderr_sections = _split_batch_output(stderr, marker)
+    
+    results = {}
+    for i, key in enumerate(keys):
+        if i in stdout_sections:
+            out, code = stdout_sections[i]
+            err = stderr_sections.get(i, ("", None))[0]
+            results[key] = (out, err, code)
+        else:
+            # Batch never ran or was cut short (timeout, dropped connection)
+            error = stderr if stderr and marker not in stderr else "Batch output incomplete"
+            results[key] = ("", error, exit_code or 1)
+    
+    return results
+
+def info_from_results(results: Dict[str, Tuple[str, str, int]]) -> Dict[str, str]:
+    """Turn keyed command results into the {key: output or "Error: ..."} dicts the info methods return"""
+    info = {}
+    for key, (stdout, stderr, exit_code) in results.items():
+        if exit_code == 0:
+            info[key] = stdout.strip()
+        else:
+            info[key] = f"Error: {stderr.strip()}"
+    
+    return info
+
+# get_system_info() over ubus: memory, uptime, load and storage in one reply, plus the board
+UBUS_SYSTEM_INFO_CALLS = {'info': ('system', 'info', None), 'board': ('system', 'board', None)}
+UBUS_SYSTEM_INFO_COMMANDS = {key: f"ubus call {obj} {method}" for key, (obj, method, _) in UBUS_SYSTEM_INFO_CALLS.items()}
+
+def _format_size(size: float) -> str:
+    for unit in ('B', 'K', 'M'):
+        if size < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}G"
+
+def info_from_ubus(system: Dict[str, Any], board: Dict[str, Any]) -> Dict[str, str]:
+    """Build get_system_info()'s {key: text} from `ubus call system info` and `ubus call system board`"""
+    days, seconds = divmod(int(system.get('uptime', 0)), 86400)
+    load = ", ".join(f"{value / 65536:.2f}" for value in system.get('load', []))
+    memory = system.get('memory', {})
+    used = memory.get('total', 0) - memory.get('free', 0) - memory.get('buffered', 0) - memory.get('cached', 0)
+    storage = []
+    for mount in ('root', 'tmp'):
+        fs = system.get(mount)
+        if fs:  # sizes in KiB
+            storage.append(f"{mount}: {_format_size(fs.get('used', 0) * 1024)} used of "
+                           f"{_format_size(fs.get('total', 0) * 1024)}, "
+                           f"{_format_size(fs.get('avail', 0) * 1024)} available")
+    return {
+        'uptime': f"up {days} days, {seconds // 3600:02d}:{seconds % 3600 // 60:02d}, load average: {load}",
+        'memory': ", ".join([f"total: {_format_size(memory.get('total', 0))}", f"used: {_format_size(max(used, 0))}"]
+                            + [f"{key}: {_format_size(memory[key])}"
+                               for key in ('free', 'shared', 'buffered', 'cached', 'available') if key in memory]),
+        'storage': "\n".join(storage),
+        'kernel': board.get('kernel', ''),
+        'openwrt_version': board.get('release', {}).get('description', ''),
+        'cpu_info': board.get('system', '')
+    }
+
+# Cache lifetimes (seconds) for command results
+CACHE_NEVER = 0.0
+CACHE_MINUTES = 300.0
+CACHE_SCAN = 30.0  # a wireless scan takes seconds and ties up the radio
+CACHE_UNTIL_REBOOT = float('inf')  # dropped on reconnect, which any reboot forces
+
+# Seconds to wait for the server to answer probe() before the session is treated as dead
+TRANSPORT_PROBE_TIMEOUT = 5.0
+
+CACHE_TTL_RULES = [
+    (re.compile(r'^uname\b'), CACHE_UNTIL_REBOOT),
+    (re.compile(r'^cat /proc/cpuinfo\b'), CACHE_UNTIL_REBOOT),
+    (re.compile(r'^cat /etc/(openwrt_release|openwrt_version|board\.json)\b'), CACHE_UNTIL_REBOOT),
+    (re.compile(r'^ubus call system board\b'), CACHE_UNTIL_REBOOT),
+    (re.compile(r'^opkg (list|list-installed|info|status)\b'), CACHE_MINUTES),
+    (re.compile(r'^uci (show|get|export)\b'), CACHE_MINUTES),
+    (re.compile(r'^cat /etc/opkg/'), CACHE_MINUTES),
+    (re.compile(r'^(lsusb|lsblk)\b'), CACHE_MINUTES),
+    (re.compile(r'^iwinfo \S+ scan$'), CACHE_SCAN),
+]
+
+def cache_ttl_for(command: str) -> float:
+    """Pick the cache lifetime for a command from CACHE_TTL_RULES (read-only commands only)"""
+    command = command.strip()
+    for pattern, ttl in CACHE_TTL_RULES:
+        if pattern.match(command):
+            return ttl if is_read_only_command(command) else CACHE_NEVER
+    return CACHE_NEVER
+
+class ResultCache:
+    """Size-bounded LRU cache of command results keyed by the exact command string.
+
+    Only successful results of commands with a non-zero cache_ttl_for() are kept.
+    Running any command that is not read-only drops every entry except the
+    until-reboot ones, since it may have changed packages or config.
+    """
+    
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, command: str) -> Optional[Tuple[str, str, int]]:
+        """Return a fresh cached result, or None"""
+        with self._lock:
+            entry = self._entries.get(command)
+            if entry is not None:
+                expires, result = entry
+                if time.monotonic() < expires:
+                    self._entries.move_to_end(command)
+                    self.hits += 1
+                    return result
+                del self._entries[command]
+        
+        if cache_ttl_for(command) > 0:
+            self.misses += 1
+        return None
+    
+    def store(self, command: str, result: Tuple[str, str, int], read_only: bool = True):
+        """Record a freshly executed command's result (or invalidate if it changed state)"""
+        if not read_only:
+            self.invalidate(keep_static=True)
+            return
+        
+        ttl = cache_ttl_for(command)
+        if ttl <= 0 or result[2] != 0 or self.max_entries <= 0:
+            return
+        
+        with self._lock:
+            self._entries[command] = (time.monotonic() + ttl, result)
+            self._entries.move_to_end(command)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, keep_static: bool = False):
+        """Drop cached results; keep_static keeps the until-reboot entries"""
+        with self._lock:
+            if keep_static:
+                for command in [c for c, (expires, _) in self._entries.items() if expires != CACHE_UNTIL_REBOOT]:
+                    del self._entries[command]
+            else:
+                self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+SYSTEM_INFO_COMMANDS = {
+    'uptime': 'uptime',
+    'memory': 'free -h',
+    'storage': 'df -h',
+    'kernel': 'uname -r',
+    'openwrt_version': 'cat /etc/openwrt_release | grep DISTRIB_DESCRIPTION',
+    'cpu_info': 'cat /proc/cpuinfo | grep "model name"'
+}
+
+STORAGE_INFO_COMMANDS = {
+    'disk_usage': 'df -h',
+    'block_devices': 'lsblk',
+    'mount_points': 'mount | grep -E "^/dev"'
+}
+
+WIRELESS_STATUS_COMMANDS = {
+    'wireless_config': 'uci show wireless',
+    'wifi_status': 'wifi status',
+    'iwconfig': 'iwconfig 2>/dev/null || echo "iwconfig not available"',
+    'ip_addresses': 'ip addr show',
+    'connected_networks': 'iwinfo | grep -A 10 "ESSID"'
+}
+
+class ChannelPool:
+    """Hand out exec channels on one SSH transport, at most max_channels at a time.
+
+    Callers that find the pool full queue up and are served strictly in
+    arrival order, so a burst of commands cannot starve an earlier caller.
+    """
+    
+    def __init__(self, transport: paramiko.Transport, max_channels: int = 4):
+        self.transport = transport
+        self.max_channels = max(1, max_channels)
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        self._queue = deque()
+    
+    def acquire(self, timeout: Optional[float] = None) -> paramiko.Channel:
+        """Wait for a free slot (FIFO) and open a new session channel"""
+        ticket = object()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        
+        with self._cond:
+            self._queue.append(ticket)
+            try:
+                while self._queue[0] is not ticket or self.in_flight >= self.max_channels:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("Timed out waiting for a free SSH channel")
+                    self._cond.wait(remaining)
+            finally:
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+            self.in_flight += 1
+        
+        try:
+            return self.transport.open_session(timeout=timeout)
+        except Exception:
+            self._release_slot()
+            raise
+    
+    def release(self, channel: paramiko.Channel):
+        """Close a channel and hand its slot to the next waiter"""
+        try:
+            channel.close()
+        finally:
+            self._release_slot()
+    
+    def _release_slot(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+    
+    @contextmanager
+    def channel(self, timeout: Optional[float] = None):
+        """Context manager wrapping acquire()/release()"""
+        channel = self.acquire(timeout)
+        try:
+            yield channel
+        finally:
+            self.release(channel)
+
+def drain_channel(channel: paramiko.Channel, stdout: BoundedOutput, stderr: BoundedOutput, timeout: float):
+    """Read an exec channel's stdout and stderr into bounded buffers until the command exits.
+    
+    timeout is the longest allowed silence, not a limit on the whole command.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        if channel.recv_ready():
+            stdout.write(channel.recv(32768))
+            deadline = time.monotonic() + timeout
+            continue
+        if channel.recv_stderr_ready():
+            stderr.write(channel.recv_stderr(32768))
+            deadline = time.monotonic() + timeout
+            continue
+        if channel.exit_status_ready() or channel.closed:
+            # Exit status can arrive ahead of the last buffered data
+            if not channel.recv_ready() and not channel.recv_stderr_ready():
+                break
+            continue
+        
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("timed out waiting for command to finish")
+        select.select([channel], [], [], min(remaining, 0.5))
+
+class ShellSession:
+    """One long-lived remote shell that runs commands back to back.
+
+    Every command is wrapped in a subshell with stdin from /dev/null and framed on
+    both stdout and stderr by a per-command sentinel; the stdout end sentinel
+    carries the exit code. Any framing failure closes the shell, and the next call
+    opens a fresh one.
+    """
+    
+    def __init__(self, transport: paramiko.Transport, head_bytes: int = 256 * 1024,
+                 tail_bytes: int = 256 * 1024):
+        self.transport = transport
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.channel = None
+        self.commands_run = 0
+        self.desyncs = 0
+        self._lock = threading.Lock()
+    
+    def open(self, timeout: Optional[float] = None):
+        """Open the channel and start the remote shell"""
+        self.channel = self.transport.open_session(timeout=timeout)
+        self.channel.invoke_shell()
+    
+    def close(self):
+        """Close the shell channel"""
+        if self.channel:
+            self.channel.close()
+            self.channel = None
+    
+    @property
+    def alive(self) -> bool:
+        return self.channel is not None and not self.channel.closed and not self.channel.exit_status_ready()
+    
+    def run(self, command: str, timeout: int = 30) -> Optional[Tuple[str, str, int]]:
+        """Run a command on the shell and return stdout, stderr, exit_code.
+        
+        Returns None when the command was not sent at all (shell busy in another
+        thread, or it could not be (re)opened), so the caller can use an exec
+        channel instead. Raises ConnectionError if the framing is lost mid-command.
+        """
+        if not self._lock.acquire(blocking=False):
+            return None
+        
+        try:
+            if not self.alive:
+                try:
+                    self.close()
+                    self.open(timeout)
+                except Exception:
+                    self.close()
+                    return None
+            
+            marker = f"__RT_{uuid.uuid4().hex}__"
+            script = (
+                f"printf '%s\\n' '{marker}:B'; printf '%s\\n' '{marker}:B' >&2; "
+                f"( eval {shlex.quote(command)} ) </dev/null; rc=$?; "
+                f"printf '\\n%s\\n' \"{marker}:E:$rc\"; printf '\\n%s\\n' '{marker}:E' >&2\n"
+            )
+            
+            try:
+                self.channel.sendall(script.encode('utf-8'))
+            except Exception:
+                self.close()
+                return None
+            
+            try:
+                result = self._read_framed(marker, timeout)
+                self.commands_run += 1
+                return result
+            except Exception as e:
+                # Output no longer lines up with our sentinels; never reuse this shell
+                self.desyncs += 1
+                self.close()
+                raise ConnectionError(f"shell session lost sync ({e})") from e
+        finally:
+            self._lock.release()
+    
+    def _read_framed(self, marker: str, timeout: float) -> Tuple[str, str, int]:
+        begin = f"{marker}:B\n".encode()
+        stdout_end = re.compile(re.escape(f"\n{marker}:E:".encode()) + rb"(\d+)\n")
+        stderr_end = f"\n{marker}:E\n".encode()
+        
+        # Sentinels sit at the very start and end, so bounded head/tail buffers always hold them
+        out = BoundedOutput(self.head_bytes, max(self.tail_bytes, 4096))
+        err = BoundedOutput(self.head_bytes, max(self.tail_bytes, 4096))
+        deadline = time.monotonic() + timeout
+        
+        while True:
+            out_window = out.last(min(out.total_bytes, 4096))
+            match = stdout_end.search(out_window)
+            if match and err.last(min(err.total_bytes, len(stderr_end))) == stderr_end:
+                break
+            
+            if self.channel.recv_ready():
+                out.write(self.channel.recv(32768))
+                continue
+            if self.channel.recv_stderr_ready():
+                err.write(self.channel.recv_stderr(32768))
+                continue
+            if self.channel.closed or self.channel.exit_status_ready():
+                raise EOFError("shell exited")
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("timed out waiting for command to finish")
+            select.select([self.channel], [], [], min(remaining, 0.5))
+        
+        try:
+            # Anything before the begin sentinel is login noise (banner, motd)
+            out_start = out.head.find(begin)
+            err_start = err.head.find(begin)
+            if out_start < 0 or err_start < 0:
+                raise ValueError("missing begin sentinel")
+            
+            stdout_data = out.text(out_start + len(begin), len(out_window) - match.start())
+            stderr_data = err.text(err_start + len(begin), len(stderr_end))
+            return stdout_data, stderr_data, int(match.group(1))
+        finally:
+            out.close()
+            err.close()
+
+class CommandStream:
+    """Incremental stdout of a running command, read straight off its exec channel.
+
+    Iterate (or `async for`) to get decoded lines as they arrive; each line keeps
+    its trailing newline so joining them gives back the exact output. stderr is
+    collected on the side. Once max_bytes of stdout have been read the channel is
+    closed and `truncated` is set. exit_code and stderr are filled in when the
+    stream ends.
+    """
+    
+    def __init__(self, pool: ChannelPool, command: str, timeout: Optional[float] = 30,
+                 max_bytes: Optional[int] = None):
+        self.command = command
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.truncated = False
+        self.exit_code = None
+        self.stderr = ""
+        self._pool = pool
+        self._channel = pool.acquire(timeout)
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._stderr_data = bytearray()
+        self._pending = ""
+        self._lines = deque()
+        self._done = False
+        
+        try:
+            self._channel.settimeout(timeout)
+            self._channel.exec_command(command)
+        except Exception:
+            self.close()
+            raise
+    
+    def _read_chunk(self) -> Optional[str]:
+        """Block for the next piece of stdout; None once the stream has ended"""
+        channel = self._channel
+        last_activity = time.monotonic()
+        
+        while not self._done:
+            if channel.recv_stderr_ready():
+                self._stderr_data += channel.recv_stderr(32768)
+                last_activity = time.monotonic()
+                continue
+            
+            if channel.recv_ready() or channel.eof_received or channel.closed:
+                data = channel.recv(32768)
+                if not data:
+                    self._finish()
+                    return self._decoder.decode(b"", final=True)
+                
+                if self.max_bytes is not None and self.bytes_read + len(data) > self.max_bytes:
+                    data = data[:self.max_bytes - self.bytes_read]
+                    self.truncated = True
+                self.bytes_read += len(data)
+                text = self._decoder.decode(data)
+                if self.truncated:
+                    text += self._decoder.decode(b"", final=True)
+                    self._finish()
+                return text
+            
+            if self.timeout is not None and time.monotonic() - last_activity > self.timeout:
+                self.close()
+                raise TimeoutError(f"No output from '{self.command}' for {self.timeout}s")
+            select.select([channel], [], [], 0.5)
+        
+        return None
+    
+    def _finish(self):
+        channel = self._channel
+        if channel is not None and not self.truncated:
+            while not channel.closed and (channel.recv_stderr_ready() or not channel.exit_status_ready()):
+                if channel.recv_stderr_ready():
+                    self._stderr_data += channel.recv_stderr(32768)
+                else:
+                    select.select([channel], [], [], 0.5)
+            while channel.recv_stderr_ready():
+                self._stderr_data += channel.recv_stderr(32768)
+            self.exit_code = channel.recv_exit_status()
+        elif self.truncated:
+            # We hung up on the command ourselves; report it like a SIGPIPE'd pipeline
+            self.exit_code = 141
+        self.stderr = self._stderr_data.decode('utf-8', errors='replace')
+        self.close()
+    
+    def close(self):
+        """Hang up the channel and return its pool slot (safe to call twice)"""
+        self._done = True
+        if self._channel is not None:
+            channel, self._channel = self._channel, None
+            self._pool.release(channel)
+    
+    def _next_line(self) -> Optional[str]:
+        while not self._lines:
+            chunk = self._read_chunk()
+            if chunk is None:
+                if self._pending:
+                    line, self._pending = self._pending, ""
+                    return line
+                return None
+            
+            parts = (self._pending + chunk).split('\n')
+            self._pending = parts.pop()
+            self._lines.extend(part + '\n' for part in parts)
+        return self._lines.popleft()
+    
+    def read(self) -> str:
+        """Drain the rest of the stream into one string"""
+        return "".join(self)
+    
+    def __iter__(self) -> Iterator[str]:
+        return self
+    
+    def __next__(self) -> str:
+        line = self._next_line()
+        if line is None:
+            raise StopIteration
+        return line
+    
+    def __aiter__(self):
+        return self
+    
+    async def __anext__(self) -> str:
+        if not self._lines:
+            # Reading blocks on the channel, so hop to a worker thread once per chunk
+            line = await asyncio.to_thread(self._next_line)
+        else:
+            line = self._lines.popleft()
+        if line is None:
+            raise StopAsyncIteration
+        return line
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
 
 class OpenWrtManager:
     def __init__(self, config: RouterConfig):
         self.config = config
-        self.ssh_client = None
+        self.transport = None
+        self.channel_pool = None
+        self.shell_session = None
         self.connected = False
+        self.metrics = ConnectionMetrics()
+        self.cache = ResultCache(config.cache_size)
+        self.ubus = self._create_ubus_backend()
+        self.package_index = None
+        self.metrics_store = None
+        self.log_tailer = None
+        self.log_index = None
+        self.wireless_scanner = WirelessScanner(config.wireless_scan_ttl)
+        self.config_snapshotter = None
+        self.installed_packages = InstalledPackages(
+            config.installed_packages_path
+            or os.path.join(DEFAULT_CACHE_DIR, f"opkg-installed-{config.host}.json")
+        )
+        self._reconnect_lock = threading.Lock()
+    
+    def _create_ubus_backend(self):
+        if self.config.ubus_transport == "ssh":
+            return SshUbusBackend(self)
+        if self.config.ubus_transport == "http":
+            url = self.config.rpcd_url or f"http://{self.config.host}/ubus"
+            return RpcdUbusBackend(url, self.config.username, self.config.password, self.config.timeout)
+        return None
     
     def connect(self) -> bool:
         """Establish SSH connection to router"""
         try:
-            self.ssh_client = paramiko.SSHClient()
-            self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            
-            self.ssh_client.connect(
-                hostname=self.config.host,
-                username=self.config.username,
-                password=self.config.password,
-                port=self.config.port,
-                timeout=self.config.timeout
-            )
-            
+            self._open_connection()
             self.connected = True
             return True
             
@@ -44,50 +874,734 @@ class OpenWrtManager:
             print(f"Failed to connect to router: {e}")
             return False
     
+    def _open_connection(self, timeout: Optional[float] = None):
+        """Open the SSH session and the channel pool / shell that sit on top of it"""
+        config = self.config if timeout is None else replace(self.config, timeout=timeout)
+        transport, self.metrics.last_connect = open_transport(config)
+        self.transport = transport
+        transport.set_keepalive(self.config.keepalive_interval)
+        self.channel_pool = ChannelPool(transport, self.config.max_channels)
+        if self.config.exec_backend == "shell":
+            self.shell_session = ShellSession(transport, self.config.output_head_bytes,
+                                              self.config.output_tail_bytes)
+        self.metrics.connects += 1
+    
+    def _close_connection(self):
+        if self.shell_session:
+            self.shell_session.close()
+            self.shell_session = None
+        if self.transport:
+            self.transport.close()
+        self.channel_pool = None
+    
     def disconnect(self):
         """Close SSH connection"""
-        if self.ssh_client:
-            self.ssh_client.close()
+        if self.ubus:
+            self.ubus.close()
+        if self.package_index:
+            self.package_index.close()
+            self.package_index = None
+        if self.metrics_store:
+            self.metrics_store.close()
+            self.metrics_store = None
+        if self.log_index:
+            self.log_index.close()
+            self.log_index = None
+        if self.log_tailer:
+            self.log_tailer.stop(timeout=2)
+            self.log_tailer = None
+        if self.transport:
+            self._close_connection()
             self.connected = False
     
-    def execute_command(self, command: str, timeout: int = 30) -> Tuple[str, str, int]:
-        """Execute command on router and return stdout, stderr, exit_code"""
+    def is_alive(self) -> bool:
+        """Check whether the SSH transport is still up"""
+        return self.transport is not None and self.transport.is_active()
+    
+    def probe(self, timeout: float = TRANSPORT_PROBE_TIMEOUT) -> bool:
+        """Check the session end to end with a global request; close the transport if no reply comes.
+        
+        is_alive() stays True for a half-open TCP session (e.g. after the router
+        restarted its network) until keepalives give up, which can take minutes.
+        """
+        transport = self.transport
+        if transport is None or not transport.is_active():
+            return False
+        def send_request():
+            # Any reply proves the server is there (dropbear answers this one with a failure)
+            try:
+                transport.global_request("keepalive@openssh.com", wait=True)
+            except Exception:
+                pass
+        
+        # global_request() has no timeout of its own, so it waits on a helper thread
+        request = threading.Thread(target=send_request, name="ssh-probe", daemon=True)
+        request.start()
+        request.join(timeout)
+        if request.is_alive():
+            transport.close()  # also ends the waiting request
+            return False
+        return transport.is_active()
+    
+    def ensure_connected(self) -> bool:
+        """Return True if usable, reconnecting first when the transport has died"""
         if not self.connected:
+            return False
+        if self.is_alive():
+            return True
+        return self.reconnect()
+    
+    def reconnect(self) -> bool:
+        """Re-establish the SSH session with exponential backoff and jitter"""
+        with self._reconnect_lock:
+            if self.is_alive():
+                # Another thread already reconnected while we waited for the lock
+                return True
+            
+            start = time.monotonic()
+            last_error = None
+            for attempt in range(self.config.reconnect_attempts):
+                if attempt:
+                    delay = min(self.config.reconnect_max_delay,
+                                self.config.reconnect_backoff * 2 ** (attempt - 1))
+                    time.sleep(random.uniform(delay / 2, delay))
+                
+                self.metrics.reconnect_attempts += 1
+                try:
+                    self._close_connection()
+                    self._open_connection()
+                except Exception as e:
+                    last_error = e
+                    continue
+                
+                # The router may have rebooted, so nothing cached is trustworthy any more
+                self.cache.invalidate()
+                elapsed = time.monotonic() - start
+                self.metrics.reconnects += 1
+                self.metrics.last_reconnect_seconds = elapsed
+                self.metrics.total_reconnect_seconds += elapsed
+                return True
+            
+            self.metrics.failed_reconnects += 1
+            print(f"Failed to reconnect to router: {last_error}")
+            return False
+    
+    def execute_command(self, command: str, timeout: int = 30, read_only: Optional[bool] = None,
+                        use_cache: bool = True) -> Tuple[str, str, int]:
+        """Execute command on router and return stdout, stderr, exit_code.
+        
+        Slow-changing facts (uname, cpuinfo, opkg lists...) are answered from
+        self.cache; use_cache=False forces a fresh run. If the connection drops under
+        a read-only command, reconnect and run it once more. read_only overrides the
+        is_read_only_command() guess.
+        """
+        if not self.connected:
+            return "", "Not connected to router", 1
+        
+        if use_cache:
+            cached = self.cache.get(command)
+            if cached is not None:
+                return cached
+        
+        if read_only is None:
+            read_only = is_read_only_command(command)
+        result = self._execute_with_retry(command, timeout, read_only)
+        self.cache.store(command, result, read_only)
+        return result
+    
+    def _execute_with_retry(self, command: str, timeout: int, read_only: bool) -> Tuple[str, str, int]:
+        if not self.ensure_connected():
             return "", "Not connected to router", 1
         
         try:
-            stdin, stdout, stderr = self.ssh_client.exec_command(command, timeout=timeout)
-            
-            stdout_data = stdout.read().decode('utf-8')
-            stderr_data = stderr.read().decode('utf-8')
-            exit_code = stdout.channel.recv_exit_status()
-            
-            return stdout_data, stderr_data, exit_code
-            
+            return self._execute_once(command, timeout)
+        except Exception as e:
+            # A timeout may be a half-open session that still looks active; probe() closes it if so
+            if self.probe() or not read_only:
+                return "", f"Command execution failed: {e}", 1
+        
+        self.metrics.retried_commands += 1
+        if not self.ensure_connected():
+            return "", "Not connected to router", 1
+        
+        try:
+            return self._execute_once(command, timeout)
         except Exception as e:
             return "", f"Command execution failed: {e}", 1
     
-    def get_system_info(self) -> Dict[str, str]:
-        """Get basic system information"""
-        commands = {
-            'uptime': 'uptime',
-            'memory': 'free -h',
-            'storage': 'df -h',
-            'kernel': 'uname -r',
-            'openwrt_version': 'cat /etc/openwrt_release | grep DISTRIB_DESCRIPTION',
-            'cpu_info': 'cat /proc/cpuinfo | grep "model name"'
-        }
+    def _execute_once(self, command: str, timeout: int) -> Tuple[str, str, int]:
+        if self.shell_session:
+            result = self.shell_session.run(command, timeout)
+            if result is not None:
+                return result
         
-        info = {}
+        pool = self.channel_pool
+        if pool is None:
+            raise ConnectionError("connection to router lost")
+        
+        stdout, stderr, exit_code = self._execute_bounded(pool, command, timeout, self.config.output_head_bytes,
+                                                          self.config.output_tail_bytes)
+        with stdout, stderr:
+            return stdout.text(), stderr.text(), exit_code
+    
+    def _execute_bounded(self, pool: ChannelPool, command: str, timeout: int, head_bytes: int,
+                         tail_bytes: int) -> Tuple[BoundedOutput, BoundedOutput, int]:
+        stdout = BoundedOutput(head_bytes, tail_bytes)
+        stderr = BoundedOutput(head_bytes, tail_bytes)
+        try:
+            with pool.channel(timeout=timeout) as channel:
+                channel.exec_command(command)
+                drain_channel(channel, stdout, stderr, timeout)
+                exit_code = channel.recv_exit_status()
+            
+            if exit_code == -1 and not self.is_alive():
+                # Channel was torn down with the transport before an exit status arrived
+                raise ConnectionError("connection to router lost")
+        except Exception:
+            stdout.close()
+            stderr.close()
+            raise
+        return stdout, stderr, exit_code
+    
+    def execute_command_output(self, command: str, timeout: int = 30, head_bytes: Optional[int] = None,
+                               tail_bytes: Optional[int] = None) -> Tuple[BoundedOutput, BoundedOutput, int]:
+        """Run a command keeping only the head and tail of its output in memory.
+        
+        Returns stdout and stderr as BoundedOutputs whose spilled middles can be
+        read back with open_middle()/iter_bytes(); close them when done.
+        """
+        if not self.ensure_connected():
+            raise ConnectionError("Not connected to router")
+        if not is_read_only_command(command):
+            self.cache.invalidate(keep_static=True)
+        pool = self.channel_pool
+        if pool is None:
+            raise ConnectionError("connection to router lost")
+        return self._execute_bounded(
+            pool, command, timeout,
+            self.config.output_head_bytes if head_bytes is None else head_bytes,
+            self.config.output_tail_bytes if tail_bytes is None else tail_bytes
+        )
+    
+    def stream_bytes(self, command: str, timeout: float = 60) -> Iterator[bytes]:
+        """Yield a command's raw stdout as it arrives; raises RuntimeError if it exits non-zero.
+        
+        timeout is the longest allowed silence. Used for binary output that
+        should not be decoded or buffered, e.g. `sysupgrade -b -`.
+        """
+        if not self.ensure_connected():
+            raise ConnectionError("Not connected to router")
+        if not is_read_only_command(command):
+            self.cache.invalidate(keep_static=True)
+        stderr = bytearray()
+        with self.channel_pool.channel(timeout) as channel:
+            channel.exec_command(command)
+            deadline = time.monotonic() + timeout
+            while True:
+                if channel.recv_ready():
+                    yield channel.recv(32768)
+                    deadline = time.monotonic() + timeout
+                    continue
+                if channel.recv_stderr_ready():
+                    stderr += channel.recv_stderr(32768)
+                    continue
+                if channel.exit_status_ready() or channel.closed:
+                    if not channel.recv_ready() and not channel.recv_stderr_ready():
+                        break
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No output from '{command}' for {timeout}s")
+                select.select([channel], [], [], min(remaining, 0.5))
+            exit_code = channel.recv_exit_status()
+        if exit_code != 0:
+            raise RuntimeError(stderr.decode('utf-8', 'replace').strip() or f"Exit code {exit_code}")
+    
+    def stream_command(self, command: str, timeout: Optional[float] = 30,
+                       max_bytes: Optional[int] = None) -> CommandStream:
+        """Start a command and return a CommandStream yielding its stdout line by line.
+        
+        timeout is the longest gap between pieces of output (None waits forever,
+        e.g. for `logread -f`). Streams always use an exec channel from the pool,
+        even when the shell backend is enabled.
+        """
+        if not self.ensure_connected():
+            raise ConnectionError("Not connected to router")
+        if not is_read_only_command(command):
+            self.cache.invalidate(keep_static=True)
+        return CommandStream(self.channel_pool, command, timeout, max_bytes)
+    
+    def execute_commands(self, commands: List[str], timeout: int = 30,
+                         use_cache: bool = True) -> List[Tuple[str, str, int]]:
+        """Run independent (read-only) commands in parallel over the channel pool, results in input order"""
+        if not commands:
+            return []
+        
+        workers = min(len(commands), self.config.max_channels)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda cmd: self.execute_command(cmd, timeout, use_cache=use_cache),
+                                     commands))
+    
+    def execute_batch(self, commands: Dict[str, str], timeout: int = 30,
+                      use_cache: bool = True) -> Dict[str, Tuple[str, str, int]]:
+        """Run several commands in one remote shell invocation and split the results back out by key.
+        
+        Sub-commands with a cached result are answered locally and left out of the batch.
+        """
+        results = {}
+        pending = {}
         for key, cmd in commands.items():
-            stdout, stderr, exit_code = self.execute_command(cmd)
-            if exit_code == 0:
-                info[key] = stdout.strip()
+            cached = self.cache.get(cmd) if use_cache else None
+            if cached is not None:
+                results[key] = cached
             else:
-                info[key] = f"Error: {stderr.strip()}"
+                pending[key] = cmd
+        
+        if pending:
+            script, marker = build_batch_script(pending)
+            read_only = all(is_read_only_command(cmd) for cmd in pending.values())
+            stdout, stderr, exit_code = self.execute_command(script, timeout=timeout,
+                                                             read_only=read_only, use_cache=False)
+            for key, result in parse_batch_output(list(pending), marker, stdout, stderr, exit_code).items():
+                self.cache.store(pending[key], result, is_read_only_command(pending[key]))
+                results[key] = result
+        
+        return {key: results[key] for key in commands}
+    
+    def get_system_info(self) -> Dict[str, str]:
+        """Get basic system information (`ubus call system info` and `system board`, or shell commands)"""
+        replies = self.ubus_call_many(UBUS_SYSTEM_INFO_CALLS)
+        if all(status == UBUS_STATUS_OK and reply for status, reply in replies.values()) and 'memory' in replies['info'][1]:
+            return info_from_ubus(replies['info'][1], replies['board'][1])
+        return info_from_results(self.execute_batch(SYSTEM_INFO_COMMANDS))
+    
+    def get_system_stats(self) -> SystemStats:
+        """Get memory, load, uptime, mounts and disk usage as exact, structured values"""
+        return parse_system_stats(self.execute_batch(SYSTEM_STATS_COMMANDS))
+    
+    def ubus_call_many(self, calls: Dict[str, UbusCall]) -> Dict[str, Tuple[int, Optional[Dict[str, Any]]]]:
+        """Run several ubus calls in one request, returning {key: (status, reply)}"""
+        if self.ubus is None:
+            return {key: (UBUS_STATUS_UNAVAILABLE, None) for key in calls}
+        return self.ubus.call_many(calls)
+    
+    def ubus_call(self, obj: str, method: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Run one ubus call and return its reply, or None if it failed"""
+        status, reply = self.ubus_call_many({'call': (obj, method, params)})['call']
+        return reply if status == UBUS_STATUS_OK else None
+    
+    def get_board_info(self) -> Dict[str, Any]:
+        """Get model, kernel, hostname and release info (`ubus call system board`, or scraped files)"""
+        status, board = self.ubus_call_many({'board': ('system', 'board', None)})['board']
+        if status == UBUS_STATUS_OK:
+            return board
         
+        results = self.execute_batch({
+            'kernel': 'uname -r',
+            'hostname': 'cat /proc/sys/kernel/hostname',
+            'model': 'cat /tmp/sysinfo/model',
+            'release': 'cat /etc/openwrt_release'
+        })
+        info = {key: stdout.strip() for key, (stdout, stderr, exit_code) in results.items()
+                if exit_code == 0 and key != 'release'}
+        release = parse_openwrt_release(results['release'][0]) if results['release'][2] == 0 else {}
+        info['release'] = {
+            'distribution': release.get('DISTRIB_ID', ''),
+            'version': release.get('DISTRIB_RELEASE', ''),
+            'revision': release.get('DISTRIB_REVISION', ''),
+            'target': release.get('DISTRIB_TARGET', ''),
+            'description': release.get('DISTRIB_DESCRIPTION', '')
+        }
         return info
     
+    def get_network_interfaces(self) -> Dict[str, Dict[str, Any]]:
+        """Get interface status keyed by name (`ubus call network.interface dump`, or `ip addr` by device)"""
+        status, dump = self.ubus_call_many({'dump': ('network.interface', 'dump', None)})['dump']
+        if status == UBUS_STATUS_OK:
+            return {iface['interface']: iface for iface in dump.get('interface', [])}
+        
+        stdout, stderr, exit_code = self.execute_command('ip -o addr show')
+        return parse_ip_addr(stdout) if exit_code == 0 else {}
+    
+    def _open_transfer(self) -> SftpTransfer:
+        if not self.ensure_connected():
+            raise ConnectionError("Not connected to router")
+        return SftpTransfer(self.transport, self.config.max_channels)
+    
+    def upload(self, files: Dict[str, str], progress: Optional[ProgressCallback] = None) -> TransferResult:
+        """Upload {local_path: remote_path} over SFTP, max_channels files at a time"""
+        transfer = self._open_transfer()
+        try:
+            return transfer.run(list(files.items()), "upload", progress)
+        finally:
+            transfer.close()
+            self.cache.invalidate(keep_static=True)
+    
+    def download(self, files: Dict[str, str], progress: Optional[ProgressCallback] = None) -> TransferResult:
+        """Download {remote_path: local_path} over SFTP, max_channels files at a time"""
+        transfer = self._open_transfer()
+        try:
+            return transfer.run(list(files.items()), "download", progress)
+        finally:
+            transfer.close()
+    
+    def sync_dir(self, local_dir: str, remote_dir: str,
+                 progress: Optional[ProgressCallback] = None) -> TransferResult:
+        """Upload a local directory tree, skipping files whose size and mtime already match"""
+        transfer = self._open_transfer()
+        try:
+            start = time.monotonic()
+            remote = transfer.remote_files(remote_dir)
+            
+            jobs = []
+            remote_dirs = {remote_dir}
+            skipped = 0
+            for root, _, names in os.walk(local_dir):
+                relative_root = os.path.relpath(root, local_dir)
+                for name in names:
+                    local_path = os.path.join(root, name)
+                    relative = name if relative_root == '.' else f"{relative_root}/{name}".replace(os.sep, '/')
+                    st = os.stat(local_path)
+                    attrs = remote.get(relative)
+                    if attrs and attrs.st_size == st.st_size and attrs.st_mtime == int(st.st_mtime):
+                        skipped += 1
+                        continue
+                    remote_path = f"{remote_dir.rstrip('/')}/{relative}"
+                    remote_dirs.add(remote_path.rsplit('/', 1)[0])
+                    jobs.append((local_path, remote_path))
+            
+            for directory in sorted(remote_dirs):
+                transfer.makedirs(directory)
+            result = transfer.run(jobs, "upload", progress)
+            result.skipped = skipped
+            result.seconds = time.monotonic() - start
+            return result
+        finally:
+            transfer.close()
+            self.cache.invalidate(keep_static=True)
+    
+    def upload_dir_tar(self, local_dir: str, remote_dir: str, timeout: float = 300) -> TransferResult:
+        """Upload a local directory tree as one tar stream into `tar -x` on the router.
+        
+        The fallback for routers without an SFTP server (stock dropbear): every
+        file is sent whether or not it changed, and files end up owned by root.
+        """
+        if not self.ensure_connected():
+            raise ConnectionError("Not connected to router")
+        self.cache.invalidate(keep_static=True)
+        
+        def as_root(info: tarfile.TarInfo) -> tarfile.TarInfo:
+            info.uid = info.gid = 0
+            info.uname = info.gname = "root"
+            return info
+        
+        start = time.monotonic()
+        result = TransferResult()
+        remote = shlex.quote(remote_dir)
+        with self.channel_pool.channel(timeout) as channel:
+            channel.settimeout(timeout)
+            channel.exec_command(f"mkdir -p {remote} && tar -xf - -C {remote}")
+            with channel.makefile('wb') as stream:
+                # GNU format: busybox tar reads its long-name records, not pax headers
+                with tarfile.open(fileobj=stream, mode='w|', format=tarfile.GNU_FORMAT) as tar:
+                    for root, _, names in os.walk(local_dir):
+                        for name in sorted(names):
+                            local_path = os.path.join(root, name)
+                            tar.add(local_path, os.path.relpath(local_path, local_dir).replace(os.sep, '/'),
+                                    filter=as_root)
+                            result.files += 1
+                            result.bytes += os.path.getsize(local_path)
+            channel.shutdown_write()
+            exit_code = channel.recv_exit_status()
+            stderr = channel.makefile_stderr('rb').read().decode('utf-8', 'replace').strip()
+        if exit_code != 0:
+            result.failures[remote_dir] = stderr or f"Exit code {exit_code}"
+        result.seconds = time.monotonic() - start
+        return result
+    
+    def wait_for_ssh(self, timeout: float = 60) -> ReadinessResult:
+        """Wait until the router answers commands over SSH again"""
+        deadline = time.monotonic() + timeout
+        return wait_until({'ssh': lambda: self._ssh_reachable(deadline)}, timeout)
+    
+    def wait_for_interface(self, name: str, timeout: float = 60) -> ReadinessResult:
+        """Wait until SSH is back and the logical interface is up with an IPv4 address"""
+        deadline = time.monotonic() + timeout
+        # One status call per poll: 'up' fetches it and 'address' (checked right after) reuses it
+        polled = {}
+        
+        def up() -> bool:
+            polled['status'] = self._interface_status(name, deadline)
+            return bool(polled['status'].get('up'))
+        
+        def address() -> bool:
+            status = polled.pop('status', None)
+            if status is None:
+                status = self._interface_status(name, deadline)
+            return bool(status.get('ipv4-address'))
+        
+        return wait_until({'ssh': lambda: self._ssh_reachable(deadline), 'up': up, 'address': address}, timeout)
+    
+    def _interface_status(self, name: str, deadline: float) -> Dict[str, Any]:
+        """`ubus call network.interface.<name> status` ending by deadline; {} if it could not be read
+        
+        Goes through _ssh_reachable()'s single connect attempt when the session
+        has dropped (restarting the interface often takes SSH with it), never
+        through reconnect().
+        """
+        if not self.is_alive() and not self._ssh_reachable(deadline):
+            return {}
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return {}
+        command = f"ubus call {shlex.quote(f'network.interface.{name}')} status"
+        try:
+            stdout, _, exit_code = self._execute_once(command, min(5, remaining))
+        except Exception:
+            self.probe(min(TRANSPORT_PROBE_TIMEOUT, max(0.1, deadline - time.monotonic())))
+            return {}
+        if exit_code != 0:
+            return {}
+        try:
+            status = json.loads(stdout)
+        except ValueError:
+            return {}
+        return status if isinstance(status, dict) else {}
+    
+    def _ssh_reachable(self, deadline: float) -> bool:
+        """One check that ends by deadline: `true` on a live session, else a single connect attempt.
+        
+        Unlike execute_command() this never goes through reconnect(), whose
+        retries and backoff could far outlast the caller's timeout.
+        """
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        if self.is_alive():
+            try:
+                return self._execute_once("true", min(5, remaining))[2] == 0
+            except Exception:
+                self.probe(min(TRANSPORT_PROBE_TIMEOUT, max(0.1, deadline - time.monotonic())))
+                return False
+        
+        if not self._reconnect_lock.acquire(timeout=remaining):
+            return False
+        try:
+            if not self.is_alive():
+                self.metrics.reconnect_attempts += 1
+                try:
+                    self._close_connection()
+                    self._open_connection(timeout=max(0.1, min(self.config.timeout, deadline - time.monotonic())))
+                except Exception:
+                    return False
+                self.cache.invalidate()
+                self.metrics.reconnects += 1
+            return True
+        finally:
+            self._reconnect_lock.release()
+    
+    def telemetry_sampler(self, interval: float = 5.0, record: bool = False) -> TelemetrySampler:
+        """Create a background sampler of CPU, memory, load and per-interface rates.
+        
+        With record=True every sample is also kept in the metrics history.
+        """
+        sampler = TelemetrySampler(self, interval)
+        if record:
+            store = self.open_metrics_store()
+            sampler.subscribe(lambda sample: store.record_many(sample.metrics(), sample.timestamp))
+        return sampler
+    
+    def open_metrics_store(self) -> MetricsStore:
+        """The per-router metric history, opened on first use"""
+        if self.metrics_store is None:
+            self.metrics_store = MetricsStore(self.config.metrics_store_path or os.path.join(
+                DEFAULT_CACHE_DIR, f"metrics-{self.config.host}.sqlite"
+            ))
+        return self.metrics_store
+    
+    def open_log_tailer(self) -> LogTailer:
+        """The router's shared `logread -f` follower, started on first use"""
+        if self.log_tailer is None:
+            self.log_tailer = LogTailer(self)
+        self.log_tailer.start()
+        return self.log_tailer
+    
+    def open_log_index(self) -> LogIndex:
+        """The host-side log index, fed from this router's log tailer from first use on"""
+        if self.log_index is None:
+            self.log_index = LogIndex(self.config.log_index_path or os.path.join(
+                DEFAULT_CACHE_DIR, DEFAULT_LOG_INDEX_NAME
+            ))
+            self.log_index.follow(self.open_log_tailer(), self.config.host)
+        return self.log_index
+    
+    def search_logs(self, text: str = "", daemon: Optional[str] = None, since: Optional[float] = None,
+                    until: Optional[float] = None, limit: int = 100) -> List[LogRecord]:
+        """Search this router's indexed log history without running anything on the router"""
+        return self.open_log_index().search(text, router=self.config.host, daemon=daemon,
+                                            since=since, until=until, limit=limit)
+    
+    def answer_log_query(self, command: str) -> Optional[Tuple[str, str, int]]:
+        """Answer `logread`, `logread -l N` and `logread | tail [-n] N` from the running log tailer,
+        and `logread | grep term` / `logread -e term` from the log index.
+        
+        Returns None when neither is running (or has nothing yet), so the
+        command runs on the router as usual.
+        """
+        terms = log_search_terms(command)
+        if terms is not None:
+            if self.log_index is None or not self.log_index.is_live(self.config.host):
+                return None
+            records, truncated = self.log_index.grep(*terms, router=self.config.host)
+            return format_log_records(records), log_grep_note(records, truncated), 0 if records else 1
+        
+        match = re.match(r'^logread(?:\s+-l\s+(\d+)|\s*\|\s*tail\s+(?:-n\s*)?-?(\d+))?\s*$', command.strip())
+        if not match or self.log_tailer is None or not self.log_tailer.running:
+            return None
+        count = match.group(1) or match.group(2)
+        records = self.log_tailer.recent(int(count) if count else None)
+        if not records:
+            return None
+        return format_log_records(records), "", 0
+    
+    def backup_store(self) -> BackupStore:
+        return BackupStore(self.config.backup_dir or os.path.join(DEFAULT_CACHE_DIR, "backups"))
+    
+    def backup(self, label: str = "", timeout: float = 120) -> Optional[BackupManifest]:
+        """Stream `sysupgrade -b -` into the deduplicating backup store; None on failure"""
+        try:
+            manifest = self.backup_store().ingest(self.config.host, self.stream_bytes(BACKUP_COMMAND, timeout), label)
+        except (RuntimeError, ValueError, OSError, TimeoutError, ConnectionError, paramiko.SSHException) as e:
+            print(f"Backup failed: {e}")
+            return None
+        print(f"Backup {manifest.name}: {manifest.compressed_size} bytes from router, "
+              f"{len(manifest.chunks)} chunks")
+        return manifest
+    
+    def list_backups(self) -> List[BackupManifest]:
+        """Stored backups of this router, oldest first"""
+        return self.backup_store().list(self.config.host)
+    
+    def _snapshotter(self) -> ConfigSnapshotter:
+        if self.config_snapshotter is None:
+            root = self.config.config_snapshot_dir or os.path.join(DEFAULT_CACHE_DIR, "config-snapshots")
+            self.config_snapshotter = ConfigSnapshotter(self, ConfigStore(root, self.config.host))
+        return self.config_snapshotter
+    
+    def snapshot_config(self, label: str = "") -> ConfigSnapshot:
+        """Snapshot /etc/config; when nothing changed this is one md5sum and returns the latest snapshot"""
+        return self._snapshotter().take(label)
+    
+    def list_config_snapshots(self) -> List[ConfigSnapshot]:
+        """Stored snapshots of this router, oldest first"""
+        return self._snapshotter().store.list()
+    
+    def diff_config(self, before=None, after=None) -> ConfigDiff:
+        """Section-level UCI diff between two snapshots (ids, id prefixes or ConfigSnapshots).
+        
+        after defaults to a fresh snapshot and before to the snapshot preceding it.
+        """
+        store = self._snapshotter().store
+        if after is None:
+            after = self.snapshot_config()
+        elif isinstance(after, str):
+            after = store.find(after)
+        if before is None:
+            earlier = [s for s in store.list() if s.created < after.created and s.id != after.id]
+            before = earlier[-1] if earlier else after
+        elif isinstance(before, str):
+            before = store.find(before)
+        if before is None or after is None:
+            raise ValueError("Unknown config snapshot")
+        return store.diff(before, after)
+    
+    @contextmanager
+    def config_changes(self, label: str = ""):
+        """Snapshot the config around a block; the yielded ConfigChanges has .diff once it ends"""
+        changes = ConfigChanges(self.snapshot_config(f"before {label}".strip()))
+        try:
+            yield changes
+        finally:
+            changes.after = self.snapshot_config(f"after {label}".strip())
+            changes.diff = self._snapshotter().store.diff(changes.before, changes.after)
+    
+    def uci_transaction(self) -> UciTransaction:
+        """Start collecting UCI changes to apply in one round-trip"""
+        return UciTransaction(self)
+    
+    def get_package_feeds(self) -> Dict[str, str]:
+        """Get the router's opkg feeds as {name: url}"""
+        stdout, stderr, exit_code = self.execute_command(
+            "cat /etc/opkg/distfeeds.conf /etc/opkg/customfeeds.conf 2>/dev/null"
+        )
+        return parse_opkg_feeds(stdout)
+    
+    def refresh_package_index(self, force: bool = False) -> Dict[str, str]:
+        """Re-check the feed indexes on the host if older than package_index_max_age (or force)"""
+        if self.package_index is None:
+            path = self.config.package_index_path or os.path.join(
+                DEFAULT_CACHE_DIR, f"opkg-{self.config.host}.sqlite"
+            )
+            self.package_index = PackageIndex(path)
+        
+        if not force and self.package_index.age() < self.config.package_index_max_age:
+            return {}
+        feeds = self.get_package_feeds()
+        if not feeds:
+            return {}
+        return self.package_index.refresh(feeds)
+    
+    def search_packages(self, term: str, limit: Optional[int] = None) -> List[PackageInfo]:
+        """Search available packages by name and description in the host-side index"""
+        self.refresh_package_index()
+        return self.package_index.search(term, limit=limit)
+    
+    def get_package_info(self, name: str) -> Optional[PackageInfo]:
+        """Look up an available package (version, deps, size) in the host-side index"""
+        self.refresh_package_index()
+        return self.package_index.get(name)
+    
+    def is_package_available(self, name: str) -> bool:
+        """Check whether a package exists in the router's feeds"""
+        self.refresh_package_index()
+        return self.package_index.is_available(name)
+    
+    def answer_package_query(self, command: str) -> Optional[Tuple[str, str, int]]:
+        """Answer `opkg list-installed`, `opkg list [glob]`, `opkg find glob` and `opkg list | grep term` locally.
+        
+        Returns None for anything else, or when the index is empty, so the
+        command runs on the router as usual.
+        """
+        if command.strip() == 'opkg list-installed':
+            packages = self.get_installed_packages()
+            if not packages:
+                return None
+            return "".join(f"{name} - {version}\n" for name, version in sorted(packages.items())), "", 0
+        
+        match = re.match(r'^opkg (list|find)(?:\s+(\S+))?(?:\s*\|\s*grep\s+(-i\s+)?(\S+))?\s*$', command.strip())
+        if not match or (match.group(1) == 'find' and not match.group(2)):
+            return None
+        
+        try:
+            self.refresh_package_index()
+            if not len(self.package_index):
+                return None
+            glob = shlex.split(match.group(2))[0] if match.group(2) else '*'
+            packages = self.package_index.match(glob)
+        except (ValueError, OSError):
+            return None
+        
+        lines = [f"{p.name} - {p.version} - {p.summary}" for p in packages]
+        if match.group(4):
+            term = shlex.split(match.group(4))[0]
+            if match.group(3):
+                lines = [line for line in lines if term.lower() in line.lower()]
+            else:
+                lines = [line for line in lines if term in line]
+            # grep exits 1 when nothing matched
+            return "".join(line + "\n" for line in lines), "", 0 if lines else 1
+        return "".join(line + "\n" for line in lines), "", 0
+    
     def update_packages(self) -> bool:
         """Update package lists"""
         print("Updating package lists...")
@@ -112,33 +1626,120 @@ class OpenWrtManager:
             print(f"Failed to install {package_name}: {stderr}")
             return False
     
-    def list_installed_packages(self) -> List[str]:
-        """List all installed packages"""
-        stdout, stderr, exit_code = self.execute_command("opkg list-installed")
+    def plan_install(self, package_names: List[str]) -> InstallPlan:
+        """Resolve the dependency closure of package_names and check it against free flash"""
+        self.refresh_package_index()
+        installed = set(self.list_installed_packages())
+        plan = InstallPlan(list(package_names))
         
-        if exit_code == 0:
-            packages = []
-            for line in stdout.strip().split('\n'):
-                if line.strip():
-                    package_name = line.split()[0]
-                    packages.append(package_name)
-            return packages
-        else:
+        visited = set()
+        
+        def visit(name: str):
+            if name in visited:
+                return
+            visited.add(name)
+            if name in installed:
+                plan.already_installed.append(name)
+                return
+            info = self.package_index.get(name)
+            if info is None:
+                plan.unknown.append(name)
+                return
+            for dependency in info.depends:
+                visit(dependency)
+            plan.to_install.append(info)
+        
+        for name in package_names:
+            visit(name)
+        
+        plan.required_bytes = sum(p.installed_size or p.size for p in plan.to_install)
+        stdout, stderr, exit_code = self.execute_command("df -k /overlay 2>/dev/null || df -k /",
+                                                         use_cache=False)
+        filesystems = parse_df(stdout) if exit_code == 0 else []
+        if filesystems:
+            plan.free_bytes = filesystems[0].available
+        return plan
+    
+    def install_packages(self, package_names: List[str],
+                         progress: Optional[Callable[[str, str], None]] = None) -> bool:
+        """Install several packages with one `opkg install`, after checking the plan fits in flash.
+        
+        progress(package, event) is called as opkg reports each package
+        ("installing", "up to date", "configured"); by default progress is printed.
+        """
+        plan = self.plan_install(package_names)
+        if plan.unknown:
+            print(f"Not in the package index, leaving to opkg: {', '.join(plan.unknown)}")
+        if not plan.fits:
+            print(f"Not enough flash: need {plan.required_bytes // 1024} KiB, "
+                  f"{plan.free_bytes // 1024} KiB free")
+            return False
+        
+        if not plan.to_install and not plan.unknown:
+            print(f"Already installed: {', '.join(package_names)}")
+            return True
+        
+        total = len(plan.to_install) + len(plan.unknown)
+        print(f"Installing {len(package_names)} packages ({total} with dependencies, "
+              f"~{plan.required_bytes // 1024} KiB)...")
+        
+        done = 0
+        command = "opkg install " + " ".join(shlex.quote(name) for name in package_names)
+        try:
+            with self.stream_command(command, timeout=300) as stream:
+                for line in stream:
+                    for pattern, event in OPKG_PROGRESS_PATTERNS:
+                        match = pattern.match(line.strip())
+                        if not match:
+                            continue
+                        if event == 'installing':
+                            done += 1
+                        if progress:
+                            progress(match.group(1), event)
+                        elif event == 'installing':
+                            print(f"[{done}/{total}] Installing {match.group(1)} ({match.group(2)})")
+                        break
+        except (TimeoutError, ConnectionError, OSError, paramiko.SSHException) as e:
+            print(f"Failed to install packages: {e}")
+            return False
+        
+        if stream.exit_code == 0:
+            print(f"Successfully installed {', '.join(package_names)}")
+            return True
+        print(f"Failed to install packages: {stream.stderr}")
+        return False
+    
+    def get_installed_packages(self) -> Dict[str, str]:
+        """Get installed packages as {name: version}, re-reading opkg's status file only when it changed"""
+        stdout, stderr, exit_code = self.execute_command(OPKG_STATUS_FINGERPRINT_COMMAND, use_cache=False)
+        fingerprint = InstalledPackages.fingerprint_from(stdout) if exit_code == 0 else ""
+        if fingerprint and not self.installed_packages.is_current(fingerprint):
+            stdout, stderr, exit_code = self.execute_command(f"cat {OPKG_STATUS_PATH}", use_cache=False)
+            if exit_code == 0:
+                self.installed_packages.update(fingerprint, parse_opkg_status(stdout))
+            else:
+                fingerprint = ""
+        if fingerprint:
+            return dict(self.installed_packages.packages)
+        
+        # The status file could not be fingerprinted or read; ask opkg itself
+        stdout, stderr, exit_code = self.execute_command(OPKG_LIST_INSTALLED_COMMAND, use_cache=False)
+        if exit_code != 0:
             print(f"Failed to list packages: {stderr}")
-            return []
+            return {}
+        return parse_opkg_list_installed(stdout)
+    
+    def list_installed_packages(self) -> List[str]:
+        """List all installed packages"""
+        return sorted(self.get_installed_packages())
     
     def setup_usb_storage(self, mount_point: str = "/mnt/usb") -> bool:
         """Setup USB storage for expanded storage"""
         commands = [
             "opkg update",
             "opkg install block-mount kmod-fs-ext4 kmod-usb-storage e2fsprogs",
-            f"mkdir -p {mount_point}",
-            "block detect > /etc/config/fstab",
-            f"uci set fstab.@mount[0].target='{mount_point}'",
-            "uci set fstab.@mount[0].enabled='1'",
-            "uci commit fstab",
-            "/etc/init.d/fstab enable",
-            "/etc/init.d/fstab start"
+            f"mkdir -p {shlex.quote(mount_point)}",
+            "block detect > /etc/config/fstab"
         ]
         
         for cmd in commands:
@@ -148,11 +1749,26 @@ class OpenWrtManager:
                 print(f"Command failed: {stderr}")
                 return False
         
+        print("Configuring fstab...")
+        transaction = (self.uci_transaction()
+                       .set("fstab.@mount[0].target", mount_point)
+                       .set("fstab.@mount[0].enabled", "1"))
+        if not transaction.apply():
+            self._print_uci_errors(transaction)
+            return False
+        
+        for cmd in ["/etc/init.d/fstab enable", "/etc/init.d/fstab start"]:
+            print(f"Executing: {cmd}")
+            stdout, stderr, exit_code = self.execute_command(cmd, timeout=60)
+            if exit_code != 0:
+                print(f"Command failed: {stderr}")
+                return False
+        
         print("USB storage setup completed")
         return True
     
-    def setup_nordvpn(self) -> bool:
-        """Setup NordVPN client"""
+    def setup_nordvpn(self, config_dir: Optional[str] = None) -> bool:
+        """Setup NordVPN client, uploading .ovpn files from config_dir if given"""
         nordvpn_packages = [
             "openvpn-openssl",
             "luci-app-openvpn",
@@ -164,16 +1780,30 @@ class OpenWrtManager:
         if not self.update_packages():
             return False
         
-        for package in nordvpn_packages:
-            if not self.install_package(package):
-                return False
+        if not self.install_packages(nordvpn_packages):
+            return False
         
         print("Creating NordVPN configuration directory...")
         self.execute_command("mkdir -p /etc/openvpn/nordvpn")
         
+        if config_dir:
+            print(f"Uploading NordVPN configs from {config_dir}...")
+            try:
+                result = self.sync_dir(config_dir, "/etc/openvpn/nordvpn")
+            except ConnectionError as e:
+                print(f"{e}; sending the configs through tar instead")
+                try:
+                    result = self.upload_dir_tar(config_dir, "/etc/openvpn/nordvpn")
+                except (OSError, paramiko.SSHException) as e:
+                    print(f"Failed to upload NordVPN configs: {e}")
+                    return False
+            print(result.report())
+            if not result.success:
+                return False
+        
         print("NordVPN base setup completed. Manual configuration required:")
         print("1. Download NordVPN OpenVPN configs from nordvpn.com")
-        print("2. Upload .ovpn files to /etc/openvpn/nordvpn/")
+        print("2. Upload .ovpn files to /etc/openvpn/nordvpn/ (setup_nordvpn(config_dir) or sync_dir)")
         print("3. Configure credentials in /etc/openvpn/nordvpn/auth.txt")
         print("4. Enable OpenVPN service: /etc/init.d/openvpn enable && /etc/init.d/openvpn start")
         
@@ -188,105 +1818,98 @@ class OpenWrtManager:
     
     def get_storage_info(self) -> Dict[str, str]:
         """Get detailed storage information"""
-        commands = {
-            'disk_usage': 'df -h',
-            'block_devices': 'lsblk',
-            'mount_points': 'mount | grep -E "^/dev"'
-        }
-        
-        info = {}
-        for key, cmd in commands.items():
-            stdout, stderr, exit_code = self.execute_command(cmd)
-            if exit_code == 0:
-                info[key] = stdout.strip()
-            else:
-                info[key] = f"Error: {stderr.strip()}"
-        
-        return info
+        return info_from_results(self.execute_batch(STORAGE_INFO_COMMANDS))
     
     def setup_wireless_client_mode(self, ssid: str, password: str, encryption: str = "psk2") -> bool:
         """Configure router as wireless client/bridge mode"""
         print(f"Configuring wireless client mode for SSID: {ssid}")
         
-        # Commands to configure wireless client mode
-        commands = [
+        # The new station interface is addressed as @wifi-iface[-1] so it is the
+        # section just added, whatever other interfaces remain
+        transaction = (self.uci_transaction()
             # Disable current wireless interfaces
-            "uci set wireless.@wifi-device[0].disabled='0'",
-            "uci delete wireless.@wifi-iface[0]",
+            .set("wireless.@wifi-device[0].disabled", "0")
+            .delete("wireless.@wifi-iface[0]")
             
             # Configure wireless interface as client (station mode)
-            "uci add wireless wifi-iface",
-            "uci set wireless.@wifi-iface[0].device='radio0'",
-            "uci set wireless.@wifi-iface[0].network='wwan'",
-            "uci set wireless.@wifi-iface[0].mode='sta'",
-            f"uci set wireless.@wifi-iface[0].ssid='{ssid}'",
-            f"uci set wireless.@wifi-iface[0].encryption='{encryption}'",
-            f"uci set wireless.@wifi-iface[0].key='{password}'",
+            .add("wireless", "wifi-iface")
+            .set("wireless.@wifi-iface[-1].device", "radio0")
+            .set("wireless.@wifi-iface[-1].network", "wwan")
+            .set("wireless.@wifi-iface[-1].mode", "sta")
+            .set("wireless.@wifi-iface[-1].ssid", ssid)
+            .set("wireless.@wifi-iface[-1].encryption", encryption)
+            .set("wireless.@wifi-iface[-1].key", password)
             
             # Create network interface for the wireless connection
-            "uci set network.wwan='interface'",
-            "uci set network.wwan.proto='dhcp'",
+            .set("network.wwan", "interface")
+            .set("network.wwan.proto", "dhcp")
             
             # Configure firewall to allow traffic from wwan to lan
-            "uci add firewall forwarding",
-            "uci set firewall.@forwarding[-1].src='wwan'",
-            "uci set firewall.@forwarding[-1].dest='lan'",
+            .add("firewall", "forwarding")
+            .set("firewall.@forwarding[-1].src", "wwan")
+            .set("firewall.@forwarding[-1].dest", "lan")
             
             # Add wwan to the lan zone for bridging
-            "uci add_list firewall.@zone[1].network='wwan'",
-            
-            # Commit all changes
-            "uci commit",
-            
-            # Restart network and wireless services
-            "/etc/init.d/network restart",
-            "wifi reload"
-        ]
+            .add_list("firewall.@zone[1].network", "wwan"))
+        
+        print(f"Applying {len(transaction.lines)} UCI changes in one transaction...")
+        if not transaction.apply():
+            self._print_uci_errors(transaction)
+            return False
         
-        print("Executing wireless client mode configuration...")
-        for i, cmd in enumerate(commands, 1):
-            print(f"Step {i}/{len(commands)}: {cmd}")
+        # Restart network and wireless services
+        for cmd in ["/etc/init.d/network restart", "wifi reload"]:
+            print(f"Executing: {cmd}")
             stdout, stderr, exit_code = self.execute_command(cmd, timeout=30)
             
             if exit_code != 0:
                 print(f"Command failed: {stderr}")
                 return False
-            
-            # Add delay after network restart
-            if "network restart" in cmd or "wifi reload" in cmd:
-                print("Waiting for network services to restart...")
-                time.sleep(10)
+        
+        print("Waiting for wwan to come up...")
+        readiness = self.wait_for_interface("wwan", timeout=60)
+        if readiness.ready:
+            print(f"wwan up with an address after {readiness.elapsed:.1f}s")
+        else:
+            print(f"wwan not ready after {readiness.elapsed:.1f}s (waiting on: {', '.join(readiness.pending)})")
+            print("Note: The router may take a moment to connect to the target network")
         
         print("Wireless client mode configuration completed successfully")
-        print("Note: The router may take a moment to connect to the target network")
         return True
     
+    @staticmethod
+    def _print_uci_errors(transaction: UciTransaction):
+        print("UCI changes failed, nothing was committed:")
+        for number, line, message in transaction.errors:
+            print(f"  line {number}: {line}: {message}" if number else f"  {message}")
+    
     def get_wireless_status(self) -> Dict[str, str]:
         """Get wireless interface status and connection info"""
-        commands = {
-            'wireless_config': 'uci show wireless',
-            'wifi_status': 'wifi status',
-            'iwconfig': 'iwconfig 2>/dev/null || echo "iwconfig not available"',
-            'ip_addresses': 'ip addr show',
-            'connected_networks': 'iwinfo | grep -A 10 "ESSID"'
-        }
-        
-        info = {}
-        for key, cmd in commands.items():
-            stdout, stderr, exit_code = self.execute_command(cmd)
-            if exit_code == 0:
-                info[key] = stdout.strip()
-            else:
-                info[key] = f"Error: {stderr.strip()}"
+        return info_from_results(self.execute_batch(WIRELESS_STATUS_COMMANDS))
+    
+    def get_wifi_radios(self) -> List[str]:
+        """Radio names from the wireless config"""
+        stdout, stderr, exit_code = self.execute_command("uci show wireless")
+        radios = parse_wifi_devices(stdout) if exit_code == 0 else []
+        return radios or list(DEFAULT_RADIOS)
+    
+    def scan_wireless(self, force: bool = False) -> List[WirelessNetwork]:
+        """Scan every radio concurrently; a scan younger than wireless_scan_ttl is reused unless force.
         
-        return info
+        The diff against the previous scan is in self.wireless_scanner.last_diff.
+        """
+        scanner = self.wireless_scanner
+        with scanner.lock:
+            if force or not scanner.is_fresh():
+                radios = self.get_wifi_radios()
+                results = self.execute_commands([scan_command(radio) for radio in radios], timeout=15,
+                                                use_cache=False)
+                scanner.update(dict(zip(radios, results)))
+            return list(scanner.networks)
     
     def scan_wireless_networks(self) -> str:
         """Scan for available wireless networks"""
-        print("Scanning for wireless networks...")
-        stdout, stderr, exit_code = self.execute_command("iwinfo radio0 scan", timeout=15)
-        
-        if exit_code == 0:
-            return stdout.strip()
-        else:
-            return f"Scan failed: {stderr.strip()}"
\ No newline at end of file
+        if not self.wireless_scanner.is_fresh():
+            print("Scanning for wireless networks...")
+        self.scan_wireless()
+        return self.wireless_scanner.report()
\ No newline at end of file
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+
+import re
+import shlex
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+# Read straight from /proc and `df -k` so the router does no human-readable formatting
+SYSTEM_STATS_COMMANDS = {
+    'meminfo': 'cat /proc/meminfo',
+    'loadavg': 'cat /proc/loadavg',
+    'uptime': 'cat /proc/uptime',
+    'mounts': 'cat /proc/mounts',
+    'df': 'df -k'
+}
+
+@dataclass
+class MemoryInfo:
+    __slots__ = ('total', 'free', 'available', 'buffers', 'cached', 'swap_total', 'swap_free')
+    total: int
+    free: int
+    available: int
+    buffers: int
+    cached: int
+    swap_total: int
+    swap_free: int
+    
+    @property
+    def used(self) -> int:
+        return self.total - self.available
+    
+    @property
+    def used_percent(self) -> float:
+        return 100.0 * self.used / self.total if self.total else 0.0
+
+@dataclass
+class LoadInfo:
+    __slots__ = ('load1', 'load5', 'load15', 'running', 'processes', 'last_pid')
+    load1: float
+    load5: float
+    load15: float
+    running: int
+    processes: int
+    last_pid: int
+
+@dataclass
+class UptimeInfo:
+    __slots__ = ('seconds', 'idle_seconds')
+    seconds: float
+    idle_seconds: float
+
+@dataclass
+class MountInfo:
+    __slots__ = ('device', 'mount_point', 'fs_type', 'options')
+    device: str
+    mount_point: str
+    fs_type: str
+    options: Tuple[str, ...]
+    
+    @property
+    def read_only(self) -> bool:
+        return 'ro' in self.options
+
+@dataclass
+class FilesystemUsage:
+    __slots__ = ('filesystem', 'total', 'used', 'available', 'mount_point')
+    filesystem: str
+    total: int
+    used: int
+    available: int
+    mount_point: str
+    
+    @property
+    def used_percent(self) -> float:
+        return 100.0 * self.used / self.total if self.total else 0.0
+
+@dataclass
+class CpuTimes:
+    __slots__ = ('total', 'idle', 'iowait', 'context_switches')
+    total: int  # jiffies across all states
+    idle: int
+    iowait: int
+    context_switches: int
+
+@dataclass
+class NetCounters:
+    __slots__ = ('rx_bytes', 'rx_packets', 'rx_errors', 'rx_dropped',
+                 'tx_bytes', 'tx_packets', 'tx_errors', 'tx_dropped')
+    rx_bytes: int
+    rx_packets: int
+    rx_errors: int
+    rx_dropped: int
+    tx_bytes: int
+    tx_packets: int
+    tx_errors: int
+    tx_dropped: int
+
+@dataclass
+class WirelessNetwork:
+    __slots__ = ('radio', 'bssid', 'ssid', 'channel', 'signal', 'quality', 'encryption', 'mode')
+    radio: str
+    bssid: str
+    ssid: str  # "" for hidden networks
+    channel: int
+    signal: Optional[int]  # dBm
+    quality: Optional[float]  # 0.0 - 1.0
+    encryption: str
+    mode: str
+
+@dataclass
+class LogRecord:
+    __slots__ = ('timestamp', 'facility', 'level', 'daemon', 'pid', 'message', 'raw')
+    timestamp: float  # epoch seconds, from the router's local time; 0 if unparseable
+    facility: str
+    level: str
+    daemon: str
+    pid: Optional[int]
+    message: str
+    raw: str
+
+@dataclass
+class SystemStats:
+    __slots__ = ('memory', 'load', 'uptime', 'mounts', 'filesystems', 'errors')
+    memory: Optional[MemoryInfo]
+    load: Optional[LoadInfo]
+    uptime: Optional[UptimeInfo]
+    mounts: List[MountInfo]
+    filesystems: List[FilesystemUsage]
+    errors: Dict[str, str]
+
+def parse_meminfo(text: str) -> MemoryInfo:
+    """Parse /proc/meminfo into exact byte counts"""
+    values = {}
+    for line in text.splitlines():
+        key, _, rest = line.partition(':')
+        parts = rest.split()
+        if not parts or not parts[0].isdigit():
+            continue
+        multiplier = 1024 if len(parts) > 1 and parts[1] == 'kB' else 1
+        values[key.strip()] = int(parts[0]) * multiplier
+    
+    if 'MemTotal' not in values:
+        raise ValueError("MemTotal missing from /proc/meminfo")
+    
+    free = values.get('MemFree', 0)
+    buffers = values.get('Buffers', 0)
+    cached = values.get('Cached', 0)
+    # Kernels before 3.14 have no MemAvailable; approximate it the way free(1) used to
+    available = values.get('MemAvailable', free + buffers + cached)
+    return MemoryInfo(values['MemTotal'], free, available, buffers, cached,
+                      values.get('SwapTotal', 0), values.get('SwapFree', 0))
+
+def parse_loadavg(text: str) -> LoadInfo:
+    """Parse /proc/loadavg ("0.10 0.05 0.01 1/45 1234")"""
+    fields = text.split()
+    if len(fields) < 5:
+        raise ValueError(f"Unexpected /proc/loadavg format: {text!r}")
+    running, _, processes = fields[3].partition('/')
+    return LoadInfo(float(fields[0]), float(fields[1]), float(fields[2]),
+                    int(running), int(processes), int(fields[4]))
+
+def parse_uptime(text: str) -> UptimeInfo:
+    """Parse /proc/uptime ("12345.67 23456.78")"""
+    fields = text.split()
+    if len(fields) < 2:
+        raise ValueError(f"Unexpected /proc/uptime format: {text!r}")
+    return UptimeInfo(float(fields[0]), float(fields[1]))
+
+def parse_proc_stat(text: str) -> CpuTimes:
+    """Parse the aggregate cpu line and context switch count of /proc/stat"""
+    cpu = None
+    context_switches = 0
+    for line in text.splitlines():
+        fields = line.split()
+        if fields and fields[0] == 'cpu':
+            cpu = [int(value) for value in fields[1:]]
+        elif fields and fields[0] == 'ctxt':
+            context_switches = int(fields[1])
+    if not cpu or len(cpu) < 4:
+        raise ValueError("cpu line missing from /proc/stat")
+    # user nice system idle [iowait irq softirq steal ...]; guest time is already in user
+    total = sum(cpu[:8])
+    return CpuTimes(total, cpu[3], cpu[4] if len(cpu) > 4 else 0, context_switches)
+
+def parse_net_dev(text: str) -> Dict[str, NetCounters]:
+    """Parse /proc/net/dev into per-interface counters"""
+    interfaces = {}
+    for line in text.splitlines():
+        name, sep, rest = line.partition(':')
+        fields = rest.split()
+        if not sep or '|' in line or len(fields) < 16:
+            continue
+        values = [int(value) for value in fields]
+        interfaces[name.strip()] = NetCounters(values[0], values[1], values[2], values[3],
+                                               values[8], values[9], values[10], values[11])
+    return interfaces
+
+# "Sat Oct 17 10:00:00 2026 daemon.notice dnsmasq[1234]: message"
+_LOGREAD_LINE = re.compile(
+    r'^(\w{3} \w{3} [ \d]\d \d\d:\d\d:\d\d \d{4}) (\w+)\.(\w+) ([^:\[\s]+)(?:\[(\d+)\])?: ?(.*)$'
+)
+
+def parse_logread_line(line: str) -> LogRecord:
+    """Parse one `logread` line; lines in another format keep everything in message"""
+    line = line.rstrip('\n')
+    match = _LOGREAD_LINE.match(line)
+    if not match:
+        return LogRecord(0.0, '', '', '', None, line, line)
+    try:
+        timestamp = time.mktime(time.strptime(match.group(1), '%a %b %d %H:%M:%S %Y'))
+    except (ValueError, OverflowError):
+        timestamp = 0.0
+    pid = match.group(5)
+    return LogRecord(timestamp, match.group(2), match.group(3), match.group(4),
+                     int(pid) if pid else None, match.group(6), line)
+
+def _unescape_mount_field(field: str) -> str:
+    # /proc/mounts octal-escapes spaces, tabs, newlines and backslashes
+    return (field.replace('\\040', ' ').replace('\\011', '\t')
+                 .replace('\\012', '\n').replace('\\134', '\\'))
+
+def parse_mounts(text: str) -> List[MountInfo]:
+    """Parse /proc/mounts"""
+    mounts = []
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) < 4:
+            continue
+        mounts.append(MountInfo(_unescape_mount_field(fields[0]), _unescape_mount_field(fields[1]),
+                                fields[2], tuple(fields[3].split(','))))
+    return mounts
+
+def parse_df(text: str) -> List[FilesystemUsage]:
+    """Parse `df -k` output into byte counts"""
+    usages = []
+    carry = ""
+    for line in text.splitlines()[1:]:
+        fields = (carry + " " + line).split() if carry else line.split()
+        if len(fields) == 1:
+            # Long device names make non-POSIX df wrap the rest onto the next line
+            carry = fields[0]
+            continue
+        carry = ""
+        if len(fields) < 6 or not fields[1].isdigit():
+            continue
+        usages.append(FilesystemUsage(fields[0], int(fields[1]) * 1024, int(fields[2]) * 1024,
+                                      int(fields[3]) * 1024, " ".join(fields[5:])))
+    return usages
+
+def parse_openwrt_release(text: str) -> Dict[str, str]:
+    """Parse /etc/openwrt_release (DISTRIB_KEY='value' lines)"""
+    values = {}
+    for line in text.splitlines():
+        key, sep, value = line.partition('=')
+        if sep:
+            values[key.strip()] = value.strip().strip('\'"')
+    return values
+
+def parse_ip_addr(text: str) -> Dict[str, Dict[str, Any]]:
+    """Parse `ip -o addr show` into {device: {...}} shaped like ubus network.interface entries"""
+    interfaces = {}
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) < 4 or fields[2] not in ('inet', 'inet6'):
+            continue
+        device = fields[1].split('@')[0]
+        address, _, mask = fields[3].partition('/')
+        entry = interfaces.setdefault(device, {'interface': device, 'l3_device': device, 'up': True,
+                                               'ipv4-address': [], 'ipv6-address': []})
+        family = 'ipv4-address' if fields[2] == 'inet' else 'ipv6-address'
+        entry[family].append({'address': address, 'mask': int(mask) if mask.isdigit() else None})
+    return interfaces
+
+_IWINFO_FIELDS = {
+    'ssid': re.compile(r'ESSID: (?:"(.*)"|unknown)'),
+    'mode': re.compile(r'Mode: (\S+)'),
+    'channel': re.compile(r'Channel: (\d+)'),
+    'signal': re.compile(r'Signal: (-?\d+) dBm'),
+    'quality': re.compile(r'Quality: (\d+)/(\d+)'),
+    'encryption': re.compile(r'Encryption: (.+)')
+}
+
+def parse_iwinfo_scan(text: str, radio: str = "") -> List[WirelessNetwork]:
+    """Parse `iwinfo <radio> scan` into one WirelessNetwork per cell"""
+    networks = []
+    for cell in re.split(r'^Cell \d+ - ', text, flags=re.MULTILINE)[1:]:
+        address = re.match(r'Address: ([0-9A-Fa-f:]{17})', cell)
+        if not address:
+            continue
+        fields = {name: pattern.search(cell) for name, pattern in _IWINFO_FIELDS.items()}
+        quality = fields['quality']
+        networks.append(WirelessNetwork(
+            radio=radio,
+            bssid=address.group(1).upper(),
+            ssid=(fields['ssid'].group(1) or "") if fields['ssid'] else "",
+            channel=int(fields['channel'].group(1)) if fields['channel'] else 0,
+            signal=int(fields['signal'].group(1)) if fields['signal'] else None,
+            quality=int(quality.group(1)) / int(quality.group(2)) if quality and int(quality.group(2)) else None,
+            encryption=fields['encryption'].group(1).strip() if fields['encryption'] else "",
+            mode=fields['mode'].group(1) if fields['mode'] else ""
+        ))
+    return networks
+
+def parse_wifi_devices(text: str) -> List[str]:
+    """Radio names (wifi-device sections) from `uci show wireless`"""
+    return [match.group(1) for match in re.finditer(r'^wireless\.([^.=]+)=wifi-device$', text, re.MULTILINE)]
+
+def parse_uci_config(text: str) -> Dict[str, Dict[str, Any]]:
+    """Parse a UCI config file (/etc/config/*, `uci export`) into {section: {option: value}}.
+    
+    Anonymous sections are named like uci does, @type[index]. Each section has
+    its type under '.type'; list options are lists.
+    """
+    sections = {}
+    counts = {}
+    current = None
+    for line in text.splitlines():
+        try:
+            words = shlex.split(line, comments=True)
+        except ValueError:
+            continue
+        if not words:
+            continue
+        if words[0] == 'config' and len(words) >= 2:
+            section_type = words[1]
+            index = counts.get(section_type, 0)
+            counts[section_type] = index + 1
+            name = words[2] if len(words) > 2 else f"@{section_type}[{index}]"
+            current = sections.setdefault(name, {'.type': section_type})
+        elif current is not None and words[0] == 'option' and len(words) >= 2:
+            current[words[1]] = words[2] if len(words) > 2 else ""
+        elif current is not None and words[0] == 'list' and len(words) >= 3:
+            current.setdefault(words[1], [])
+            if isinstance(current[words[1]], list):
+                current[words[1]].append(words[2])
+    return sections
+
+def parse_md5sums(text: str) -> Dict[str, str]:
+    """Parse `md5sum` output into {file name (without directory): md5}"""
+    sums = {}
+    for line in text.splitlines():
+        digest, _, path = line.strip().partition('  ')
+        if len(digest) == 32 and path:
+            sums[path.rsplit('/', 1)[-1]] = digest
+    return sums
+
+def parse_control_file(text: str) -> List[Dict[str, str]]:
+    """Parse Debian-style control stanzas (opkg Packages indexes, /usr/lib/opkg/status)"""
+    stanzas = []
+    current = {}
+    field = None
+    for line in text.splitlines():
+        if not line.strip():
+            if current:
+                stanzas.append(current)
+            current, field = {}, None
+        elif line[0] in ' \t' and field:
+            current[field] += '\n' + line.strip()
+        else:
+            field, _, value = line.partition(':')
+            current[field] = value.strip()
+    if current:
+        stanzas.append(current)
+    return stanzas
+
+def parse_depends(value: str) -> List[str]:
+    """Package names from a Depends field, without version constraints (first of any alternatives)"""
+    names = []
+    for entry in value.split(','):
+        name = entry.split('|')[0].split('(')[0].strip()
+        if name:
+            names.append(name)
+    return names
+
+def parse_opkg_status(text: str) -> Dict[str, str]:
+    """Installed packages as {name: version} from /usr/lib/opkg/status"""
+    return {
+        stanza['Package']: stanza.get('Version', '')
+        for stanza in parse_control_file(text)
+        if 'Package' in stanza and stanza.get('Status', '').endswith(' installed')
+    }
+
+def parse_opkg_list_installed(text: str) -> Dict[str, str]:
+    """Installed packages as {name: version} from `opkg list-installed` ("name - version" lines)"""
+    packages = {}
+    for line in text.splitlines():
+        fields = line.split(' - ')
+        if fields[0].strip():
+            packages[fields[0].strip()] = fields[1].strip() if len(fields) > 1 else ''
+    return packages
+
+def parse_opkg_feeds(text: str) -> Dict[str, str]:
+    """Parse opkg feed lines ("src/gz name url") from distfeeds.conf / customfeeds.conf"""
+    feeds = {}
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) >= 3 and fields[0] in ('src', 'src/gz'):
+            feeds[fields[1]] = fields[2].rstrip('/')
+    return feeds
+
+def parse_system_stats(results: Dict[str, Tuple[str, str, int]]) -> SystemStats:
+    """Build SystemStats from execute_batch(SYSTEM_STATS_COMMANDS) results.
+    
+    A source that failed to run or parse leaves its field empty and records the
+    reason in errors.
+    """
+    parsers = {
+        'meminfo': parse_meminfo,
+        'loadavg': parse_loadavg,
+        'uptime': parse_uptime,
+        'mounts': parse_mounts,
+        'df': parse_df
+    }
+    
+    parsed = {}
+    errors = {}
+    for key, parser in parsers.items():
+        stdout, stderr, exit_code = results.get(key, ("", "not run", 1))
+        if exit_code != 0:
+            errors[key] = stderr.strip() or f"Exit code {exit_code}"
+            continue
+        try:
+            parsed[key] = parser(stdout)
+        except ValueError as e:
+            errors[key] = str(e)
+    
+    return SystemStats(parsed.get('meminfo'), parsed.get('loadavg'), parsed.get('uptime'),
+                       parsed.get('mounts', []), parsed.get('df', []), errors)
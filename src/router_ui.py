@@ -15,7 +15,8 @@ from textual.binding import Binding
 from rich.text import Text
 from rich.panel import Panel
 from rich.align import Align
-from router_manager import OpenWrtManager, RouterConfig
+from router_manager import RouterConfig
+from async_router_manager import AsyncOpenWrtManager
 
 class RouterAIApp(App):
     """A beautiful terminal-based router AI assistant"""
@@ -275,12 +276,13 @@ class RouterAIApp(App):
                 username=router_user,
                 password=router_pass
             )
-            self.router_manager = OpenWrtManager(router_config)
+            self.router_manager = AsyncOpenWrtManager(router_config)
             
             # Test connection
             try:
-                connected = await asyncio.to_thread(self.router_manager.connect)
+                connected = await self.router_manager.connect()
                 if connected:
+                    self.router_manager.start_log_collection()
                     success_panel = Panel(
                         Align.center("✅ Connected to router successfully!\n\nReady to assist with your router!"),
                         title="[bold green]Connected[/bold green]",
@@ -768,7 +770,7 @@ class RouterAIApp(App):
     async def on_unmount(self) -> None:
         """Cleanup on exit"""
         if self.router_manager:
-            await asyncio.to_thread(self.router_manager.disconnect)
+            await self.router_manager.disconnect()
         
         # Close HTTP session
         if self.session:
@@ -776,7 +778,7 @@ class RouterAIApp(App):
 
 # Create the UI version of the assistant
 class UIAnthropicRouterAssistant:
-    def __init__(self, api_key: str, router_manager: OpenWrtManager):
+    def __init__(self, api_key: str, router_manager: AsyncOpenWrtManager):
         self.api_key = api_key
         self.router_manager = router_manager
         self.conversation_history = []
@@ -918,22 +920,40 @@ IMPORTANT: Always clearly report whether commands succeeded or failed:
                 command = json.loads(json_str)
                 if 'cmd' in command:
                     cmd = command['cmd']
-                    # Execute command in thread to avoid blocking
-                    stdout, stderr, exit_code = await asyncio.to_thread(
-                        self.router_manager.execute_command, cmd
-                    )
+                    # Stream output off the channel; only the head is ever shown or sent to the AI,
+                    # so stop reading after 64 KB instead of buffering e.g. a whole logread
+                    stdout_parts = []
+                    truncated = False
+                    try:
+                        cached = (await self.router_manager.answer_package_query(cmd)
+                                  or await self.router_manager.answer_log_query(cmd)
+                                  or self.router_manager.cache.get(cmd))
+                        if cached is not None:
+                            stdout, stderr, exit_code = cached
+                        else:
+                            stream = await self.router_manager.stream_command(cmd, 30, 64 * 1024)
+                            async with stream:
+                                async for line in stream:
+                                    stdout_parts.append(line)
+                            stdout, stderr, exit_code = "".join(stdout_parts), stream.stderr, stream.exit_code
+                            truncated = stream.truncated
+                            if not truncated:
+                                self.router_manager.cache.store(cmd, (stdout, stderr, exit_code))
+                    except Exception as e:
+                        stdout, stderr, exit_code = "".join(stdout_parts), f"Command execution failed: {e}", 1
+                    success = exit_code == 0 or truncated
                     
                     # Truncate outputs before logging to prevent UI issues
                     safe_stdout = stdout[:500] if stdout else ""
                     safe_stderr = stderr[:300] if stderr else ""
                     
                     # Log to UI with safe outputs
-                    command_callback(cmd, exit_code == 0, safe_stdout, safe_stderr)
+                    command_callback(cmd, success, safe_stdout, safe_stderr)
                     
                     # Store results with limited output for AI
                     result = {
                         'command': cmd,
-                        'success': exit_code == 0,
+                        'success': success,
                         'stdout': stdout.strip()[:1000],  # Limit for AI context
                         'stderr': stderr.strip()[:500],
                         'exit_code': exit_code
@@ -967,74 +987,6 @@ IMPORTANT: Always clearly report whether commands succeeded or failed:
         
         return response
 
-    def process_command_request_with_ui(self, user_input: str, command_callback) -> str:
-        """Synchronous wrapper for backwards compatibility"""
-        import re
-        
-        # Get AI response
-        response = self.send_message_to_anthropic(user_input)
-        
-        # Parse JSON commands
-        json_pattern = r'\{[^{}]*"cmd"[^{}]*\}'
-        json_commands = re.findall(json_pattern, response)
-        
-        # Limit number of commands to prevent UI overload
-        if len(json_commands) > 5:
-            json_commands = json_commands[:5]
-        
-        # Execute commands
-        command_results = []
-        for json_str in json_commands:
-            try:
-                command = json.loads(json_str)
-                if 'cmd' in command:
-                    cmd = command['cmd']
-                    stdout, stderr, exit_code = self.router_manager.execute_command(cmd)
-                    
-                    # Truncate outputs before logging to prevent UI issues
-                    safe_stdout = stdout[:500] if stdout else ""
-                    safe_stderr = stderr[:300] if stderr else ""
-                    
-                    # Log to UI with safe outputs
-                    command_callback(cmd, exit_code == 0, safe_stdout, safe_stderr)
-                    
-                    # Store results with limited output for AI
-                    result = {
-                        'command': cmd,
-                        'success': exit_code == 0,
-                        'stdout': stdout.strip()[:1000],  # Limit for AI context
-                        'stderr': stderr.strip()[:500],
-                        'exit_code': exit_code
-                    }
-                    command_results.append(result)
-                        
-            except json.JSONDecodeError as e:
-                command_callback(json_str, False, "", f"JSON parse error: {str(e)[:100]}")
-            except Exception as e:
-                command_callback("command_error", False, "", f"Execution error: {str(e)[:100]}")
-        
-        # Send results back to AI for interpretation
-        if command_results:
-            results_summary = "Command execution results:\n"
-            for result in command_results:
-                results_summary += f"Command: {result['command']}\n"
-                results_summary += f"Success: {result['success']}\n"
-                if result['stdout']:
-                    results_summary += f"Output: {result['stdout'][:500]}...\n"  # Truncate for AI
-                if result['stderr']:
-                    results_summary += f"Error: {result['stderr'][:300]}...\n"
-                results_summary += "---\n"
-            
-            # Limit the size of the interpretation prompt
-            if len(results_summary) > 3000:
-                results_summary = results_summary[:3000] + "\n... (results truncated)"
-            
-            interpretation_prompt = f"Based on these command results, answer: '{user_input}'\n\n{results_summary}"
-            final_response = self.send_message_to_anthropic(interpretation_prompt)
-            return final_response
-        
-        return response
-
 def main():
     """Main entry point"""
     print("\n🚀 Starting Router AI Assistant...\n")
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+import os
+import posixpath
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+import paramiko
+
+# progress(path, bytes_done, bytes_total), called from the transfer worker threads
+ProgressCallback = Callable[[str, int, int], None]
+
+# Large SFTP window/packets plus many outstanding reads keep the link busy on high-latency hops
+SFTP_WINDOW_SIZE = 8 * 1024 * 1024
+SFTP_MAX_PACKET_SIZE = 32 * 1024
+SFTP_MAX_PREFETCH_REQUESTS = 64
+
+@dataclass
+class TransferResult:
+    files: int = 0
+    bytes: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+    failures: Dict[str, str] = field(default_factory=dict)
+    
+    @property
+    def success(self) -> bool:
+        return not self.failures
+    
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.seconds if self.seconds > 0 else 0.0
+    
+    def report(self) -> str:
+        """One-line throughput summary"""
+        line = (f"{self.files} files, {_format_size(self.bytes)} in {self.seconds:.2f}s "
+                f"({_format_size(self.bytes_per_second)}/s)")
+        if self.skipped:
+            line += f", {self.skipped} unchanged"
+        if self.failures:
+            line += f", {len(self.failures)} failed"
+        return line
+
+def _format_size(size: float) -> str:
+    for unit in ('B', 'KiB', 'MiB'):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+class SftpTransfer:
+    """Parallel, pipelined SFTP transfers over an existing SSH transport.
+    
+    Each worker thread opens its own SFTP channel on first use and keeps it for
+    the rest of the batch, so max_workers files are in flight at once. Uploads
+    use pipelined writes and downloads prefetch reads, so neither waits for a
+    round-trip per 32 KiB block.
+    """
+    
+    def __init__(self, transport: paramiko.Transport, max_workers: int = 4):
+        self.transport = transport
+        self.max_workers = max(1, max_workers)
+        self._local = threading.local()
+        self._clients = []
+        self._lock = threading.Lock()
+    
+    def _client(self) -> paramiko.SFTPClient:
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            try:
+                client = paramiko.SFTPClient.from_transport(
+                    self.transport, window_size=SFTP_WINDOW_SIZE, max_packet_size=SFTP_MAX_PACKET_SIZE
+                )
+            except paramiko.SSHException as e:
+                # Stock OpenWrt runs dropbear, which has no SFTP server of its own
+                raise ConnectionError(f"SFTP unavailable ({e}); install openssh-sftp-server on the router")
+            self._local.client = client
+            with self._lock:
+                self._clients.append(client)
+        return client
+    
+    def close(self):
+        """Close every SFTP channel opened by the workers"""
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            client.close()
+    
+    def upload_file(self, local_path: str, remote_path: str,
+                    progress: Optional[ProgressCallback] = None) -> int:
+        """Upload one file, keeping its mode and mtime, and return its size"""
+        sftp = self._client()
+        st = os.stat(local_path)
+        callback = (lambda done, total: progress(remote_path, done, total)) if progress else None
+        
+        # Write to a temporary name and rename so readers never see a partial file
+        partial_path = remote_path + ".part"
+        with open(local_path, 'rb') as f:
+            sftp.putfo(f, partial_path, st.st_size, callback=callback, confirm=True)
+        sftp.chmod(partial_path, stat.S_IMODE(st.st_mode))
+        sftp.utime(partial_path, (st.st_atime, st.st_mtime))
+        sftp.posix_rename(partial_path, remote_path)
+        return st.st_size
+    
+    def download_file(self, remote_path: str, local_path: str,
+                      progress: Optional[ProgressCallback] = None) -> int:
+        """Download one file, keeping its mtime, and return its size"""
+        sftp = self._client()
+        callback = (lambda done, total: progress(remote_path, done, total)) if progress else None
+        
+        partial_path = local_path + ".part"
+        with open(partial_path, 'wb') as f:
+            size = sftp.getfo(remote_path, f, callback=callback, prefetch=True,
+                              max_concurrent_prefetch_requests=SFTP_MAX_PREFETCH_REQUESTS)
+        attrs = sftp.stat(remote_path)
+        os.replace(partial_path, local_path)
+        if attrs.st_mtime is not None:
+            os.utime(local_path, (attrs.st_atime or attrs.st_mtime, attrs.st_mtime))
+        return size
+    
+    def makedirs(self, remote_dir: str):
+        """Create remote_dir and any missing parents"""
+        sftp = self._client()
+        missing = []
+        path = remote_dir.rstrip('/')
+        while path:
+            try:
+                sftp.stat(path)
+                break
+            except FileNotFoundError:
+                missing.append(path)
+                path = posixpath.dirname(path) if path != '/' else ''
+        for path in reversed(missing):
+            sftp.mkdir(path)
+    
+    def run(self, jobs: List[Tuple[str, str]], direction: str,
+            progress: Optional[ProgressCallback] = None) -> TransferResult:
+        """Transfer (source, destination) pairs in parallel; direction is "upload" or "download" """
+        transfer = self.upload_file if direction == "upload" else self.download_file
+        result = TransferResult()
+        start = time.monotonic()
+        
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, max(1, len(jobs)))) as executor:
+            futures = {executor.submit(transfer, src, dst, progress): src for src, dst in jobs}
+            for future in as_completed(futures):
+                try:
+                    result.bytes += future.result()
+                    result.files += 1
+                except Exception as e:
+                    result.failures[futures[future]] = str(e)
+        
+        result.seconds = time.monotonic() - start
+        return result
+    
+    def remote_files(self, remote_dir: str) -> Dict[str, paramiko.SFTPAttributes]:
+        """Recursively list regular files under remote_dir as {relative path: attrs}"""
+        sftp = self._client()
+        files = {}
+        pending = ['']
+        while pending:
+            relative = pending.pop()
+            try:
+                entries = sftp.listdir_attr(posixpath.join(remote_dir, relative))
+            except FileNotFoundError:
+                continue
+            for attrs in entries:
+                path = posixpath.join(relative, attrs.filename)
+                if stat.S_ISDIR(attrs.st_mode or 0):
+                    pending.append(path)
+                elif stat.S_ISREG(attrs.st_mode or 0):
+                    files[path] = attrs
+        return files
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+import fcntl
+import os
+import socket
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Tuple
+import paramiko
+from package_index import DEFAULT_CACHE_DIR
+
+DEFAULT_KNOWN_HOSTS = os.path.join(DEFAULT_CACHE_DIR, "known_hosts")
+
+# Serializes known_hosts read-modify-write within the process; the flock on
+# "<path>.lock" does the same across processes
+_known_hosts_lock = threading.Lock()
+
+@dataclass
+class ConnectTiming:
+    tcp_seconds: float = 0.0
+    kex_seconds: float = 0.0
+    auth_seconds: float = 0.0
+    auth_method: str = ""
+    
+    @property
+    def total_seconds(self) -> float:
+        return self.tcp_seconds + self.kex_seconds + self.auth_seconds
+
+def known_hosts_name(host: str, port: int) -> str:
+    return host if port == 22 else f"[{host}]:{port}"
+
+def load_private_key(path: str, passphrase: str = "") -> paramiko.PKey:
+    """Load an Ed25519, ECDSA or RSA private key file"""
+    last_error = None
+    for key_class in (paramiko.Ed25519Key, paramiko.ECDSAKey, paramiko.RSAKey):
+        try:
+            return key_class.from_private_key_file(path, password=passphrase or None)
+        except paramiko.PasswordRequiredException:
+            raise
+        except paramiko.SSHException as e:
+            last_error = e
+    raise paramiko.SSHException(f"Unsupported or unreadable private key {path}: {last_error}")
+
+def _load_known_hosts(known_hosts_path: str) -> paramiko.HostKeys:
+    host_keys = paramiko.HostKeys()
+    if os.path.exists(known_hosts_path):
+        host_keys.load(known_hosts_path)
+    return host_keys
+
+def is_known_host(host: str, port: int, known_hosts_path: str) -> bool:
+    return bool(_load_known_hosts(known_hosts_path).lookup(known_hosts_name(host, port)))
+
+def host_key_from_openssh(line: str) -> paramiko.PKey:
+    """Parse a public key in OpenSSH format ("ssh-ed25519 AAAA... [comment]")"""
+    entry = paramiko.hostkeys.HostKeyEntry.from_line(f"host {line.strip()}")
+    if entry is None:
+        raise paramiko.SSHException(f"Unsupported host key: {line.split()[0] if line.split() else line!r}")
+    return entry.key
+
+def check_host_key(transport: paramiko.Transport, host: str, port: int, policy: str, known_hosts_path: str):
+    """Verify the server key against known_hosts; "tofu" records unknown hosts, "strict" rejects them"""
+    verify_host_key(transport.get_remote_server_key(), host, port, policy, known_hosts_path)
+
+def verify_host_key(key: paramiko.PKey, host: str, port: int, policy: str, known_hosts_path: str):
+    """check_host_key() for a key obtained some other way (e.g. from an asyncssh connection)"""
+    if policy == "ignore":
+        return
+    
+    name = known_hosts_name(host, port)
+    if _check_known_key(_load_known_hosts(known_hosts_path), name, key):
+        return
+    if policy == "strict":
+        raise paramiko.SSHException(f"Unknown host key for {name} ({key.get_name()}); not in {known_hosts_path}")
+    
+    directory = os.path.dirname(known_hosts_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    with _known_hosts_lock, open(known_hosts_path + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        # Re-read under the lock: another connect may have recorded hosts since
+        host_keys = _load_known_hosts(known_hosts_path)
+        if _check_known_key(host_keys, name, key):
+            return
+        host_keys.add(name, key.get_name(), key)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".known_hosts.")
+        os.close(fd)
+        try:
+            host_keys.save(tmp_path)
+            os.replace(tmp_path, known_hosts_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+def _check_known_key(host_keys: paramiko.HostKeys, name: str, key: paramiko.PKey) -> bool:
+    """True if the key is already recorded for name; raises if a different key is"""
+    known = host_keys.lookup(name)
+    if not known or key.get_name() not in known:
+        return False
+    if known[key.get_name()] != key:
+        raise paramiko.BadHostKeyException(name, key, known[key.get_name()])
+    return True
+
+def _authenticate(transport: paramiko.Transport, username: str, password: str,
+                  keys: List[paramiko.PKey]) -> str:
+    # Only the configured methods are tried, in order: keys, then password
+    for key in keys:
+        try:
+            transport.auth_publickey(username, key)
+            return f"publickey ({key.get_name()})"
+        except paramiko.AuthenticationException:
+            continue
+    
+    if not password and keys:
+        raise paramiko.AuthenticationException("No configured key was accepted")
+    
+    # An empty password is still tried: fresh OpenWrt installs have no root password
+    try:
+        transport.auth_password(username, password)
+        return "password"
+    except paramiko.BadAuthenticationType as e:
+        if 'keyboard-interactive' not in e.allowed_types:
+            raise
+        transport.auth_interactive(username, lambda title, instructions, prompts: [password] * len(prompts))
+        return "keyboard-interactive"
+
+def open_transport(config) -> Tuple[paramiko.Transport, ConnectTiming]:
+    """Connect, verify the host key and authenticate as RouterConfig describes, timing each phase"""
+    timing = ConnectTiming()
+    keys = []
+    if config.key_filename:
+        keys.append(load_private_key(os.path.expanduser(config.key_filename), config.key_passphrase))
+    if config.allow_agent:
+        keys.extend(paramiko.Agent().get_keys())
+    
+    start = time.monotonic()
+    sock = socket.create_connection((config.host, config.port), timeout=config.timeout)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    timing.tcp_seconds = time.monotonic() - start
+    
+    transport = paramiko.Transport(sock)
+    try:
+        start = time.monotonic()
+        transport.banner_timeout = config.timeout
+        transport.start_client(timeout=config.timeout)
+        check_host_key(transport, config.host, config.port, config.host_key_policy,
+                       os.path.expanduser(config.known_hosts_path) or DEFAULT_KNOWN_HOSTS)
+        timing.kex_seconds = time.monotonic() - start
+        
+        start = time.monotonic()
+        transport.auth_timeout = config.timeout
+        timing.auth_method = _authenticate(transport, config.username, config.password, keys)
+        timing.auth_seconds = time.monotonic() - start
+    except Exception:
+        transport.close()
+        raise
+    return transport, timing
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+from router_parsers import (
+    CpuTimes, NetCounters, MemoryInfo, LoadInfo, parse_proc_stat, parse_meminfo, parse_net_dev,
+    parse_loadavg, parse_uptime
+)
+
+# One cat per tick; /proc/uptime first gives a router-side timestamp for the deltas
+TELEMETRY_COMMAND = "cat /proc/uptime /proc/stat /proc/meminfo /proc/net/dev /proc/loadavg"
+
+@dataclass
+class InterfaceRates:
+    rx_bytes_per_s: float
+    tx_bytes_per_s: float
+    rx_packets_per_s: float
+    tx_packets_per_s: float
+    rx_errors_per_s: float
+    tx_errors_per_s: float
+    rx_dropped_per_s: float
+    tx_dropped_per_s: float
+
+@dataclass
+class TelemetrySample:
+    timestamp: float  # host wall clock
+    interval: float  # router seconds since the previous sample
+    cpu_percent: float
+    iowait_percent: float
+    context_switches_per_s: float
+    memory: MemoryInfo
+    load: LoadInfo
+    interfaces: Dict[str, InterfaceRates] = field(default_factory=dict)
+    
+    def metrics(self) -> Dict[str, float]:
+        """Flatten into {metric name: value}, e.g. for MetricsStore.record_many"""
+        values = {
+            'cpu_percent': self.cpu_percent,
+            'iowait_percent': self.iowait_percent,
+            'context_switches_per_s': self.context_switches_per_s,
+            'memory_used_percent': self.memory.used_percent,
+            'memory_available_bytes': float(self.memory.available),
+            'load1': self.load.load1
+        }
+        for name, rates in self.interfaces.items():
+            values[f'{name}.rx_bytes_per_s'] = rates.rx_bytes_per_s
+            values[f'{name}.tx_bytes_per_s'] = rates.tx_bytes_per_s
+            values[f'{name}.errors_per_s'] = rates.rx_errors_per_s + rates.tx_errors_per_s
+            values[f'{name}.dropped_per_s'] = rates.rx_dropped_per_s + rates.tx_dropped_per_s
+        return values
+
+@dataclass
+class _Snapshot:
+    uptime: float
+    cpu: CpuTimes
+    memory: MemoryInfo
+    net: Dict[str, NetCounters]
+    load: LoadInfo
+
+def split_telemetry_output(text: str) -> Dict[str, str]:
+    """Split TELEMETRY_COMMAND output back into the files it concatenated"""
+    lines = text.splitlines()
+    if len(lines) < 3:
+        raise ValueError("telemetry output too short")
+    
+    meminfo_start = next((i for i, line in enumerate(lines) if line.startswith('MemTotal:')), None)
+    netdev_start = next((i for i, line in enumerate(lines) if line.startswith('Inter-|')), None)
+    if meminfo_start is None or netdev_start is None or not 1 < meminfo_start < netdev_start:
+        raise ValueError("unexpected telemetry output layout")
+    
+    return {
+        'uptime': lines[0],
+        'stat': "\n".join(lines[1:meminfo_start]),
+        'meminfo': "\n".join(lines[meminfo_start:netdev_start]),
+        'net_dev': "\n".join(lines[netdev_start:-1]),
+        'loadavg': lines[-1]
+    }
+
+def _counter_delta(current: int, previous: int) -> int:
+    if current >= previous:
+        return current - previous
+    # 32-bit counters (MIPS kernels) wrap; anything else means the counter was reset
+    return current + 2 ** 32 - previous if previous < 2 ** 32 else current
+
+class TelemetrySampler:
+    """Poll router counters on a background thread and publish host-computed rates.
+    
+    Each tick is one execute_command(TELEMETRY_COMMAND). CPU%, throughput and
+    error/drop rates are deltas between consecutive ticks, so the first tick
+    only sets the baseline. Subscribers are called on the sampler thread with
+    each TelemetrySample.
+    """
+    
+    def __init__(self, manager, interval: float = 5.0):
+        self.manager = manager
+        self.interval = interval
+        self.latest: Optional[TelemetrySample] = None
+        self.samples_taken = 0
+        self.errors = 0
+        self.last_error = ""
+        self._subscribers: List[Callable[[TelemetrySample], None]] = []
+        self._previous: Optional[_Snapshot] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def subscribe(self, callback: Callable[[TelemetrySample], None]):
+        with self._lock:
+            self._subscribers.append(callback)
+    
+    def unsubscribe(self, callback: Callable[[TelemetrySample], None]):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+    
+    def start(self):
+        """Start sampling in the background"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="telemetry-sampler", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: Optional[float] = None):
+        """Stop sampling and wait for the current tick to finish"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.sample_once()
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+    
+    def sample_once(self) -> Optional[TelemetrySample]:
+        """Take one reading and publish it; None on the baseline tick or on failure"""
+        stdout, stderr, exit_code = self.manager.execute_command(
+            TELEMETRY_COMMAND, timeout=max(5, int(self.interval)), use_cache=False
+        )
+        try:
+            if exit_code != 0:
+                raise ValueError(stderr.strip() or f"Exit code {exit_code}")
+            parts = split_telemetry_output(stdout)
+            snapshot = _Snapshot(parse_uptime(parts['uptime']).seconds, parse_proc_stat(parts['stat']),
+                                 parse_meminfo(parts['meminfo']), parse_net_dev(parts['net_dev']),
+                                 parse_loadavg(parts['loadavg']))
+        except ValueError as e:
+            self.errors += 1
+            self.last_error = str(e)
+            return None
+        
+        previous, self._previous = self._previous, snapshot
+        if previous is None or snapshot.uptime <= previous.uptime:
+            # First tick, or the router rebooted in between: start a new baseline
+            return None
+        
+        sample = self._compute(previous, snapshot)
+        self.latest = sample
+        self.samples_taken += 1
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(sample)
+            except Exception as e:
+                print(f"Telemetry subscriber failed: {e}")
+        return sample
+    
+    @staticmethod
+    def _compute(previous: _Snapshot, current: _Snapshot) -> TelemetrySample:
+        interval = current.uptime - previous.uptime
+        total = _counter_delta(current.cpu.total, previous.cpu.total)
+        idle = _counter_delta(current.cpu.idle, previous.cpu.idle)
+        iowait = _counter_delta(current.cpu.iowait, previous.cpu.iowait)
+        
+        interfaces = {}
+        for name, now in current.net.items():
+            before = previous.net.get(name)
+            if before is None:
+                continue
+            interfaces[name] = InterfaceRates(*(
+                _counter_delta(getattr(now, counter), getattr(before, counter)) / interval
+                for counter in ('rx_bytes', 'tx_bytes', 'rx_packets', 'tx_packets',
+                                'rx_errors', 'tx_errors', 'rx_dropped', 'tx_dropped')
+            ))
+        
+        return TelemetrySample(
+            timestamp=time.time(),
+            interval=interval,
+            cpu_percent=100.0 * (total - idle - iowait) / total if total else 0.0,
+            iowait_percent=100.0 * iowait / total if total else 0.0,
+            context_switches_per_s=_counter_delta(current.cpu.context_switches,
+                                                  previous.cpu.context_switches) / interval,
+            memory=current.memory,
+            load=current.load,
+            interfaces=interfaces
+        )
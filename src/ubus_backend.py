@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+
+import json
+import shlex
+from typing import Any, Dict, Optional, Tuple
+import requests
+
+# ubus status codes (libubus enum ubus_msg_status), also used as `ubus call` exit codes
+UBUS_STATUS_OK = 0
+UBUS_STATUS_INVALID_ARGUMENT = 2
+UBUS_STATUS_METHOD_NOT_FOUND = 3
+UBUS_STATUS_NOT_FOUND = 4
+UBUS_STATUS_PERMISSION_DENIED = 6
+UBUS_STATUS_TIMEOUT = 7
+UBUS_STATUS_UNAVAILABLE = 127  # ubus CLI missing, or the rpcd endpoint unreachable
+
+# uhttpd-mod-ubus JSON-RPC error codes mapped back to ubus status codes
+RPC_ERROR_STATUS = {
+    -32000: UBUS_STATUS_NOT_FOUND,
+    -32601: UBUS_STATUS_METHOD_NOT_FOUND,
+    -32602: UBUS_STATUS_INVALID_ARGUMENT,
+    -32002: UBUS_STATUS_PERMISSION_DENIED,
+}
+
+UbusCall = Tuple[str, str, Optional[Dict[str, Any]]]  # (object, method, params)
+
+class SshUbusBackend:
+    """ubus calls through the `ubus` CLI, all calls of a request in one SSH round-trip.
+    
+    manager is anything with OpenWrtManager's execute_batch(), so the calls also
+    go through its result cache.
+    """
+    
+    def __init__(self, manager):
+        self.manager = manager
+    
+    def call_many(self, calls: Dict[str, UbusCall]) -> Dict[str, Tuple[int, Optional[Dict[str, Any]]]]:
+        """Run the calls and return {key: (status, reply)}"""
+        commands = {
+            key: f"ubus call {shlex.quote(obj)} {shlex.quote(method)} {shlex.quote(json.dumps(params or {}))}"
+            for key, (obj, method, params) in calls.items()
+        }
+        
+        replies = {}
+        for key, (stdout, stderr, exit_code) in self.manager.execute_batch(commands).items():
+            if exit_code != 0:
+                replies[key] = (exit_code, None)
+                continue
+            try:
+                replies[key] = (UBUS_STATUS_OK, json.loads(stdout) if stdout.strip() else {})
+            except ValueError:
+                replies[key] = (UBUS_STATUS_INVALID_ARGUMENT, None)
+        return replies
+    
+    def close(self):
+        pass
+
+class RpcdUbusBackend:
+    """ubus calls through rpcd's JSON-RPC endpoint on uhttpd (/ubus).
+    
+    Uses one keep-alive requests.Session and sends all calls of a request as a
+    single JSON-RPC batch. Logs in on first use and again if the session expires.
+    """
+    
+    ANONYMOUS_SESSION = "0" * 32
+    
+    def __init__(self, url: str, username: str, password: str, timeout: float = 10):
+        self.url = url
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.sid = None
+    
+    def login(self):
+        """Open an rpcd session for username/password"""
+        status, reply = self._post([(self.ANONYMOUS_SESSION, "session", "login",
+                                     {"username": self.username, "password": self.password})])[0]
+        if status != UBUS_STATUS_OK or not reply or "ubus_rpc_session" not in reply:
+            raise PermissionError(f"rpcd login failed (status {status})")
+        self.sid = reply["ubus_rpc_session"]
+    
+    def call_many(self, calls: Dict[str, UbusCall]) -> Dict[str, Tuple[int, Optional[Dict[str, Any]]]]:
+        """Run the calls and return {key: (status, reply)}"""
+        if not calls:
+            return {}
+        
+        try:
+            if self.sid is None:
+                self.login()
+            keys = list(calls)
+            replies = self._post([(self.sid, *calls[key]) for key in keys])
+            if any(status == UBUS_STATUS_PERMISSION_DENIED for status, _ in replies):
+                # Sessions time out after rpcd's idle timeout; log in once more and retry
+                self.login()
+                replies = self._post([(self.sid, *calls[key]) for key in keys])
+        except (requests.RequestException, PermissionError, ValueError):
+            return {key: (UBUS_STATUS_UNAVAILABLE, None) for key in calls}
+        
+        return dict(zip(keys, replies))
+    
+    def _post(self, calls) -> list:
+        payload = [
+            {"jsonrpc": "2.0", "id": i, "method": "call", "params": [sid, obj, method, params or {}]}
+            for i, (sid, obj, method, params) in enumerate(calls)
+        ]
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        
+        body = response.json()
+        items = {item.get("id"): item for item in (body if isinstance(body, list) else [body])}
+        
+        replies = []
+        for i in range(len(calls)):
+            item = items.get(i, {})
+            if "error" in item:
+                replies.append((RPC_ERROR_STATUS.get(item["error"].get("code"), UBUS_STATUS_UNAVAILABLE), None))
+                continue
+            result = item.get("result") or [UBUS_STATUS_UNAVAILABLE]
+            replies.append((result[0], result[1] if len(result) > 1 else {}))
+        return replies
+    
+    def close(self):
+        self.session.close()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+import shlex
+import uuid
+from typing import List, Tuple
+
+class UciTransaction:
+    """Collect UCI changes and apply them with one `uci batch` plus commit.
+    
+    The whole transaction is one SSH command. If any line fails, every touched
+    config is reverted and nothing is committed. The lines are then replayed
+    one at a time, still on the router, so each error can be traced to the line
+    that caused it (errors holds (line number, line, message)).
+    
+    manager is anything with OpenWrtManager's execute_command().
+    """
+    
+    def __init__(self, manager):
+        self.manager = manager
+        self.lines: List[str] = []
+        self.configs: List[str] = []
+        self.errors: List[Tuple[int, str, str]] = []
+    
+    def _add(self, command: str, *args: str) -> "UciTransaction":
+        for arg in args:
+            if '\n' in arg:
+                raise ValueError(f"UCI values cannot contain newlines: {arg!r}")
+        config = args[0].split('.', 1)[0]
+        if config not in self.configs:
+            self.configs.append(config)
+        self.lines.append(" ".join([command] + [shlex.quote(arg) for arg in args]))
+        return self
+    
+    def set(self, key: str, value: str) -> "UciTransaction":
+        """Set an option, or create a named section when key is config.section"""
+        return self._add("set", f"{key}={value}")
+    
+    def add(self, config: str, section_type: str) -> "UciTransaction":
+        """Add an anonymous section; later lines can address it as @type[-1]"""
+        return self._add("add", config, section_type)
+    
+    def add_list(self, key: str, value: str) -> "UciTransaction":
+        """Append a value to a list option"""
+        return self._add("add_list", f"{key}={value}")
+    
+    def del_list(self, key: str, value: str) -> "UciTransaction":
+        """Remove a value from a list option"""
+        return self._add("del_list", f"{key}={value}")
+    
+    def delete(self, key: str) -> "UciTransaction":
+        """Delete a section or option"""
+        return self._add("delete", key)
+    
+    def rename(self, key: str, name: str) -> "UciTransaction":
+        """Rename a section or option"""
+        return self._add("rename", f"{key}={name}")
+    
+    def build_script(self) -> Tuple[str, str]:
+        """Build the shell script applying the transaction, returning (script, marker)"""
+        marker = f"UCI_{uuid.uuid4().hex}"
+        body = "\n".join(self.lines)
+        configs = " ".join(shlex.quote(config) for config in self.configs)
+        script = f"""err=$(uci batch 2>&1 >/dev/null <<'{marker}'
+{body}
+{marker}
+)
+if [ $? -eq 0 ] && [ -z "$err" ]; then
+    for c in {configs}; do uci commit "$c" || exit $?; done
+    exit 0
+fi
+for c in {configs}; do uci revert "$c"; done
+n=0
+while IFS= read -r line; do
+    n=$((n + 1))
+    err=$(printf '%s\\n' "$line" | uci batch 2>&1 >/dev/null)
+    if [ $? -ne 0 ] || [ -n "$err" ]; then
+        printf '%s\\n' "$err" | while IFS= read -r msg; do echo "{marker}:$n:$msg"; done
+    fi
+done <<'{marker}'
+{body}
+{marker}
+for c in {configs}; do uci revert "$c"; done
+exit 1"""
+        return script, marker
+    
+    def apply(self, timeout: int = 60) -> bool:
+        """Apply and commit every change, or none of them"""
+        self.errors = []
+        if not self.lines:
+            return True
+        
+        script, marker = self.build_script()
+        stdout, stderr, exit_code = self.manager.execute_command(script, timeout=timeout, read_only=False)
+        if exit_code == 0:
+            return True
+        
+        for line in stdout.splitlines():
+            if not line.startswith(marker + ":"):
+                continue
+            _, number, message = line.split(":", 2)
+            index = int(number) - 1
+            if 0 <= index < len(self.lines):
+                self.errors.append((index + 1, self.lines[index], message.strip()))
+        if not self.errors:
+            self.errors.append((0, "", stderr.strip() or f"Exit code {exit_code}"))
+        return False
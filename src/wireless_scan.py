@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from router_parsers import WirelessNetwork, parse_iwinfo_scan
+
+# Radios of the WNDR3700 (2.4 and 5 GHz), used when `uci show wireless` lists none
+DEFAULT_RADIOS = ["radio0", "radio1"]
+
+def scan_command(radio: str) -> str:
+    return f"iwinfo {radio} scan"
+
+@dataclass
+class ScanDiff:
+    appeared: List[WirelessNetwork] = field(default_factory=list)
+    disappeared: List[WirelessNetwork] = field(default_factory=list)
+    signal_changed: List[Tuple[WirelessNetwork, WirelessNetwork]] = field(default_factory=list)  # (before, now)
+    
+    @property
+    def empty(self) -> bool:
+        return not (self.appeared or self.disappeared or self.signal_changed)
+    
+    def report(self) -> str:
+        lines = [f"+ {describe_network(n)}" for n in self.appeared]
+        lines += [f"- {describe_network(n)}" for n in self.disappeared]
+        lines += [f"~ {describe_network(now)} (was {before.signal} dBm)" for before, now in self.signal_changed]
+        return "\n".join(lines)
+
+def describe_network(network: WirelessNetwork) -> str:
+    signal = f"{network.signal} dBm" if network.signal is not None else "? dBm"
+    return (f"{network.radio:<7} ch {network.channel:<3} {signal:>8}  {network.bssid}  "
+            f"{network.ssid or '(hidden)'}  [{network.encryption or 'unknown'}]")
+
+def diff_scans(before: List[WirelessNetwork], now: List[WirelessNetwork], signal_threshold: int = 5) -> ScanDiff:
+    """Compare two scans by (radio, BSSID); signal changes under signal_threshold dB are ignored"""
+    old = {(n.radio, n.bssid): n for n in before}
+    new = {(n.radio, n.bssid): n for n in now}
+    diff = ScanDiff(
+        appeared=[n for key, n in new.items() if key not in old],
+        disappeared=[n for key, n in old.items() if key not in new]
+    )
+    for key, network in new.items():
+        previous = old.get(key)
+        if (previous is not None and previous.signal is not None and network.signal is not None
+                and abs(network.signal - previous.signal) >= signal_threshold):
+            diff.signal_changed.append((previous, network))
+    return diff
+
+class WirelessScanner:
+    """Latest scan of every radio, reused for ttl seconds, with the diff against the scan before.
+    
+    The scanner holds no connection: callers check is_fresh(), run
+    scan_command() for each radio concurrently, and pass the results to
+    update(). `lock` lets concurrent callers share one scan instead of
+    starting several.
+    """
+    
+    def __init__(self, ttl: float = 30.0, signal_threshold: int = 5):
+        self.ttl = ttl
+        self.signal_threshold = signal_threshold
+        self.networks: List[WirelessNetwork] = []
+        self.last_diff = ScanDiff()
+        self.errors: Dict[str, str] = {}
+        self.scanned_at: Optional[float] = None
+        self.scans = 0
+        self.lock = threading.Lock()
+    
+    def is_fresh(self) -> bool:
+        return self.scanned_at is not None and time.monotonic() - self.scanned_at < self.ttl
+    
+    def update(self, results: Dict[str, Tuple[str, str, int]]) -> ScanDiff:
+        """Replace the stored scan with {radio: iwinfo scan result} and return what changed"""
+        networks = []
+        errors = {}
+        for radio, (stdout, stderr, exit_code) in results.items():
+            if exit_code != 0:
+                errors[radio] = stderr.strip() or f"Exit code {exit_code}"
+                # Keep the last known networks of a radio that failed this time
+                networks.extend(n for n in self.networks if n.radio == radio)
+            else:
+                networks.extend(parse_iwinfo_scan(stdout, radio))
+        networks.sort(key=lambda n: (n.radio, -(n.signal if n.signal is not None else -999)))
+        
+        self.last_diff = diff_scans(self.networks, networks, self.signal_threshold) if self.scans else ScanDiff()
+        self.networks = networks
+        self.errors = errors
+        self.scanned_at = time.monotonic()
+        self.scans += 1
+        return self.last_diff
+    
+    def report(self) -> str:
+        """The current networks as a table, followed by the changes since the previous scan"""
+        lines = [describe_network(n) for n in self.networks] or ["No networks found"]
+        lines += [f"{radio}: scan failed: {error}" for radio, error in self.errors.items()]
+        if self.scans > 1:
+            lines += ["", "Changes since previous scan:", self.last_diff.report() or "none"]
+        return "\n".join(lines)
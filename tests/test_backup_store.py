@@ -0,0 +1,48 @@
+import os
+import random
+import threading
+from backup_store import BackupStore, chunk_stream, MIN_CHUNK, MAX_CHUNK
+
+def data(size: int, seed: int = 1) -> bytes:
+    return random.Random(seed).randbytes(size)
+
+def test_chunks_reassemble_whatever_the_block_size():
+    payload = data(300_000)
+    for block_size in (1, 4096, 100_000):
+        blocks = [payload[i:i + block_size] for i in range(0, len(payload), block_size)]
+        chunks = list(chunk_stream(blocks)) if block_size > 1 else list(chunk_stream([payload]))
+        assert b"".join(chunks) == payload
+        assert all(MIN_CHUNK <= len(chunk) <= MAX_CHUNK for chunk in chunks[:-1])
+
+def test_chunk_boundaries_do_not_depend_on_block_boundaries():
+    payload = data(200_000)
+    whole = list(chunk_stream([payload]))
+    pieces = list(chunk_stream(payload[i:i + 1000] for i in range(0, len(payload), 1000)))
+    assert whole == pieces
+
+def test_an_insertion_only_changes_nearby_chunks():
+    payload = data(400_000)
+    edited = payload[:200_000] + b"inserted bytes" + payload[200_000:]
+    before, after = set(chunk_stream([payload])), set(chunk_stream([edited]))
+    assert len(before - after) <= 2
+
+def test_concurrent_writers_of_one_chunk(tmp_path):
+    store = BackupStore(str(tmp_path))
+    chunk = data(10_000)
+    errors = []
+    
+    def put():
+        try:
+            store._put_chunk(chunk)
+        except Exception as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=put) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    digest = store._put_chunk(chunk)[0]
+    assert store._get_chunk(digest) == chunk
+    assert os.listdir(os.path.dirname(store._chunk_path(digest))) == [digest]
@@ -0,0 +1,28 @@
+import subprocess
+from router_manager import build_batch_script, parse_batch_output
+
+def run_batch(commands):
+    script, marker = build_batch_script(commands)
+    completed = subprocess.run(["sh", "-c", script], capture_output=True, text=True, timeout=30)
+    return parse_batch_output(list(commands), marker, completed.stdout, completed.stderr, completed.returncode)
+
+def test_round_trip_keeps_exact_output_and_exit_codes_per_command():
+    results = run_batch({
+        'hello': 'echo hello',
+        'fails': 'echo oops >&2; exit 3',
+        'multi': 'printf "a\\nb\\n"',
+    })
+    assert results['hello'] == ("hello\n", "", 0)
+    assert results['fails'] == ("", "oops\n", 3)
+    assert results['multi'] == ("a\nb\n", "", 0)
+
+def test_exit_only_ends_its_own_command():
+    results = run_batch({'first': 'exit 0', 'second': 'echo still here'})
+    assert results['first'][2] == 0
+    assert results['second'] == ("still here\n", "", 0)
+
+def test_missing_sections_report_incomplete_batch():
+    script, marker = build_batch_script({'a': 'true', 'b': 'true'})
+    results = parse_batch_output(['a', 'b'], marker, "", "", 255)
+    assert results['a'] == ("", "Batch output incomplete", 255)
+    assert results['b'] == ("", "Batch output incomplete", 255)
@@ -0,0 +1,70 @@
+import pytest
+from router_manager import CommandStream
+
+class FakeChannel:
+    """Just enough of paramiko.Channel for CommandStream: stdout in fixed-size pieces, then EOF"""
+    
+    def __init__(self, output: bytes, piece: int = 7):
+        self.pieces = [output[i:i + piece] for i in range(0, len(output), piece)]
+        self.closed = False
+    
+    def settimeout(self, timeout):
+        pass
+    
+    def exec_command(self, command):
+        self.command = command
+    
+    @property
+    def eof_received(self):
+        return not self.pieces
+    
+    def recv_ready(self):
+        return bool(self.pieces)
+    
+    def recv(self, size):
+        return self.pieces.pop(0) if self.pieces else b""
+    
+    def recv_stderr_ready(self):
+        return False
+    
+    def exit_status_ready(self):
+        return True
+    
+    def recv_exit_status(self):
+        return 0
+
+class FakePool:
+    def __init__(self, channel):
+        self.channel = channel
+        self.released = []
+    
+    def acquire(self, timeout=None):
+        return self.channel
+    
+    def release(self, channel):
+        self.released.append(channel)
+
+def stream(output: bytes, max_bytes=None) -> CommandStream:
+    return CommandStream(FakePool(FakeChannel(output)), "cat /tmp/file", max_bytes=max_bytes)
+
+def test_lines_keep_their_newlines():
+    s = stream(b"one\ntwo\nthree")
+    assert list(s) == ["one\n", "two\n", "three"]
+    assert s.exit_code == 0
+
+@pytest.mark.parametrize("size, truncated", [(99, False), (100, False), (101, True)])
+def test_truncated_only_past_max_bytes(size, truncated):
+    output = b"x" * (size - 1) + b"\n"
+    s = stream(output, max_bytes=100)
+    text = s.read()
+    assert s.truncated is truncated
+    assert s.exit_code == (141 if truncated else 0)
+    assert text.encode() == output[:100]
+    assert s.bytes_read == min(size, 100)
+
+def test_close_returns_the_channel_once():
+    pool = FakePool(FakeChannel(b"data\n"))
+    s = CommandStream(pool, "cat /tmp/file")
+    s.close()
+    s.close()
+    assert pool.released == [pool.channel]
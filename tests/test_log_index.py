@@ -0,0 +1,41 @@
+from log_index import LogIndex, log_search_terms, skip_indexed, replay_start
+from router_parsers import parse_logread_line
+
+LINE = "Sat Oct 17 10:00:%02d 2026 daemon.info dnsmasq[1]: query %s"
+
+def records(*lines):
+    return [parse_logread_line(line) for line in lines]
+
+def test_identical_lines_are_all_kept(tmp_path):
+    index = LogIndex(str(tmp_path / "logs.sqlite"))
+    assert index.add("r1", records(LINE % (1, "a"), LINE % (1, "a"))) == 2
+    assert len(index.grep("query a", "r1")[0]) == 2
+    index.close()
+
+def test_replayed_overlap_is_skipped(tmp_path):
+    index = LogIndex(str(tmp_path / "logs.sqlite"))
+    first = records(LINE % (1, "a"), LINE % (1, "a"), LINE % (2, "b"))
+    index.add("r1", first)
+    # A replay repeats the tail of what was indexed, then continues with new lines
+    replay = records(LINE % (1, "a"), LINE % (1, "a"), LINE % (2, "b"), LINE % (3, "a"), LINE % (3, "a"))
+    fresh = skip_indexed(replay, index.indexed_counts("r1", replay_start(replay)))
+    assert [r.raw for r in fresh] == [LINE % (3, "a")] * 2
+    index.add("r1", fresh)
+    assert len(index.grep("query", "r1")[0]) == 5
+    index.close()
+
+def test_grep_matches_like_grep(tmp_path):
+    index = LogIndex(str(tmp_path / "logs.sqlite"))
+    index.add("r1", records(LINE % (1, "Example.com"), LINE % (2, "exampleXcom"), LINE % (3, "other")))
+    assert [r.message for r in index.grep("example.com", "r1")[0]] == ["query exampleXcom"]
+    assert len(index.grep("example.com", "r1", ignore_case=True)[0]) == 2
+    records_found, truncated = index.grep("query", "r1", limit=2)
+    assert truncated and [r.message for r in records_found] == ["query exampleXcom", "query other"]
+    index.close()
+
+def test_log_search_terms():
+    assert log_search_terms("logread | grep dnsmasq") == ("dnsmasq", False)
+    assert log_search_terms("logread | grep -i 'DHCP'") == ("DHCP", True)
+    assert log_search_terms("logread -e wan") == ("wan", False)
+    assert log_search_terms("logread | grep 'a.*b'") is None
+    assert log_search_terms("logread | grep a | tail") is None
@@ -0,0 +1,65 @@
+import pytest
+from router_manager import is_read_only_command
+
+@pytest.mark.parametrize("command", [
+    "cat /proc/meminfo",
+    "logread | grep dnsmasq",
+    "uci show wireless",
+    "ubus call system board",
+    "ip addr",
+    "df -k 2>/dev/null",
+    "find /etc/config -name '*.conf'",
+    "sort /tmp/dhcp.leases",
+    "tar -cf - /etc/config",
+    "sed -n '1,5p' /etc/openwrt_release",
+    "sed -e 's/a/b/g' /etc/banner",
+    "awk '{print $1}' /proc/loadavg",
+    "awk -F: '$3 == 0 {print $1}' /etc/passwd",
+    "mount",
+    "mount | grep sda",
+    "ifconfig",
+    "ifconfig -a",
+    "ifconfig br-lan",
+    "iwconfig wlan0",
+    "hostname",
+    "hostname -s",
+    "date",
+    "date +%s",
+    "date -u +%Y-%m-%dT%H:%M:%S",
+])
+def test_read_only(command):
+    assert is_read_only_command(command)
+
+@pytest.mark.parametrize("command", [
+    "rm -rf /tmp/x",
+    "uci set network.lan.ipaddr=10.0.0.1",
+    "ubus call network.interface.wan down",
+    "cat /etc/passwd > /tmp/copy",
+    "echo $(reboot)",
+    "echo `reboot`",
+    # A newline separates commands just like ';'
+    "cat /etc/banner\nreboot",
+    "cat /etc/banner\r\nreboot",
+    "find / -fprint /tmp/list",
+    "find /tmp -delete",
+    "sort -o /etc/passwd /tmp/x",
+    "sort --output=/etc/passwd /tmp/x",
+    "tar -cf /tmp/backup.tar /etc/config",
+    "tar -xf - -C /",
+    "sed -i 's/a/b/' /etc/config/network",
+    "sed -n 'w /tmp/out' /etc/banner",
+    "sed -f /tmp/script /etc/banner",
+    "awk 'BEGIN {system(\"reboot\")}'",
+    "awk '{print > \"/tmp/out\"}' /etc/banner",
+    "awk -f /tmp/prog.awk /etc/banner",
+    "mount /dev/sda1 /mnt/usb",
+    "ifconfig br-lan 10.0.0.5",
+    "ifconfig br-lan down",
+    "iwconfig wlan0 essid x",
+    "hostname evil",
+    "hostname -F /tmp/name",
+    "date -s '2020-01-01 00:00'",
+    "date 010112002020",
+])
+def test_not_read_only(command):
+    assert not is_read_only_command(command)
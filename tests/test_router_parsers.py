@@ -0,0 +1,160 @@
+import pytest
+from router_parsers import (
+    parse_meminfo, parse_loadavg, parse_uptime, parse_proc_stat, parse_net_dev, parse_logread_line,
+    parse_mounts, parse_df, parse_openwrt_release, parse_ip_addr, parse_iwinfo_scan, parse_wifi_devices,
+    parse_uci_config, parse_md5sums, parse_depends, parse_opkg_status, parse_opkg_list_installed,
+    parse_opkg_feeds, parse_system_stats
+)
+
+MEMINFO = """MemTotal:         124000 kB
+MemFree:           50000 kB
+MemAvailable:      70000 kB
+Buffers:            2000 kB
+Cached:            18000 kB
+SwapTotal:             0 kB
+SwapFree:              0 kB
+"""
+
+def test_parse_meminfo():
+    memory = parse_meminfo(MEMINFO)
+    assert memory.total == 124000 * 1024
+    assert memory.available == 70000 * 1024
+
+def test_parse_meminfo_without_memavailable_approximates_it():
+    memory = parse_meminfo(MEMINFO.replace("MemAvailable:      70000 kB\n", ""))
+    assert memory.available == (50000 + 2000 + 18000) * 1024
+
+def test_parse_meminfo_requires_total():
+    with pytest.raises(ValueError):
+        parse_meminfo("MemFree: 1 kB\n")
+
+def test_parse_loadavg_and_uptime():
+    load = parse_loadavg("0.10 0.05 0.01 1/45 1234\n")
+    assert (load.load1, load.running, load.processes, load.last_pid) == (0.10, 1, 45, 1234)
+    assert parse_uptime("12345.67 23456.78\n").seconds == 12345.67
+    with pytest.raises(ValueError):
+        parse_loadavg("garbage")
+
+def test_parse_proc_stat():
+    cpu = parse_proc_stat("cpu  10 0 5 100 2 0 1 0 0 0\ncpu0 10 0 5 100 2 0 1 0 0 0\nctxt 999\n")
+    assert (cpu.total, cpu.idle, cpu.iowait, cpu.context_switches) == (118, 100, 2, 999)
+
+def test_parse_net_dev():
+    text = """Inter-|   Receive                                                |  Transmit
+ face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed
+    lo:    1000      10    0    0    0     0          0         0     1000      10    0    0    0     0       0          0
+br-lan: 5000 50 1 2 0 0 0 0 7000 70 3 4 0 0 0 0
+"""
+    interfaces = parse_net_dev(text)
+    assert set(interfaces) == {'lo', 'br-lan'}
+    assert interfaces['br-lan'].rx_bytes == 5000
+    assert interfaces['br-lan'].tx_dropped == 4
+
+def test_parse_logread_line():
+    record = parse_logread_line("Sat Oct 17 10:00:00 2026 daemon.notice dnsmasq[1234]: started\n")
+    assert (record.facility, record.level, record.daemon, record.pid, record.message) == \
+        ('daemon', 'notice', 'dnsmasq', 1234, 'started')
+    assert record.timestamp > 0
+    other = parse_logread_line("not a syslog line")
+    assert (other.timestamp, other.message, other.raw) == (0.0, "not a syslog line", "not a syslog line")
+
+def test_parse_mounts_unescapes_fields():
+    mounts = parse_mounts("/dev/sda1 /mnt/my\\040disk ext4 rw,noatime 0 0\n")
+    assert mounts[0].mount_point == "/mnt/my disk"
+    assert mounts[0].options == ('rw', 'noatime')
+
+def test_parse_df_joins_wrapped_lines():
+    text = """Filesystem           1K-blocks      Used Available Use% Mounted on
+/dev/root                 2048      2048         0 100% /rom
+/dev/mapper/a-very-long-device-name
+                          1000       250       750  25% /overlay
+"""
+    usages = parse_df(text)
+    assert [u.mount_point for u in usages] == ['/rom', '/overlay']
+    assert usages[1].filesystem == "/dev/mapper/a-very-long-device-name"
+    assert usages[1].used == 250 * 1024
+
+def test_parse_openwrt_release():
+    release = parse_openwrt_release("DISTRIB_ID='OpenWrt'\nDISTRIB_RELEASE=\"23.05.3\"\n")
+    assert release == {'DISTRIB_ID': 'OpenWrt', 'DISTRIB_RELEASE': '23.05.3'}
+
+def test_parse_ip_addr():
+    text = ("2: br-lan    inet 192.168.1.1/24 brd 192.168.1.255 scope global br-lan\n"
+            "2: br-lan    inet6 fd00::1/60 scope global\n")
+    lan = parse_ip_addr(text)['br-lan']
+    assert lan['ipv4-address'] == [{'address': '192.168.1.1', 'mask': 24}]
+    assert lan['ipv6-address'] == [{'address': 'fd00::1', 'mask': 60}]
+
+def test_parse_iwinfo_scan():
+    text = """Cell 01 - Address: aa:bb:cc:dd:ee:ff
+          ESSID: "Home"
+          Mode: Master  Channel: 6
+          Signal: -50 dBm  Quality: 60/70
+          Encryption: WPA2 PSK (CCMP)
+
+Cell 02 - Address: 11:22:33:44:55:66
+          ESSID: unknown
+          Mode: Master  Channel: 36
+"""
+    first, hidden = parse_iwinfo_scan(text, "radio0")
+    assert (first.bssid, first.ssid, first.channel, first.signal) == ("AA:BB:CC:DD:EE:FF", "Home", 6, -50)
+    assert first.quality == pytest.approx(60 / 70)
+    assert first.encryption == "WPA2 PSK (CCMP)"
+    assert (hidden.ssid, hidden.signal, hidden.quality) == ("", None, None)
+
+def test_parse_wifi_devices():
+    text = "wireless.radio0=wifi-device\nwireless.radio0.channel='11'\nwireless.default_radio0=wifi-iface\n"
+    assert parse_wifi_devices(text) == ['radio0']
+
+def test_parse_uci_config():
+    text = """
+config interface 'lan'
+	option proto 'static'
+	list dns '1.1.1.1'
+	list dns '8.8.8.8'
+
+config rule
+	option name 'Allow-Ping'
+
+config rule
+	option name 'Allow-DHCP'  # trailing comment
+"""
+    sections = parse_uci_config(text)
+    assert sections['lan'] == {'.type': 'interface', 'proto': 'static', 'dns': ['1.1.1.1', '8.8.8.8']}
+    assert sections['@rule[1]']['name'] == 'Allow-DHCP'
+
+def test_parse_md5sums():
+    text = "d41d8cd98f00b204e9800998ecf8427e  /etc/config/network\nshort  /etc/config/bad\n"
+    assert parse_md5sums(text) == {'network': 'd41d8cd98f00b204e9800998ecf8427e'}
+
+def test_parse_depends():
+    assert parse_depends("libc, libubox (>= 2020) | libubox-lua, kmod-usb") == ['libc', 'libubox', 'kmod-usb']
+
+def test_parse_opkg_status_keeps_only_installed():
+    text = """Package: dnsmasq
+Version: 2.89-4
+Status: install user installed
+
+Package: removed
+Version: 1.0
+Status: deinstall hold not-installed
+"""
+    assert parse_opkg_status(text) == {'dnsmasq': '2.89-4'}
+
+def test_parse_opkg_list_installed():
+    assert parse_opkg_list_installed("busybox - 1.36.1-1\nlibc - 1.2.4-4\n\n") == \
+        {'busybox': '1.36.1-1', 'libc': '1.2.4-4'}
+
+def test_parse_opkg_feeds():
+    text = "src/gz openwrt_core https://downloads.openwrt.org/core/\n# src/gz old http://x\n"
+    assert parse_opkg_feeds(text) == {'openwrt_core': 'https://downloads.openwrt.org/core'}
+
+def test_parse_system_stats_records_failures():
+    stats = parse_system_stats({
+        'meminfo': (MEMINFO, "", 0),
+        'loadavg': ("", "No such file", 1),
+        'uptime': ("garbage", "", 0),
+    })
+    assert stats.memory.total == 124000 * 1024
+    assert stats.load is None and stats.uptime is None
+    assert set(stats.errors) >= {'loadavg', 'uptime'}
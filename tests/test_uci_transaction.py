@@ -0,0 +1,49 @@
+import pytest
+from uci_transaction import UciTransaction
+
+class FakeManager:
+    def __init__(self, result=("", "", 0)):
+        self.result = result
+        self.commands = []
+    
+    def execute_command(self, command, timeout=30, read_only=True):
+        self.commands.append(command)
+        return self.result
+
+def test_build_script_quotes_values_and_commits_each_config_once():
+    transaction = (UciTransaction(FakeManager())
+                   .set("network.lan.ipaddr", "192.168.2.1")
+                   .set("network.lan.hostname", "my router")
+                   .add_list("dhcp.lan.dhcp_option", "6,1.1.1.1"))
+    script, marker = transaction.build_script()
+    assert "set network.lan.ipaddr=192.168.2.1" in script
+    assert "set 'network.lan.hostname=my router'" in script
+    assert "for c in network dhcp; do uci commit" in script
+    # The body appears twice: once for the batch, once for the per-line replay
+    assert script.count(f"<<'{marker}'") == 2
+
+def test_values_with_newlines_are_refused():
+    with pytest.raises(ValueError):
+        UciTransaction(FakeManager()).set("system.@system[0].hostname", "a\nb")
+
+def test_apply_maps_errors_to_lines():
+    transaction = UciTransaction(FakeManager()).set("network.lan.proto", "static").delete("network.nope")
+    marker_holder = {}
+    original = transaction.build_script
+    
+    def build_script():
+        script, marker = original()
+        marker_holder['marker'] = marker
+        return script, marker
+    
+    transaction.build_script = build_script
+    transaction.manager.execute_command = lambda command, timeout=30, read_only=True: (
+        f"{marker_holder['marker']}:2:uci: Entry not found\n", "", 1
+    )
+    assert not transaction.apply()
+    assert transaction.errors == [(2, "delete network.nope", "uci: Entry not found")]
+
+def test_empty_transaction_runs_nothing():
+    manager = FakeManager()
+    assert UciTransaction(manager).apply()
+    assert manager.commands == []